@@ -1,154 +1,298 @@
 import streamlit as st
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import time
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 import uuid
 import pytz
+from telemetria import TELEMETRIA
+# pandas, gspread e os módulos de dados só são importados depois do login (seção 3)
 
 # ==============================================================================
 # 1. FUNÇÕES DE CONEXÃO E CACHE
 # ==============================================================================
 
+def criar_cliente_google():
+    """Client novo a cada chamada; quem guarda e reaproveita é o pool do repositório"""
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds_dict = dict(st.secrets["connections"]["gsheets"])
+    creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
+    return gspread.authorize(creds)
+
 @st.cache_resource
-def get_client_google():
-    try:
-        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-        creds_dict = dict(st.secrets["connections"]["gsheets"])
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
-        return gspread.authorize(creds)
-    except Exception as e:
-        st.error(f"⚠️ Erro de Conexão: {e}")
-        return None
+def get_repositorio():
+    """Backend de dados (Sheets ou SQLite), definido em [armazenamento] nos Secrets"""
+    try: config = dict(st.secrets["armazenamento"])
+    except: config = {}
+    return criar_repositorio(config, criar_cliente_google)
+
+@st.cache_resource
+def iniciar_telemetria():
+    """Métricas do processo; cada rerun vira uma linha JSON em [telemetria] arquivo"""
+    try: config = dict(st.secrets["telemetria"])
+    except: config = {}
+    TELEMETRIA.configurar(config.get("arquivo", "dados/metricas.jsonl"))
+    # Cota do Google dividida por todas as sessões (mesma conta de serviço)
+    try: cota = dict(st.secrets["cota"])
+    except: cota = {}
+    TELEMETRIA.agendador.configurar(cota.get("leituras_por_minuto", 60), cota.get("escritas_por_minuto", 60),
+                                    cota.get("reserva", 0.25))
+    return TELEMETRIA
+
+@st.cache_resource
+def get_arquivo_logs():
+    """Meses fechados dos Logs, com cópia local em Parquet ([armazenamento] pasta_arquivo_logs)"""
+    try: config = dict(st.secrets["armazenamento"])
+    except: config = {}
+    return ArquivoLogs(get_repositorio(), config.get("pasta_arquivo_logs", "dados/arquivo_logs"))
+
+@st.cache_resource
+def get_produtividade():
+    """Relatórios de produtividade; os agregados de dias fechados ficam em cache no processo"""
+    return Produtividade(get_arquivo_logs())
+
+@st.cache_resource
+def get_executor():
+    """Threads do processo para as buscas disparadas logo após o login"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="preaquecimento")
+
+MODULOS_DE_DADOS = ["pandas", "gspread", "oauth2client.service_account", "armazenamento", "paginas",
+                    "esquemas", "cadastro_lotes", "arquivo_logs", "produtividade"]
+
+@st.cache_resource
+def precarregar_pilha():
+    """Importa a pilha de dados uma vez por processo, fora do caminho da tela de login"""
+    import importlib
+    return get_executor().submit(lambda: [importlib.import_module(m) for m in MODULOS_DE_DADOS])
+
+def preaquecer(usuario):
+    """Autoriza o client e busca sites, produção do dia e progresso em paralelo, enquanto a tela monta"""
+    executor = get_executor()
+    st.session_state['pre_sites'] = executor.submit(carregar_lista_sites_v2)
+    st.session_state['pre_resumo'] = executor.submit(calcular_resumo_diario, usuario)
+    st.session_state['pre_progresso'] = executor.submit(lambda: montar_matriz_progresso(tuple(carregar_lista_sites_v2()[0])))
+    executor.submit(lambda: get_repositorio().conectar())
+
+def aguardar(nome):
+    """Resultado da busca em segundo plano `nome` (espera se ainda não terminou); None se não houve ou falhou"""
+    futuro = st.session_state.pop(nome, None)
+    if futuro is None: return None
+    try: return futuro.result()
+    except: return None
+
+def pronto(nome):
+    futuro = st.session_state.get(nome)
+    return futuro is None or futuro.done()
 
 def forcar_atualizacao_mapa():
-    """Lê o banco de acompanhamento e salva na memória"""
-    try:
-        client = get_client_google()
-        sheet = client.open("Sistema_Associacao").worksheet("acompanhamento_paginas")
-        dados = sheet.get_all_records()
-        df = pd.DataFrame(dados)
-        st.session_state['dados_mapa_cache'] = df
-    except:
-        st.session_state['dados_mapa_cache'] = pd.DataFrame()
+    """Relê o banco de acompanhamento na próxima consulta do mapa"""
+    try: get_repositorio().recarregar_reservas()
+    except: pass
 
 @st.cache_data(ttl=300)
 def carregar_lista_sites_v2():
     try:
-        client = get_client_google()
-        if client is None: return [], {} 
-        
-        sheet = client.open("Sistema_Associacao").worksheet("cadastro_varreduras")
-        dados = sheet.get_all_records()
-        df = pd.DataFrame(dados)
-        
-        lista_sites = []
-        regras_exclusao = {}
-
-        if not df.empty and 'Cliente' in df.columns:
-            for index, row in df.iterrows():
-                if row['Cliente'] != '':
-                    nome_completo = f"{row['Cliente']} - {row['Concorrente']}"
-                    lista_sites.append(nome_completo)
-                    
-                    letras_proibidas = []
-                    if 'Delete_Letras' in df.columns:
-                        texto_delete = str(row['Delete_Letras']).upper().strip()
-                        if texto_delete:
-                            letras_proibidas = [l.strip() for l in texto_delete.split(',') if l.strip()]
-                    
-                    regras_exclusao[nome_completo] = letras_proibidas
-
-            return sorted(lista_sites), regras_exclusao
-        return [], {}
+        return sites_cadastrados(get_repositorio().listar_varreduras())
     except Exception as e: 
         st.error(f"Erro ao carregar sites: {e}")
         return [], {}
         
-def buscar_status_paginas(site, letra):
+def buscar_status_paginas(site, letra, atualizar_logs=False):
+    """(total, feitas, qtd_ultima) da letra; na mesma leitura o mapa de reservas é conferido
+    (e, com `atualizar_logs`, os Logs, para o registrar_log logo em seguida)"""
     try:
-        client = get_client_google()
-        if client is None: return None, [], 100
-
-        sheet = client.open("Sistema_Associacao").worksheet("Controle_Paginas")
-        dados = sheet.get_all_records()
-        df = pd.DataFrame(dados)
         chave = f"{site} | {letra}".strip()
-        if not df.empty and 'Chave' in df.columns:
-            res = df[df['Chave'].astype(str).str.strip() == chave]
-            if not res.empty:
-                total = int(res.iloc[0]['Qtd_Paginas'])
-                feitas_str = str(res.iloc[0]['Paginas_Concluidas']).replace("'", "")
-                feitas = [int(x) for x in feitas_str.split(',') if x.strip().isdigit()] if feitas_str else []
-                try: qtd_ultima = int(res.iloc[0]['Qtd_Ultima_Pag'])
-                except: qtd_ultima = 100
-                return total, feitas, qtd_ultima
-        return None, [], 100
+        res, _ = get_repositorio().buscar_letra(chave, atualizar_logs)
+        if res:
+            total = int(res['Qtd_Paginas'])
+            feitas = ConjuntoPaginas.ler(res['Paginas_Concluidas'], limite=total)
+            try: qtd_ultima = int(res['Qtd_Ultima_Pag'])
+            except: qtd_ultima = 100
+            return total, feitas, qtd_ultima
+        return None, ConjuntoPaginas(), 100
     except Exception as e: 
-        return None, [], 100
+        return None, ConjuntoPaginas(), 100
 
 @st.cache_data(ttl=600) 
 def carregar_dados_resumo_geral():
     try:
-        client = get_client_google()
-        if client is None: return None
-        sheet = client.open("Sistema_Associacao").worksheet("Controle_Paginas")
-        return pd.DataFrame(sheet.get_all_records())
+        # Só as colunas da matriz, já tipadas (Site/Letra categóricas, Qtd_Paginas inteiro)
+        return ler_tabela(get_repositorio(), ABA_CONTROLE, ["Site", "Letra", "Qtd_Paginas", "Paginas_Concluidas"])
     except: return None
 
-def exibir_resumo_geral(site_atual, regras_exclusao):
+LETRAS_MATRIZ = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+@st.cache_data(ttl=600)
+def montar_matriz_progresso(sites):
+    """(feitas, total) em sites x letras, a partir de uma leitura do Controle_Paginas.
+
+    Letras não cadastradas ficam como NaN nas duas matrizes.
+    """
+    vazia = pd.DataFrame(float("nan"), index=list(sites), columns=LETRAS_MATRIZ)
     df = carregar_dados_resumo_geral()
-    if df is None or df.empty: return
+    if df is None or df.empty: return vazia, vazia.copy()
+    base = pd.DataFrame({
+        "Site": df['Site'].astype(str),
+        "Letra": df['Letra'].str.upper(),
+        "Total": df['Qtd_Paginas'].astype("float64"),
+        "Feitas": contar_paginas(df['Paginas_Concluidas']),
+    }).dropna(subset=["Total"])
+    base = base[base['Site'].isin(sites) & base['Letra'].isin(LETRAS_MATRIZ)]
+    feitas = base.pivot_table(index='Site', columns='Letra', values='Feitas', aggfunc='max')
+    total = base.pivot_table(index='Site', columns='Letra', values='Total', aggfunc='max')
+    return (feitas.reindex(index=list(sites), columns=LETRAS_MATRIZ),
+            total.reindex(index=list(sites), columns=LETRAS_MATRIZ))
+
+def matriz_de_chaves(contagem, sites):
+    """{"site | letra": n} -> DataFrame sites x letras (0 onde não há)"""
+    zeros = pd.DataFrame(0, index=list(sites), columns=LETRAS_MATRIZ)
+    if not contagem: return zeros
+    serie = pd.Series(contagem, dtype="int64")
+    partes = serie.index.to_series().str.rsplit(" | ", n=1, expand=True)
+    if partes.shape[1] < 2: return zeros
+    tabela = pd.DataFrame({"Site": partes[0].str.strip().values, "Letra": partes[1].str.strip().values, "Qtd": serie.values})
+    pivo = tabela.pivot_table(index='Site', columns='Letra', values='Qtd', aggfunc='sum')
+    return pivo.reindex(index=list(sites), columns=LETRAS_MATRIZ).fillna(0).astype(int)
+
+def matriz_bloqueadas(sites, regras_exclusao):
+    pares = [(s, l) for s in sites for l in regras_exclusao.get(s, [])]
+    if not pares: return pd.DataFrame(False, index=list(sites), columns=LETRAS_MATRIZ)
+    tabela = pd.DataFrame(pares, columns=["Site", "Letra"])
+    return pd.crosstab(tabela['Site'], tabela['Letra']).reindex(index=list(sites), columns=LETRAS_MATRIZ).fillna(0) > 0
+
+def rotular_matriz(feitas, total, bloqueadas, reservadas):
+    """Célula curta por letra: ✅, "12/40", "12/40 🟡3", — (a cadastrar) ou 🚫"""
+    cadastrada = total.notna()
+    concluida = cadastrada & (feitas >= total)
+    rotulo = feitas.fillna(0).astype(int).astype(str) + "/" + total.fillna(0).astype(int).astype(str)
+    rotulo = rotulo.mask(reservadas > 0, rotulo + " 🟡" + reservadas.astype(str))
+    rotulo = rotulo.mask(concluida, "✅").mask(~cadastrada, "—")
+    return rotulo.mask(bloqueadas, "🚫")
+
+def exibir_resumo_geral(site_atual, sites, regras_exclusao):
     try:
-        cadastradas = {}
-        if 'Site' in df.columns:
-            df_site = df[df['Site'] == site_atual]
-            for _, row in df_site.iterrows():
-                total = int(row['Qtd_Paginas'])
-                feitas_str = str(row['Paginas_Concluidas']).replace("'", "").strip()
-                if feitas_str and any(c.isdigit() for c in feitas_str):
-                    qtd_feitas = len([x for x in feitas_str.split(',') if x.strip()])
-                else: qtd_feitas = 0
-                cadastradas[str(row['Letra']).strip()] = (total, qtd_feitas)
-
-        bloqueadas = regras_exclusao.get(site_atual, [])
-        dados_tabela = []
-        for letra in list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
-            if letra in bloqueadas: status = "🚫 Inexistente"
-            elif letra in cadastradas:
-                total, feitas = cadastradas[letra]
-                if feitas >= total: status = "✅ Concluída"
-                else: status = f"📊 {feitas}/{total} Feitas"
-            else: status = "🟡 A Cadastrar"
-            dados_tabela.append({"Letra": letra, "Progresso": status})
+        feitas, total = montar_matriz_progresso(tuple(sites))
+        if site_atual not in feitas.index: return
+        f, t = feitas.loc[site_atual], total.loc[site_atual]
+        bloqueadas = pd.Series(LETRAS_MATRIZ, index=LETRAS_MATRIZ).isin(regras_exclusao.get(site_atual, []))
+        texto_parcial = "📊 " + f.fillna(0).astype(int).astype(str) + "/" + t.fillna(0).astype(int).astype(str) + " Feitas"
+        status = texto_parcial.mask(t.notna() & (f >= t), "✅ Concluída").mask(t.isna(), "🟡 A Cadastrar").mask(bloqueadas, "🚫 Inexistente")
 
         st.markdown("### 🔠 Visão Geral (A-Z)")
-        st.dataframe(pd.DataFrame(dados_tabela), use_container_width=True, hide_index=True, height=300)
+        st.dataframe(pd.DataFrame({"Letra": LETRAS_MATRIZ, "Progresso": status.values}), use_container_width=True, hide_index=True, height=300)
     except Exception as e: st.error(f"Erro visual: {e}")
 
+def exibir_matriz_sites(sites, regras_exclusao):
+    """Visão de supervisor: todos os sites x letras, com páginas em andamento"""
+    with st.expander("🗂️ Progresso de Todos os Sites"):
+        try:
+            feitas, total = montar_matriz_progresso(tuple(sites))
+            reservadas = matriz_de_chaves(get_repositorio().reservas_por_chave(), sites)
+            matriz = rotular_matriz(feitas, total, matriz_bloqueadas(sites, regras_exclusao), reservadas)
+            soma_feitas, soma_total = feitas.sum(axis=1).astype(int), total.sum(axis=1).astype(int)
+            matriz.insert(0, "Feitas", soma_feitas.astype(str) + "/" + soma_total.astype(str))
+            matriz.insert(1, "%", (soma_feitas / soma_total.where(soma_total > 0)).fillna(0).mul(100).round().astype(int))
+            filtro = st.text_input("Filtrar sites", key="filtro_matriz_sites")
+            if filtro: matriz = matriz[matriz.index.str.contains(filtro, case=False, regex=False)]
+            st.caption("✅ concluída · feitas/total · 🟡 páginas em andamento · — a cadastrar · 🚫 inexistente")
+            st.dataframe(matriz, use_container_width=True, height=min(600, 38 + 35 * len(matriz)))
+        except Exception as e: st.error(f"Erro visual: {e}")
+
+def exibir_cadastro_lote(sites, regras_exclusao, usuario):
+    """Várias letras de uma vez (CSV ou tabela), gravadas numa escrita só"""
+    with st.expander("📥 Cadastrar Letras em Lote"):
+        st.caption("Colunas: Site, Letra, Qtd_Paginas e Qtd_Ultima_Pag (opcional, padrão 100). Chaves já cadastradas são ignoradas.")
+        arquivo = st.file_uploader("Arquivo CSV", type=["csv"], key="csv_lote")
+        try: base = ler_csv(arquivo) if arquivo else pd.DataFrame(columns=COLUNAS_LOTE)
+        except Exception as e:
+            st.error(f"CSV inválido: {e}")
+            base = pd.DataFrame(columns=COLUNAS_LOTE)
+        tabela = st.data_editor(base.astype(str), num_rows="dynamic", use_container_width=True,
+                                key=f"tabela_lote_{arquivo.file_id if arquivo else ''}")
+        if st.button("📥 Cadastrar lote", type="primary"):
+            try:
+                res = cadastrar_lote(get_repositorio(), tabela.to_dict("records"), usuario, sites, regras_exclusao)
+                carregar_dados_resumo_geral.clear()
+                montar_matriz_progresso.clear()
+                st.success(f"{len(res['cadastradas'])} letra(s) cadastrada(s); {len(res['existentes'])} já existia(m).")
+                for n, motivo in res['rejeitadas']: st.warning(f"Linha {n}: {motivo}")
+            except Exception as e: st.error(f"Erro no cadastro: {e}")
+
+def exibir_arquivo_logs():
+    """Rotação manual da aba Logs (o mesmo que `python arquivo_logs.py --rotacionar`)"""
+    with st.expander("🗄️ Arquivo de Logs"):
+        st.caption("Move os meses fechados da aba Logs para as abas Logs_AAAA_MM. A aba quente fica só com os dias recentes.")
+        if st.button("🗄️ Arquivar meses fechados"):
+            try:
+                movidos = get_arquivo_logs().rotacionar()
+                if not movidos: st.info("Nenhum mês fechado na aba Logs.")
+                for mes, qtd in movidos.items(): st.success(f"{mes.replace('_', '/')}: {qtd} linha(s) arquivada(s)")
+                st.caption("Meses arquivados: " + ", ".join(m.replace('_', '/') for m in get_repositorio().particoes_logs()))
+            except Exception as e: st.error(f"Erro no arquivamento: {e}")
+
+def exibir_produtividade():
+    """Páginas/h, produtos/h e tempo por letra por operador, site e período"""
+    with st.expander("📊 Produtividade"):
+        c_datas, c_por, c_periodo = st.columns([2, 2, 1])
+        datas = c_datas.date_input("Período", value=periodo_padrao(), format="DD/MM/YYYY", key="datas_produtividade")
+        por = c_por.multiselect("Agrupar por", AGRUPAMENTOS, default=["Operador"], key="por_produtividade")
+        periodo = c_periodo.selectbox("Quebra", list(PERIODOS), key="periodo_produtividade")
+        if st.button("📊 Gerar relatório"):
+            if len(datas) != 2: st.warning("Escolha o início e o fim do período."); return
+            try:
+                rel = get_produtividade().relatorio(datas[0], datas[1], por, PERIODOS[periodo])
+                if rel.empty: st.info("Nenhum registro no período."); return
+                st.dataframe(rel, hide_index=True, use_container_width=True)
+                st.download_button("⬇️ CSV", rel.to_csv(index=False), file_name="produtividade.csv")
+            except Exception as e: st.error(f"Erro no relatório: {e}")
+
+def exibir_metricas(area, resumo):
+    t, p, prod = resumo
+    with area.container():
+        c_pag, c_prod = st.columns(2)
+        c_pag.metric("📄 Páginas", p)
+        c_prod.metric("📦 Produtos", prod)
+
+def exibir_painel_telemetria(telemetria):
+    """Painel só para admins: custo das chamadas ao Sheets e das seções da tela"""
+    with st.expander("🔧 Telemetria"):
+        leituras, escritas = telemetria.por_minuto()
+        c_leit, c_escr = st.columns(2)
+        c_leit.metric("Leituras/min", leituras, help="Cota padrão do Google: 300 por minuto por projeto")
+        c_escr.metric("Escritas/min", escritas)
+        cota = telemetria.agendador.estado()
+        st.caption("Cota (fichas disponíveis e chamadas na fila, por prioridade)")
+        fichas = {t: f"{cota['fichas'][t]}/{limite}" if limite else "∞" for t, limite in cota['limites'].items()}
+        c_fl, c_fe, c_fila = st.columns(3)
+        c_fl.metric("Fichas de leitura", fichas['leitura'])
+        c_fe.metric("Fichas de escrita", fichas['escrita'])
+        c_fila.metric("Na fila", sum(cota['fila'].values()),
+                      help=" · ".join(f"{classe}: {n}" for classe, n in cota['fila'].items()))
+        eventos = telemetria.agendador.resumo_eventos()
+        if eventos: st.dataframe(pd.DataFrame(eventos), hide_index=True, use_container_width=True)
+        st.caption("Chamadas ao Sheets")
+        st.dataframe(pd.DataFrame(telemetria.resumo_chamadas()), hide_index=True, use_container_width=True)
+        st.caption("Seções da tela")
+        st.dataframe(pd.DataFrame(telemetria.resumo_secoes()), hide_index=True, use_container_width=True)
+        st.caption("Sessões")
+        st.dataframe(pd.DataFrame(telemetria.resumo_sessoes()), hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Métricas (Prometheus)", telemetria.prometheus(), file_name="metricas.prom")
+        if st.button("Zerar contadores"): telemetria.zerar()
+
 # ==============================================================================
 # 2. FUNÇÕES DE LOG E SALVAMENTO (SEM COOKIES)
 # ==============================================================================
 
 def salvar_progresso(site, letra, total_paginas, novas_paginas_feitas, usuario_nome, qtd_ultima_pag=100):
     try:
-        client = get_client_google()
-        sheet = client.open("Sistema_Associacao").worksheet("Controle_Paginas")
-        _, ja_feitas, _ = buscar_status_paginas(site, letra)
-        lista_completa = sorted(list(set(ja_feitas + novas_paginas_feitas)))
-        lista_limpa = [p for p in lista_completa if p <= int(total_paginas)]
-        texto_para_salvar = "'" + ", ".join(map(str, lista_limpa))
         chave_busca = f"{site} | {letra}".strip()
-        cell = sheet.find(chave_busca)
-        
-        if cell:
-            sheet.update_cell(cell.row, 5, texto_para_salvar)
-            sheet.update_cell(cell.row, 4, total_paginas)
-            sheet.update_cell(cell.row, 6, qtd_ultima_pag)
-            sheet.update_cell(cell.row, 7, usuario_nome)
-        else:
-            sheet.append_row([chave_busca, site, letra, total_paginas, texto_para_salvar, qtd_ultima_pag, usuario_nome])
+        # A união com as páginas já gravadas é feita no repositório, com compare-and-set
+        # pela coluna Revisao: dois operadores salvando a mesma letra não se sobrescrevem
+        get_repositorio().registrar_progresso({
+            "Chave": chave_busca, "Site": site, "Letra": letra, "Qtd_Paginas": total_paginas,
+            "Qtd_Ultima_Pag": qtd_ultima_pag, "Ultimo_Operador": usuario_nome
+        }, ConjuntoPaginas(novas_paginas_feitas))
     except: pass
 
 def registrar_log(operador, site, letra, acao, total, novas, qtd_ultima_pag):
@@ -161,18 +305,12 @@ def registrar_log(operador, site, letra, acao, total, novas, qtd_ultima_pag):
             total_safe = 0
             qtd_ultima_safe = 100
 
-        client = get_client_google()
-        sheet = client.open("Sistema_Associacao").worksheet("Logs")
+        repo = get_repositorio()
         
         # Filtro de Duplicidade Simples
         try:
-            todos_logs = sheet.get_all_records()
-            df_log = pd.DataFrame(todos_logs)
-            if not df_log.empty and 'Operador' in df_log.columns and 'Acao' in df_log.columns:
-                logs_usuario = df_log[df_log['Operador'].astype(str) == str(operador)]
-                if not logs_usuario.empty:
-                    ultima_acao = logs_usuario.iloc[-1]['Acao']
-                    if str(acao) == str(ultima_acao) and acao != "PAUSA": return True 
+            ultima_acao = repo.ultima_acao(operador)
+            if ultima_acao is not None and str(acao) == str(ultima_acao) and acao != "PAUSA": return True 
         except: pass
 
         fuso = pytz.timezone('America/Sao_Paulo')
@@ -195,7 +333,7 @@ def registrar_log(operador, site, letra, acao, total, novas, qtd_ultima_pag):
 
         if 'id_sessao' not in st.session_state: st.session_state.id_sessao = str(uuid.uuid4())
         
-        str_novas = ", ".join(map(str, novas)) if novas else "-"
+        str_novas = ConjuntoPaginas(novas).texto() if novas else "-"
         qtd_produtos = 0
         if novas:
             for p in novas:
@@ -210,76 +348,112 @@ def registrar_log(operador, site, letra, acao, total, novas, qtd_ultima_pag):
             agora.strftime("%d/%m/%Y %H:%M:%S"), str(agora.timestamp()), 
             tempo, str_novas, total_safe, qtd_produtos
         ]
-        sheet.append_row(nova_linha)
+        repo.anexar_log(nova_linha)
+
+        # Agregado do dia (sidebar "Produção Hoje")
+        try:
+            seg_produtivo = tempo if acao in ["PAUSA", "FIM"] else 0
+            if seg_produtivo or novas or qtd_produtos:
+                repo.somar_producao(str(operador), agora.strftime("%d/%m/%Y"), seg_produtivo, len(novas or []), qtd_produtos)
+        except: pass
         return True
     except Exception as e: 
         st.error(f"Erro Log: {e}")
         return True # Segue o jogo mesmo com erro
 
+def resumir_logs(df):
+    """(segundos, páginas, produtos) a partir dos logs tipados (esquemas.tipar)"""
+    if df.empty: return 0, 0, 0
+    seg = df['Tempo_Decorrido'].where(df['Acao'].isin(['PAUSA', 'FIM'])).sum()
+    paginas = contar_paginas(df['Paginas_Turno']).sum()
+    return int(seg), int(paginas), int(df['Qtd_Total'].sum())
+
 def calcular_resumo_diario(usuario):
     try:
-        client = get_client_google()
-        sheet = client.open("Sistema_Associacao").worksheet("Logs")
-        df = pd.DataFrame(sheet.get_all_records())
-        if df.empty: return "0h 0m", 0, 0
-        
-        df = df[df['Operador'] == usuario]
+        repo = get_repositorio()
         hoje = datetime.now(pytz.timezone('America/Sao_Paulo')).strftime("%d/%m/%Y")
-        df = df[df['Data_Hora'].astype(str).str.startswith(hoje)]
+        resumo = repo.buscar_producao(usuario, hoje)
+        if resumo is None:
+            # Primeira consulta do dia: materializa o agregado a partir do log bruto
+            resumo = resumir_logs(tipar(ABA_LOGS, repo.logs_do_dia(usuario, hoje)))
+            repo.definir_producao(usuario, hoje, *resumo)
         
-        if df.empty: return "0h 0m", 0, 0
-        
-        seg = 0
-        if 'Tempo_Decorrido' in df.columns:
-            coluna_limpa = df['Tempo_Decorrido'].astype(str).str.replace(',', '.')
-            coluna_numerica = pd.to_numeric(coluna_limpa, errors='coerce').fillna(0)
-            mask_produtivo = df['Acao'].isin(['PAUSA', 'FIM'])
-            seg = coluna_numerica[mask_produtivo].sum()
-            
+        seg, paginas, total_prod = resumo
         h, m = int(seg // 3600), int((seg % 3600) // 60)
         tempo_str = f"{h}h {m}m"
-        
-        paginas = 0
-        if 'Paginas_Turno' in df.columns:
-            for item in df['Paginas_Turno']:
-                texto = str(item).strip()
-                if texto and any(c.isdigit() for c in texto):
-                    texto = texto.replace("'", "")
-                    lista = [x for x in texto.split(',') if x.strip()]
-                    paginas += len(lista)
-        
-        total_prod = 0
-        if 'Qtd_Total' in df.columns:
-            col_prod_limpa = df['Qtd_Total'].astype(str).str.replace('.', '', regex=False)
-            total_prod = pd.to_numeric(col_prod_limpa, errors='coerce').fillna(0).sum()
-            
         return tempo_str, paginas, int(total_prod)
     except: 
         return "...", 0, 0
 
+# --- Mapa de páginas ---
+TAMANHO_BLOCO = 100
+LIMITE_MAPA_DETALHADO = 200  # acima disso o mapa abre por blocos
+
+def montar_mapa_paginas(inicio, fim, feitas, reservadas):
+    """Linhas do editor do mapa, só para as páginas de `inicio` a `fim`"""
+    dados_mapa = []
+    for i in range(inicio, fim + 1):
+        if i in feitas: dados_mapa.append({"Pág": i, "Status": "✅", "Selecionar": True, "bloqueado": True})
+        elif i in reservadas: dados_mapa.append({"Pág": i, "Status": "🟡", "Selecionar": True, "bloqueado": False})
+        else: dados_mapa.append({"Pág": i, "Status": "", "Selecionar": False, "bloqueado": False})
+    return pd.DataFrame(dados_mapa)
+
+def resumir_blocos(total, feitas, reservadas, tamanho=TAMANHO_BLOCO):
+    """Uma linha por bloco de páginas, com a contagem de cada status"""
+    em_andamento = reservadas - feitas
+    linhas = []
+    for inicio in range(1, total + 1, tamanho):
+        fim = min(inicio + tamanho - 1, total)
+        faixa = ConjuntoPaginas.intervalo(inicio, fim)
+        qtd_feitas, qtd_andamento = len(feitas & faixa), len(em_andamento & faixa)
+        linhas.append({"Páginas": f"{inicio}-{fim}", "✅": qtd_feitas, "🟡": qtd_andamento,
+                       "Livres": fim - inicio + 1 - qtd_feitas - qtd_andamento})
+    return pd.DataFrame(linhas)
+
 # ==============================================================================
 # 3. LÓGICA DE LOGIN (SIMPLES, SEM COOKIE)
 # ==============================================================================
 
-if not st.session_state.get('password_correct', False):
-    st.title("🔒 Acesso Restrito")
-    try: usuarios = st.secrets["passwords"]
-    except: st.error("Configure os Secrets."); st.stop()
+# Cada rerun é medido (seções e chamadas ao Sheets) e atribuído à sessão
+telemetria = iniciar_telemetria()
+if 'id_telemetria' not in st.session_state: st.session_state['id_telemetria'] = str(uuid.uuid4())
+telemetria.iniciar_rerun(st.session_state['id_telemetria'], st.session_state.get('usuario_logado'))
+
+with telemetria.secao("login"):
+    if not st.session_state.get('password_correct', False):
+        st.title("🔒 Acesso Restrito")
+        try: usuarios = st.secrets["passwords"]
+        except: st.error("Configure os Secrets."); st.stop()
     
-    col1, col2 = st.columns([2,1])
-    with col1:
-        user_input = st.selectbox("Usuário", ["Selecione..."] + list(usuarios.keys()))
-        pass_input = st.text_input("Senha", type="password")
-        if st.button("Entrar", type="primary"):
-            if user_input != "Selecione..." and pass_input == usuarios[user_input]:
-                st.session_state['password_correct'] = True
-                st.session_state['usuario_logado'] = user_input
-                st.rerun()
-            else: st.error("Dados incorretos.")
-    st.stop()
+        # Enquanto o operador digita a senha, a pilha de dados é importada em segundo plano
+        precarregar_pilha()
+        col1, col2 = st.columns([2,1])
+        with col1:
+            user_input = st.selectbox("Usuário", ["Selecione..."] + list(usuarios.keys()))
+            pass_input = st.text_input("Senha", type="password")
+            if st.button("Entrar", type="primary"):
+                if user_input != "Selecione..." and pass_input == usuarios[user_input]:
+                    st.session_state['password_correct'] = True
+                    st.session_state['usuario_logado'] = user_input
+                    st.session_state['recem_logado'] = True
+                    st.rerun()
+                else: st.error("Dados incorretos.")
+        st.stop()
+
+# Pilha de dados: só carregada depois do login, para a tela de acesso abrir na hora
+import pandas as pd
+from armazenamento import ABA_CONTROLE, ABA_LOGS, criar_repositorio
+from paginas import ConjuntoPaginas, contar_paginas
+from esquemas import ler_tabela, tipar
+from cadastro_lotes import COLUNAS_LOTE, cadastrar_lote, ler_csv, sites_cadastrados
+from arquivo_logs import ArquivoLogs
+from produtividade import AGRUPAMENTOS, PERIODOS, Produtividade, periodo_padrao
 
 usuario = st.session_state['usuario_logado'].title()
 
+# Primeira tela depois do login: as buscas que ela vai fazer começam já, em paralelo
+if st.session_state.pop('recem_logado', False): preaquecer(usuario)
+
 # Inicializa Status se não existir
 if 'status' not in st.session_state:
     st.session_state['status'] = "PARADO"
@@ -295,17 +469,23 @@ with st.sidebar:
 
     st.divider()
     st.markdown("### 📊 Produção Hoje")
-    if 'resumo_dia' not in st.session_state:
-        st.session_state['resumo_dia'] = calcular_resumo_diario(usuario)
-    
-    t, p, prod = st.session_state['resumo_dia']
-    c_pag, c_prod = st.columns(2)
-    c_pag.metric("📄 Páginas", p)
-    c_prod.metric("📦 Produtos", prod)
-    
-    if st.button("Atualizar Métricas"):
-        st.session_state['resumo_dia'] = calcular_resumo_diario(usuario)
-        st.rerun()
+    with telemetria.secao("metricas"):
+        # Logo após o login a produção do dia ainda pode estar sendo buscada: a área
+        # fica reservada e é preenchida quando a busca terminar (seção 5)
+        area_metricas = st.empty()
+        if 'resumo_dia' not in st.session_state and pronto('pre_resumo'):
+            st.session_state['resumo_dia'] = aguardar('pre_resumo') or calcular_resumo_diario(usuario)
+        if 'resumo_dia' in st.session_state: exibir_metricas(area_metricas, st.session_state['resumo_dia'])
+        else: area_metricas.caption("⏳ Calculando a produção de hoje...")
+        
+        if st.button("Atualizar Métricas"):
+            st.session_state['resumo_dia'] = calcular_resumo_diario(usuario)
+            st.rerun()
+    estado_escrita = get_repositorio().estado_escrita()
+    if estado_escrita['pendentes']:
+        st.caption(f"⏳ {estado_escrita['pendentes']} alteração(ões) aguardando envio à planilha")
+    if estado_escrita['ultimo_erro']:
+        st.caption(f"⚠️ Planilha indisponível, tentando de novo: {estado_escrita['ultimo_erro']}")
     st.divider()
     if st.button("🔄 Atualizar Lista Sites"):
         carregar_lista_sites_v2.clear()
@@ -317,9 +497,13 @@ with st.sidebar:
 st.title("🔗 Controle de Progresso")
 
 with st.spinner("Carregando sistema..."):
+    aguardar('pre_sites')
     SITES_DO_BANCO, REGRAS_EXCLUSAO = carregar_lista_sites_v2()
     SITES = ["Selecione..."] + SITES_DO_BANCO
     LETRAS_PADRAO = list("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+if 'resumo_dia' not in st.session_state:
+    st.session_state['resumo_dia'] = aguardar('pre_resumo') or calcular_resumo_diario(usuario)
+    exibir_metricas(area_metricas, st.session_state['resumo_dia'])
 
 # Bloqueia seleção APENAS se estiver trabalhando
 disabled_sel = True if st.session_state.get('status') == "TRABALHANDO" else False
@@ -343,20 +527,18 @@ if st.session_state.get('last_sel') != chave and not disabled_sel:
         st.session_state.mem_tot = tot
         st.session_state.mem_feit = feitas
         st.session_state.mem_ult = qtd_ult
-        forcar_atualizacao_mapa()
         st.session_state['last_sel'] = chave
         st.session_state['selecao_mapa_cache'] = []
 
 tot_pg = st.session_state.get('mem_tot')
-feitas_pg = st.session_state.get('mem_feit', [])
+feitas_pg = ConjuntoPaginas(st.session_state.get('mem_feit', ()))
 qtd_ultima = st.session_state.get('mem_ult', 100)
 
 faltam = []
 bloq_total = False
 
 if tot_pg:
-    todas = list(range(1, tot_pg+1))
-    faltam = [p for p in todas if p not in feitas_pg]
+    faltam = list(ConjuntoPaginas.intervalo(1, tot_pg) - feitas_pg)
     prog = len(feitas_pg)/tot_pg if tot_pg > 0 else 0
     st.progress(prog, f"{len(feitas_pg)}/{tot_pg} ({int(prog*100)}%)")
     if not faltam: st.success("Letra Concluída!"); bloq_total = True
@@ -372,175 +554,175 @@ st.divider()
 # ==============================================================================
 # 6. SIDEBAR - MAPA (MOVIDO PARA CIMA)
 # ==============================================================================
-if tot_pg is not None:
-    with st.sidebar:
-        st.divider()
-        c_mapa_titulo, c_mapa_refresh = st.columns([4,1])
-        c_mapa_titulo.markdown(f"### 🗺️ Mapa {letra}")
-        if c_mapa_refresh.button("🔄"):
-            forcar_atualizacao_mapa()
-            st.rerun()
+with telemetria.secao("mapa"):
+    if tot_pg is not None:
+        with st.sidebar:
+            st.divider()
+            c_mapa_titulo, c_mapa_refresh = st.columns([4,1])
+            c_mapa_titulo.markdown(f"### 🗺️ Mapa {letra}")
+            if c_mapa_refresh.button("🔄"):
+                forcar_atualizacao_mapa()
+                st.rerun()
 
-        if 'dados_mapa_cache' not in st.session_state: forcar_atualizacao_mapa()
-        df_bd = st.session_state['dados_mapa_cache']
-        chave_atual = f"{site} | {letra}"
+            chave_atual = f"{site} | {letra}"
         
-        paginas_em_andamento_bd = set()
-        if not df_bd.empty and 'chave' in df_bd.columns and 'pagina' in df_bd.columns:
-            filtro = df_bd[(df_bd["chave"] == chave_atual) & (df_bd["status"] == "Em andamento")]
-            paginas_em_andamento_bd = set(filtro["pagina"].astype(int).tolist())
-
-        set_feitas = set(feitas_pg)
-        dados_mapa = []
-        for i in range(1, tot_pg + 1):
-            if i in set_feitas: dados_mapa.append({"Pág": i, "Status": "✅", "Selecionar": True, "bloqueado": True})
-            elif i in paginas_em_andamento_bd: dados_mapa.append({"Pág": i, "Status": "🟡", "Selecionar": True, "bloqueado": False})
-            else: dados_mapa.append({"Pág": i, "Status": "", "Selecionar": False, "bloqueado": False})
-
-        df_mapa = pd.DataFrame(dados_mapa)
+            try: paginas_em_andamento_bd = get_repositorio().paginas_reservadas(chave_atual)
+            except: paginas_em_andamento_bd = set()
+
+            reservadas = ConjuntoPaginas(paginas_em_andamento_bd)
+            nova_selecao = None
+            if tot_pg <= LIMITE_MAPA_DETALHADO:
+                inicio_bloco, fim_bloco = 1, tot_pg
+                key_editor = f"editor_event_{letra}"
+            else:
+                # Letra grande: resumo por blocos e só o bloco escolhido página a página
+                st.dataframe(resumir_blocos(tot_pg, feitas_pg, reservadas), hide_index=True, use_container_width=True, height=200)
+                blocos = [(i, min(i + TAMANHO_BLOCO - 1, tot_pg)) for i in range(1, tot_pg + 1, TAMANHO_BLOCO)]
+                inicio_bloco, fim_bloco = st.selectbox("Bloco", blocos, format_func=lambda b: f"Páginas {b[0]}-{b[1]}", key=f"bloco_mapa_{letra}")
+                key_editor = f"editor_event_{letra}_{inicio_bloco}"
+
+                faixa_txt = st.text_input("Faixa (vazio = bloco inteiro)", placeholder="ex.: 150-320", key=f"faixa_mapa_{letra}")
+                faixa = ConjuntoPaginas.ler(faixa_txt, limite=tot_pg) if faixa_txt.strip() else ConjuntoPaginas.intervalo(inicio_bloco, fim_bloco)
+                c_reservar, c_liberar = st.columns(2)
+                if c_reservar.button("🟡 Reservar", use_container_width=True): nova_selecao = (reservadas | faixa) - feitas_pg
+                if c_liberar.button("↩️ Liberar", use_container_width=True): nova_selecao = (reservadas - faixa) - feitas_pg
+
+            df_mapa = montar_mapa_paginas(inicio_bloco, fim_bloco, feitas_pg, reservadas)
         
-        df_editado = st.data_editor(
-            df_mapa,
-            column_config={
-                "Pág": st.column_config.NumberColumn("Página", disabled=True, format="%d", width="small"),
-                "Status": st.column_config.TextColumn("Status", disabled=True, width="small"),
-                "Selecionar": st.column_config.CheckboxColumn("Trabalhar", default=False, width="small"),
-                "bloqueado": None
-            },
-            disabled=["Pág", "Status", "bloqueado"],
-            hide_index=True, use_container_width=True, height=300, key=f"editor_event_{letra}"
-        )
-
-        selecao_final = set(df_editado[(df_editado["Selecionar"] == True) & (df_editado["bloqueado"] == False)]["Pág"].tolist())
-
-        if selecao_final != paginas_em_andamento_bd:
-            try:
-                client = get_client_google()
-                sheet_acompanhamento = client.open("Sistema_Associacao").worksheet("acompanhamento_paginas")
-                
-                novas = selecao_final - paginas_em_andamento_bd
-                rows_to_add = []
-                for p in novas: rows_to_add.append([chave_atual, letra, int(p), "Em andamento"])
-                if rows_to_add: sheet_acompanhamento.append_rows(rows_to_add)
-
-                removidas = paginas_em_andamento_bd - selecao_final
-                if removidas:
-                    dados_atuais = sheet_acompanhamento.get_all_records()
-                    linhas_para_deletar = []
-                    for idx, row in enumerate(dados_atuais):
-                        if row['chave'] == chave_atual and int(row['pagina']) in removidas:
-                            linhas_para_deletar.append(idx + 2)
-                    for l in sorted(linhas_para_deletar, reverse=True):
-                        try:
-                            sheet_acompanhamento.delete_row(l)
-                            time.sleep(0.8)
-                        except: pass
-
-                forcar_atualizacao_mapa()
-                st.session_state['selecao_mapa_cache'] = list(selecao_final)
-                st.rerun()
-            except Exception as e: st.error(f"Erro ao salvar seleção: {e}")
-        else:
-             st.session_state['selecao_mapa_cache'] = list(paginas_em_andamento_bd)
+            df_editado = st.data_editor(
+                df_mapa,
+                column_config={
+                    "Pág": st.column_config.NumberColumn("Página", disabled=True, format="%d", width="small"),
+                    "Status": st.column_config.TextColumn("Status", disabled=True, width="small"),
+                    "Selecionar": st.column_config.CheckboxColumn("Trabalhar", default=False, width="small"),
+                    "bloqueado": None
+                },
+                disabled=["Pág", "Status", "bloqueado"],
+                hide_index=True, use_container_width=True, height=300, key=key_editor
+            )
+
+            selecao_bloco = df_editado[(df_editado["Selecionar"] == True) & (df_editado["bloqueado"] == False)]["Pág"].tolist()
+            # Fora do bloco exibido a reserva continua como está
+            fora_do_bloco = (reservadas - feitas_pg) - ConjuntoPaginas.intervalo(inicio_bloco, fim_bloco)
+            selecao_final = set(nova_selecao if nova_selecao is not None else fora_do_bloco | selecao_bloco)
+
+            if selecao_final != paginas_em_andamento_bd:
+                try:
+                    # Só a diferença é aplicada, em lote
+                    get_repositorio().sincronizar_reservas(chave_atual, letra, selecao_final)
+                    st.session_state['selecao_mapa_cache'] = list(selecao_final)
+                    st.rerun()
+                except Exception as e: st.error(f"Erro ao salvar seleção: {e}")
+            else:
+                 st.session_state['selecao_mapa_cache'] = list(paginas_em_andamento_bd)
 
-        st.sidebar.divider()
+            st.sidebar.divider()
 # ==============================================================================
 # 7. FORMULÁRIO DE TRABALHO
 # ==============================================================================
 
-if st.session_state.status == "PARADO":
-    if not bloq_total:
-        c_btn = st.columns(3)
-        feitas_safe = feitas_pg if isinstance(feitas_pg, list) else []
-        txt_btn = "▶️ RETOMAR" if feitas_safe else "▶️ INICIAR"
+with telemetria.secao("formulario"):
+    if st.session_state.status == "PARADO":
+        if not bloq_total:
+            c_btn = st.columns(3)
+            txt_btn = "▶️ RETOMAR" if feitas_pg else "▶️ INICIAR"
         
-        if c_btn[0].button(txt_btn, type="primary", use_container_width=True):
-            erro_msg = ""
-            try:
-                with st.spinner("Iniciando..."):
-                    # Força busca no banco para evitar erro de variável vazia
-                    t_fresh, f_fresh, q_fresh = buscar_status_paginas(site, letra)
-                    val_tot = t_fresh if t_fresh else (tot_pg if tot_pg else 1)
-                    val_ult = q_fresh if q_fresh else (qtd_ultima if qtd_ultima else 100)
+            if c_btn[0].button(txt_btn, type="primary", use_container_width=True):
+                erro_msg = ""
+                try:
+                    with st.spinner("Iniciando..."):
+                        # Força busca no banco para evitar erro de variável vazia
+                        t_fresh, f_fresh, q_fresh = buscar_status_paginas(site, letra, atualizar_logs=True)
+                        val_tot = t_fresh if t_fresh else (tot_pg if tot_pg else 1)
+                        val_ult = q_fresh if q_fresh else (qtd_ultima if qtd_ultima else 100)
                     
-                    st.session_state.mem_tot = val_tot
-                    st.session_state.mem_feit = f_fresh
-                    st.session_state.mem_ult = val_ult
+                        st.session_state.mem_tot = val_tot
+                        st.session_state.mem_feit = f_fresh
+                        st.session_state.mem_ult = val_ult
 
-                    if not f_fresh: 
-                        salvar_progresso(site, letra, val_tot, [], usuario, val_ult)
+                        if not f_fresh: 
+                            salvar_progresso(site, letra, val_tot, [], usuario, val_ult)
 
-                    acao_log = "RETOMADA" if f_fresh else "INICIO"
-                    registrar_log(usuario, site, letra, acao_log, val_tot, [], val_ult)
+                        acao_log = "RETOMADA" if f_fresh else "INICIO"
+                        registrar_log(usuario, site, letra, acao_log, val_tot, [], val_ult)
                     
-                    forcar_atualizacao_mapa()
-                    st.session_state.status = "TRABALHANDO"
-                    st.rerun()
-            except Exception as e:
-                st.error(f"Erro: {e}")
-    else: st.info("Selecione outra letra.")
+                        st.session_state.status = "TRABALHANDO"
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"Erro: {e}")
+        else: st.info("Selecione outra letra.")
 
-elif st.session_state.status == "TRABALHANDO":
+    elif st.session_state.status == "TRABALHANDO":
     
-    if st.session_state.get('mem_tot') is None:
-         with st.spinner("Sincronizando..."):
-             tot, feitas, qtd_ult = buscar_status_paginas(site, letra)
-             st.session_state.mem_tot = tot
-             st.session_state.mem_feit = feitas
-             st.session_state.mem_ult = qtd_ult
-             st.rerun()
-
-    with st.form(key="form_trabalho", clear_on_submit=False):
-        st.markdown("### 📝 Marque o que você concluiu:")
-        
-        try: total_loop = int(st.session_state.mem_tot)
-        except: total_loop = 1
-        todas_reload = list(range(1, total_loop+1))
+        if st.session_state.get('mem_tot') is None:
+             with st.spinner("Sincronizando..."):
+                 tot, feitas, qtd_ult = buscar_status_paginas(site, letra)
+                 st.session_state.mem_tot = tot
+                 st.session_state.mem_feit = feitas
+                 st.session_state.mem_ult = qtd_ult
+                 st.rerun()
+
+        with st.form(key="form_trabalho", clear_on_submit=False):
+            st.markdown("### 📝 Marque o que você concluiu:")
         
-        lista_feitas = st.session_state.mem_feit if isinstance(st.session_state.mem_feit, list) else []
-        faltam_reload = [p for p in todas_reload if p not in lista_feitas]
+            try: total_loop = int(st.session_state.mem_tot)
+            except: total_loop = 1
+            lista_feitas = ConjuntoPaginas(st.session_state.mem_feit or ())
+            conjunto_faltam = ConjuntoPaginas.intervalo(1, total_loop) - lista_feitas
+            faltam_reload = list(conjunto_faltam)
         
-        default_mapa = st.session_state.get('selecao_mapa_cache', [])
-        default_valido = [x for x in default_mapa if x in faltam_reload]
+            default_mapa = st.session_state.get('selecao_mapa_cache', [])
+            default_valido = [x for x in default_mapa if x in conjunto_faltam]
 
-        sel_agora = st.multiselect("Selecione as páginas:", options=faltam_reload, default=default_valido)
-        st.write("") 
+            sel_agora = st.multiselect("Selecione as páginas:", options=faltam_reload, default=default_valido)
+            st.write("") 
         
-        c_form1, c_form2 = st.columns(2)
-        submit_pause = c_form1.form_submit_button("⏸ PAUSAR (Sair)", use_container_width=True)
-        submit_finish = c_form2.form_submit_button("✅ FINALIZAR", type="primary", use_container_width=True)
+            c_form1, c_form2 = st.columns(2)
+            submit_pause = c_form1.form_submit_button("⏸ PAUSAR (Sair)", use_container_width=True)
+            submit_finish = c_form2.form_submit_button("✅ FINALIZAR", type="primary", use_container_width=True)
         
-        tot_safe = st.session_state.mem_tot
-        ult_safe = st.session_state.mem_ult
-
-        if submit_pause:
-            with st.spinner("Salvando..."): 
-                registrar_log(usuario, site, letra, "PAUSA", tot_safe, sel_agora, ult_safe)
-                if sel_agora:
-                    salvar_progresso(site, letra, tot_safe, sel_agora, usuario, ult_safe)
-                    if isinstance(st.session_state.mem_feit, list):
-                        st.session_state.mem_feit += sel_agora
+            tot_safe = st.session_state.mem_tot
+            ult_safe = st.session_state.mem_ult
+
+            if submit_pause:
+                with st.spinner("Salvando..."): 
+                    registrar_log(usuario, site, letra, "PAUSA", tot_safe, sel_agora, ult_safe)
+                    if sel_agora:
+                        salvar_progresso(site, letra, tot_safe, sel_agora, usuario, ult_safe)
+                        st.session_state.mem_feit = ConjuntoPaginas(st.session_state.mem_feit or ()) | sel_agora
                 
-                st.session_state['resumo_dia'] = calcular_resumo_diario(usuario) 
-                st.session_state.status = "PARADO"
-                st.rerun()
-        
-        if submit_finish:
-            if faltam_reload and len(sel_agora) == len(faltam_reload):
-                with st.spinner("Finalizando..."):
-                    registrar_log(usuario, site, letra, "FIM", tot_safe, sel_agora, ult_safe)
-                    salvar_progresso(site, letra, tot_safe, sel_agora, usuario, ult_safe)
-                    
                     st.session_state['resumo_dia'] = calcular_resumo_diario(usuario) 
                     st.session_state.status = "PARADO"
-                    st.balloons()
-                    time.sleep(1)
                     st.rerun()
-            else:
-                st.warning(f"⚠️ Marque todas as páginas para finalizar.")
+        
+            if submit_finish:
+                if faltam_reload and len(sel_agora) == len(faltam_reload):
+                    with st.spinner("Finalizando..."):
+                        registrar_log(usuario, site, letra, "FIM", tot_safe, sel_agora, ult_safe)
+                        salvar_progresso(site, letra, tot_safe, sel_agora, usuario, ult_safe)
+                    
+                        st.session_state['resumo_dia'] = calcular_resumo_diario(usuario) 
+                        st.session_state.status = "PARADO"
+                        st.balloons()
+                        time.sleep(1)
+                        st.rerun()
+                else:
+                    st.warning(f"⚠️ Marque todas as páginas para finalizar.")
 
 # ==============================================================================
 # 8. RODAPÉ - VISÃO GERAL
 # ==============================================================================
 st.divider()
-exibir_resumo_geral(site, REGRAS_EXCLUSAO)
+eh_admin = st.session_state['usuario_logado'] in st.secrets.get("admins", [])
+with telemetria.secao("resumo_az"):
+    aguardar('pre_progresso')
+    exibir_resumo_geral(site, SITES_DO_BANCO, REGRAS_EXCLUSAO)
+    if eh_admin:
+        exibir_matriz_sites(SITES_DO_BANCO, REGRAS_EXCLUSAO)
+        exibir_cadastro_lote(SITES_DO_BANCO, REGRAS_EXCLUSAO, usuario)
+        exibir_produtividade()
+        exibir_arquivo_logs()
+
+if eh_admin:
+    with st.sidebar: exibir_painel_telemetria(telemetria)
+telemetria.finalizar_rerun()
@@ -0,0 +1,1478 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+import gspread
+
+from cota import AGENDADOR, ESCRITA, RESUMO, SemCota
+from paginas import ConjuntoPaginas
+from telemetria import instrumentar
+
+# ==============================================================================
+# 1. ESTRUTURA DAS ABAS
+# ==============================================================================
+
+NOME_PLANILHA = "Sistema_Associacao"
+
+ABA_CONTROLE = "Controle_Paginas"
+ABA_LOGS = "Logs"
+ABA_ACOMPANHAMENTO = "acompanhamento_paginas"
+ABA_CADASTRO = "cadastro_varreduras"
+ABA_PRODUCAO = "Producao_Diaria"
+
+# Ordem das colunas igual à planilha (a escrita no Sheets é posicional)
+# Revisao: versão da linha, incrementada a cada gravação de progresso (compare-and-set)
+COLUNAS_CONTROLE = ["Chave", "Site", "Letra", "Qtd_Paginas", "Paginas_Concluidas", "Qtd_Ultima_Pag", "Ultimo_Operador",
+                    "Revisao"]
+COLUNAS_LOGS = ["ID_Sessao", "Operador", "Site", "Letra", "Acao", "Data_Hora", "Timestamp",
+                "Tempo_Decorrido", "Paginas_Turno", "Total_Paginas", "Qtd_Total"]
+COLUNAS_ACOMPANHAMENTO = ["chave", "letra", "pagina", "status"]
+STATUS_RESERVA = "Em andamento"
+COLUNAS_CADASTRO = ["Cliente", "Concorrente", "Delete_Letras"]
+# Agregado por (operador, dia), mantido pelo registrar_log
+COLUNAS_PRODUCAO = ["Chave", "Operador", "Data", "Segundos", "Paginas", "Produtos"]
+
+# Meses fechados saem da aba Logs para partições mensais (abas Logs_AAAA_MM)
+PARTICAO_LOGS = re.compile(rf"^{ABA_LOGS}_(\d{{4}}_\d{{2}})$")
+DATA_LOG = re.compile(r"^(\d{2})/(\d{2})/(\d{4})")
+
+
+# Abas lidas por posição de coluna (ler_colunas); as partições seguem COLUNAS_LOGS
+COLUNAS_POR_ABA = {ABA_CONTROLE: COLUNAS_CONTROLE, ABA_LOGS: COLUNAS_LOGS, ABA_ACOMPANHAMENTO: COLUNAS_ACOMPANHAMENTO}
+# Listagem completa de cada aba, usada pela versão genérica do ler_colunas
+LISTAGENS = {ABA_CADASTRO: "listar_varreduras", ABA_CONTROLE: "listar_controle", ABA_LOGS: "listar_logs",
+             ABA_ACOMPANHAMENTO: "listar_reservas"}
+
+
+def aba_particao(mes):
+    return f"{ABA_LOGS}_{mes}"
+
+
+def mes_do_log(data_hora):
+    """'dd/mm/aaaa hh:mm:ss' -> 'aaaa_mm' (None se não estiver nesse formato)"""
+    m = DATA_LOG.match(str(data_hora))
+    return f"{m.group(3)}_{m.group(2)}" if m else None
+
+
+
+class ConflitoDeRevisao(Exception):
+    """A linha mudou em todas as tentativas de compare-and-set"""
+
+
+def revisao_de(registro):
+    """Revisao da linha do Controle_Paginas (0 se não existe ou está em branco)"""
+    if not registro: return 0
+    try: return int(float(registro.get('Revisao') or 0))
+    except (TypeError, ValueError): return 0
+
+
+def mesclar_progresso(atual, registro, novas):
+    """`registro` com Paginas_Concluidas = páginas já gravadas em `atual` + `novas`, até o total"""
+    total = int(registro['Qtd_Paginas'])
+    feitas = ConjuntoPaginas.ler(atual['Paginas_Concluidas'], limite=total) if atual else ConjuntoPaginas()
+    novas = ConjuntoPaginas.ler(novas, limite=total) if isinstance(novas, str) else ConjuntoPaginas(novas)
+    conjunto = (feitas | novas).ate(total)
+    # O apóstrofo mantém a célula como texto no Sheets
+    return dict(registro, Paginas_Concluidas="'" + conjunto.texto())
+
+
+def letra_coluna(n):
+    """Número da coluna (1 = A) para a letra no formato A1"""
+    letras = ""
+    while n > 0:
+        n, resto = divmod(n - 1, 26)
+        letras = chr(ord("A") + resto) + letras
+    return letras
+
+
+
+
+class Repositorio(ABC):
+    """Interface única para as quatro abas do sistema.
+
+    Os registros trafegam como dicionários com os mesmos nomes de coluna da
+    planilha (o formato do `get_all_records`), e as linhas novas como listas na
+    ordem de `COLUNAS_*`.
+    """
+
+    # --- cadastro_varreduras ---
+    @abstractmethod
+    def listar_varreduras(self):
+        raise NotImplementedError
+
+    # --- Controle_Paginas ---
+    @abstractmethod
+    def listar_controle(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def buscar_controle(self, chave):
+        """Retorna o registro da chave ou None"""
+        raise NotImplementedError
+
+    def buscar_letra(self, chave, atualizar_logs=False):
+        """(registro do Controle_Paginas ou None, páginas reservadas) da chave, lidos juntos.
+
+        Com `atualizar_logs`, o backend pode trazer na mesma ida as linhas novas
+        dos Logs, para a checagem de duplicidade do registrar_log sair da memória.
+        """
+        return self.buscar_controle(chave), self.paginas_reservadas(chave)
+
+    @abstractmethod
+    def salvar_controle(self, registro):
+        """Atualiza a linha da chave (registro['Chave']) ou cria se não existir"""
+        raise NotImplementedError
+
+    def salvar_controles(self, registros):
+        """Mesmo que `salvar_controle`, para várias chaves de uma vez"""
+        for registro in registros: self.salvar_controle(registro)
+
+    def chaves_controle(self):
+        """Todas as Chaves já cadastradas (conjunto)"""
+        return {str(r.get('Chave', '')).strip() for r in self.listar_controle()} - {''}
+
+    @abstractmethod
+    def salvar_controle_se(self, registro, revisao, conferida=False):
+        """Compare-and-set: grava só se a Revisao da linha ainda for `revisao` (0 = chave nova).
+
+        Com `conferida=True` o chamador acabou de ler a linha com essa revisão e
+        o backend pode gravar sem relê-la. Retorna (True, None) se gravou, ou
+        (False, registro atual) se outra sessão gravou antes.
+        """
+        raise NotImplementedError
+
+    def registrar_progresso(self, registro, novas, tentativas=5):
+        """Grava o registro somando `novas` às páginas já concluídas na linha.
+
+        A união parte da linha lida agora, nunca do cache, para não somar sobre
+        um estado velho; em conflito, refaz a união sobre a linha relida e tenta de novo.
+        No SQLite a garantia é total; no Sheets vale o que salvar_controle_se
+        consegue conferir (ver RepositorioSheets.salvar_controle_se).
+        """
+        chave = registro['Chave']
+        # As releituras fazem parte da escrita: mesma prioridade na cota
+        with AGENDADOR.prioridade(ESCRITA):
+            atual = self.buscar_controle(chave)
+            for _ in range(tentativas):
+                revisao = revisao_de(atual)
+                novo = dict(mesclar_progresso(atual, registro, novas), Revisao=revisao + 1)
+                gravou, atual = self.salvar_controle_se(novo, revisao, conferida=True)
+                if gravou: return novo
+        raise ConflitoDeRevisao(f"{chave}: a linha mudou em {tentativas} tentativas seguidas")
+
+    # --- Logs ---
+    @abstractmethod
+    def anexar_log(self, linha):
+        raise NotImplementedError
+
+    def anexar_logs(self, linhas):
+        for linha in linhas: self.anexar_log(linha)
+
+    @abstractmethod
+    def ultima_acao(self, operador):
+        """Última `Acao` registrada pelo operador (ou None)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def logs_do_dia(self, operador, data):
+        """Logs do operador cujo Data_Hora começa com `data` (dd/mm/aaaa)"""
+        raise NotImplementedError
+
+    def logs_da_data(self, data):
+        """Logs de todos os operadores cujo Data_Hora começa com `data` (dd/mm/aaaa)"""
+        return [row for row in self.listar_logs() if str(row.get('Data_Hora', '')).startswith(data)]
+
+    @abstractmethod
+    def listar_logs(self):
+        """Todas as linhas da aba quente (Logs), sem as partições"""
+        raise NotImplementedError
+
+    def particoes_logs(self):
+        """Meses já arquivados ('aaaa_mm'), em ordem"""
+        return []
+
+    @abstractmethod
+    def listar_particao_logs(self, mes):
+        raise NotImplementedError
+
+    @abstractmethod
+    def arquivar_logs(self, ate_mes):
+        """Move os logs dos meses anteriores a `ate_mes` para as partições; devolve {mês: linhas}"""
+        raise NotImplementedError
+
+    # --- Producao_Diaria ---
+    @abstractmethod
+    def buscar_producao(self, operador, data):
+        """(segundos, páginas, produtos) do operador no dia, ou None se ainda não existe"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def somar_producao(self, operador, data, segundos, paginas, produtos):
+        raise NotImplementedError
+
+    @abstractmethod
+    def definir_producao(self, operador, data, segundos, paginas, produtos):
+        raise NotImplementedError
+
+    # --- acompanhamento_paginas ---
+    @abstractmethod
+    def listar_reservas(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def adicionar_reservas(self, linhas):
+        raise NotImplementedError
+
+    @abstractmethod
+    def remover_reservas(self, chave, paginas):
+        raise NotImplementedError
+
+    def paginas_reservadas(self, chave):
+        """Páginas da chave com status "Em andamento" """
+        paginas = set()
+        for row in self.listar_reservas():
+            if row.get('chave') == chave and row.get('status') == STATUS_RESERVA:
+                try: paginas.add(int(row['pagina']))
+                except (TypeError, ValueError): pass
+        return paginas
+
+    def reservas_por_chave(self):
+        """{chave: quantidade de páginas "Em andamento"} de todas as chaves"""
+        contagem = {}
+        for row in self.listar_reservas():
+            if row.get('status') == STATUS_RESERVA:
+                contagem[row.get('chave')] = contagem.get(row.get('chave'), 0) + 1
+        return contagem
+
+    def recarregar_reservas(self):
+        """Avisa que a aba pode ter mudado; a próxima leitura confere com o backend"""
+
+    def sincronizar_reservas(self, chave, letra, paginas):
+        """Deixa a chave com exatamente `paginas` reservadas, aplicando só a diferença"""
+        atuais = self.paginas_reservadas(chave)
+        novas = set(paginas) - atuais
+        removidas = atuais - set(paginas)
+        if novas: self.adicionar_reservas([[chave, letra, int(p), STATUS_RESERVA] for p in sorted(novas)])
+        if removidas: self.remover_reservas(chave, removidas)
+        return novas, removidas
+
+    # --- Leitura por colunas ---
+    def ler_colunas(self, aba, colunas):
+        """{coluna: [valores]} só das `colunas` da aba (ou partição Logs_AAAA_MM), sem o cabeçalho.
+
+        Esta versão recorta as listagens completas; os backends leem só as colunas pedidas.
+        """
+        particao = PARTICAO_LOGS.match(aba)
+        registros = self.listar_particao_logs(particao.group(1)) if particao else getattr(self, LISTAGENS[aba])()
+        return {c: [row.get(c, '') for row in registros] for c in colunas}
+
+    def conectar(self):
+        """Abre a conexão com o backend antes do primeiro uso (autorização, handles das abas)"""
+
+    def estado_escrita(self):
+        """Escritas ainda não enviadas ao backend (ver fila_escrita.FilaEscrita)"""
+        return {"pendentes": 0, "falhas": 0, "ultimo_erro": None}
+
+
+# ==============================================================================
+# 2. GOOGLE SHEETS
+# ==============================================================================
+
+def linha_do_intervalo(intervalo):
+    """Primeira linha de um intervalo A1 ('Controle_Paginas!A15:G15' -> 15)"""
+    m = re.search(r"[A-Z]+(\d+)", intervalo.split("!")[-1])
+    return int(m.group(1)) if m else None
+
+
+def numero_ou_texto(valor):
+    if isinstance(valor, float) and valor.is_integer(): return int(valor)
+    return valor
+
+
+class IndiceChaves:
+    """Mapa Chave -> número da linha de uma aba, mantido em memória.
+
+    A coluna A é lida por inteiro só quando o índice vence (`ttl`); fora isso,
+    chaves desconhecidas disparam uma leitura incremental apenas das linhas
+    novas (abaixo da última linha conhecida). As linhas lidas ficam guardadas
+    junto, para que um salvamento não precise reler a planilha.
+    """
+
+    def __init__(self, ttl=600, ttl_linha=900):
+        self.ttl = ttl
+        self.ttl_linha = ttl_linha
+        self.linhas = {}
+        self.registros = {}
+        self.ultima_linha = 1
+        self.carregado_em = 0
+        self.lock = threading.RLock()
+
+    def vencido(self):
+        return time.time() - self.carregado_em > self.ttl
+
+    def recarregar(self, chaves, inicio=1):
+        """Aplica os valores da coluna A a partir da linha `inicio` (1 = cabeçalho)"""
+        with self.lock:
+            if inicio <= 1:
+                self.linhas = {}
+                self.registros = {}
+                self.carregado_em = time.time()
+            for i, c in enumerate(chaves):
+                linha = inicio + i
+                c = str(c).strip()
+                if linha > 1 and c: self.linhas[c] = linha
+            self.ultima_linha = max(self.ultima_linha if inicio > 1 else 1, inicio + len(chaves) - 1)
+
+    def linha(self, chave):
+        with self.lock: return self.linhas.get(chave)
+
+    def registrar(self, chave, linha, registro=None):
+        with self.lock:
+            self.linhas[chave] = linha
+            self.ultima_linha = max(self.ultima_linha, linha)
+            if registro is not None: self.registros[chave] = (registro, time.time())
+
+    def registro(self, chave):
+        """Última versão conhecida da linha, se ainda estiver na validade"""
+        with self.lock:
+            item = self.registros.get(chave)
+            if item and time.time() - item[1] <= self.ttl_linha: return dict(item[0])
+            return None
+
+
+def normalizar_linha(valores):
+    valores = [str(numero_ou_texto(v)) for v in valores]
+    while valores and valores[-1] == '': valores.pop()
+    return valores
+
+
+class LeitorLogs:
+    """Leitura incremental da aba Logs, que só cresce.
+
+    Guarda a última linha ingerida e, a cada atualização, lê apenas o intervalo
+    a partir dela. A primeira linha devolvida precisa ser igual à última já
+    conhecida; se não for (linhas apagadas ou movidas), a aba é relida inteira.
+    Mantém a última `Acao` de cada operador e as linhas do dia corrente por
+    operador, então a checagem de duplicidade e o resumo diário custam apenas
+    as linhas novas.
+    """
+
+    # Toda leitura da aba (aqui e no lote do buscar_letra) usa a mesma renderização:
+    # com FORMATTED_VALUE uma célula formatada ("1.234") não bateria com a conferência
+    RENDERIZACAO = "UNFORMATTED_VALUE"
+
+    def __init__(self, intervalo_minimo=2.0):
+        self.intervalo_minimo = intervalo_minimo
+        self.cabecalho = []
+        self.ultima_linha = 0
+        self.ultimos_valores = None
+        self.ultima_acao = {}
+        self.dia = None
+        self.do_dia = {}
+        self.lido_em = 0
+        self.lock = threading.RLock()
+
+    def _normalizar(self, valores):
+        return normalizar_linha(valores)
+
+    def _ingerir(self, valores):
+        valores = self._normalizar(valores)
+        self.ultima_linha += 1
+        self.ultimos_valores = valores
+        if not valores: return
+        registro = dict(zip(self.cabecalho, valores + [''] * (len(self.cabecalho) - len(valores))))
+        operador = str(registro.get('Operador', ''))
+        self.ultima_acao[operador] = registro.get('Acao')
+
+        dia = str(registro.get('Data_Hora', ''))[:10]
+        if dia != self.dia:
+            try: novo = datetime.strptime(dia, "%d/%m/%Y")
+            except ValueError: return
+            if self.dia is not None and novo < datetime.strptime(self.dia, "%d/%m/%Y"): return
+            self.dia, self.do_dia = dia, {}
+        self.do_dia.setdefault(operador, []).append(registro)
+
+    def _carregar_tudo(self, valores):
+        self.cabecalho = [str(c) for c in valores[0]] if valores else list(COLUNAS_LOGS)
+        self.ultima_linha = 1
+        self.ultimos_valores = self._normalizar(self.cabecalho)
+        self.ultima_acao, self.dia, self.do_dia = {}, None, {}
+        for linha in valores[1:]: self._ingerir(linha)
+
+    def precisa_atualizar(self):
+        return time.time() - self.lido_em >= self.intervalo_minimo
+
+    def intervalo_novas(self):
+        """(linha inicial, intervalo) da última linha ingerida até o fim; intervalo None
+        se a aba ainda não foi lida inteira"""
+        with self.lock:
+            if self.ultima_linha == 0: return 0, None
+            colunas = letra_coluna(max(len(self.cabecalho), len(COLUNAS_LOGS)))
+            return self.ultima_linha, f"A{self.ultima_linha}:{colunas}"
+
+    def ingerir_novas(self, novas, inicio):
+        """Ingere o que veio de `intervalo_novas` (lido a partir da linha `inicio`);
+        False se a aba mudou e precisa ser relida"""
+        with self.lock:
+            # Outra thread pode ter ingerido parte destas linhas enquanto elas chegavam
+            pular = self.ultima_linha - inicio
+            if pular < 0: return False
+            if pular >= len(novas): return bool(novas)
+            # novas[pular] é a última linha já ingerida, relida só para conferência
+            if self._normalizar(novas[pular]) != self.ultimos_valores: return False
+            for linha in novas[pular + 1:]: self._ingerir(linha)
+            self.lido_em = time.time()
+            return True
+
+    def atualizar(self, sheet, forcar=False):
+        # As leituras ficam fora do lock: uma leitura de resumo esperando ficha da
+        # cota não pode segurar quem só consulta a memória (ultima_acao, anexos)
+        with self.lock:
+            if not forcar and not self.precisa_atualizar(): return
+        inicio, intervalo = self.intervalo_novas()
+        if intervalo is not None and \
+                self.ingerir_novas(sheet.get_values(intervalo, value_render_option=self.RENDERIZACAO), inicio): return
+        valores = sheet.get_all_values(value_render_option=self.RENDERIZACAO)
+        with self.lock:
+            self._carregar_tudo(valores)
+            self.lido_em = time.time()
+
+    def reiniciar(self):
+        """Linhas foram apagadas da aba (arquivamento): a próxima leitura é completa"""
+        with self.lock: self.ultima_linha, self.lido_em = 0, 0
+
+    def anotar_anexo(self, linha, valores):
+        """Ingere uma linha que nós mesmos anexamos, se ela for a próxima esperada"""
+        with self.lock:
+            if self.ultima_linha and linha == self.ultima_linha + 1: self._ingerir(valores)
+
+    def acao_do_operador(self, operador):
+        with self.lock: return self.ultima_acao.get(str(operador))
+
+    def _linhas_do_dia(self, data, operadores):
+        if self.dia is None: return []
+        if data == self.dia: return [dict(r) for op in operadores for r in self.do_dia.get(op, [])]
+        try: posterior = datetime.strptime(data, "%d/%m/%Y") > datetime.strptime(self.dia, "%d/%m/%Y")
+        except ValueError: return None
+        return [] if posterior else None
+
+    def registros_do_dia(self, operador, data):
+        """Linhas do operador no dia; None para dias anteriores ao que está em memória.
+
+        Um dia posterior ao último da aba (hoje, antes do primeiro log) não tem linhas.
+        """
+        with self.lock: return self._linhas_do_dia(data, [str(operador)])
+
+    def registros_da_data(self, data):
+        """Linhas de todos os operadores no dia, como registros_do_dia"""
+        with self.lock: return self._linhas_do_dia(data, list(self.do_dia))
+
+
+class IndiceReservas:
+    """Linhas da aba acompanhamento_paginas agrupadas por chave.
+
+    Carregado com uma leitura da aba e depois mantido pelas próprias escritas
+    (anexos e exclusões, que deslocam as linhas abaixo). Vence após `ttl`.
+    É um só para o processo: as sessões leem apenas as páginas da sua chave.
+
+    `pedir_conferencia` não descarta nada: a próxima leitura confere se a aba
+    mudou por fora (outra instância do app) lendo só a última linha conhecida e
+    a seguinte, e só relê tudo se elas não baterem. Várias sessões pedindo ao
+    mesmo tempo geram no máximo uma conferência a cada `intervalo_minimo` s.
+    """
+
+    def __init__(self, ttl=600, intervalo_minimo=2.0):
+        self.ttl = ttl
+        self.intervalo_minimo = intervalo_minimo
+        self.linhas = {}
+        self.por_chave = {}
+        self.total_linhas = 0
+        self.carregado_em = 0
+        self.conferido_em = 0
+        self.a_conferir = False
+        self.lock = threading.RLock()
+
+    def vencido(self):
+        return time.time() - self.carregado_em > self.ttl
+
+    def pedir_conferencia(self):
+        self.a_conferir = True
+
+    def precisa_conferir(self):
+        return self.a_conferir and time.time() - self.conferido_em >= self.intervalo_minimo
+
+    def intervalo_sonda(self):
+        """Última linha conhecida e a seguinte (que deve estar vazia), em A1"""
+        ultima = max(self.total_linhas, 1)
+        return f"A{ultima}:{letra_coluna(len(COLUNAS_ACOMPANHAMENTO))}{ultima + 1}"
+
+    def confere(self, valores):
+        """`valores` lidos de `intervalo_sonda` batem com o índice?"""
+        with self.lock:
+            valores = [list(v) for v in valores if any(str(c).strip() for c in v)]
+            if len(valores) != 1: return False
+            esperado = self.linhas.get(self.total_linhas)
+            if esperado is None: return True
+            row = valores[0] + [''] * (3 - len(valores[0]))
+            return str(row[0]) == esperado[0] and str(row[2]) == str(esperado[1])
+
+    def marcar_conferido(self):
+        self.conferido_em = time.time()
+        self.a_conferir = False
+
+    def _incluir(self, linha, chave, pagina, status):
+        try: pagina = int(pagina)
+        except (TypeError, ValueError): return
+        self.linhas[linha] = (chave, pagina, status)
+        self.por_chave.setdefault(chave, set()).add(linha)
+
+    def recarregar(self, valores):
+        with self.lock:
+            self.linhas, self.por_chave = {}, {}
+            cabecalho = [str(c) for c in valores[0]] if valores else COLUNAS_ACOMPANHAMENTO
+            pos = {c: cabecalho.index(c) if c in cabecalho else i for i, c in enumerate(COLUNAS_ACOMPANHAMENTO)}
+            for i, row in enumerate(valores[1:], start=2):
+                row = list(row) + [''] * (len(COLUNAS_ACOMPANHAMENTO) - len(row))
+                self._incluir(i, str(row[pos['chave']]), row[pos['pagina']], str(row[pos['status']]))
+            self.total_linhas = len(valores)
+            self.carregado_em = time.time()
+            self.marcar_conferido()
+
+    def paginas(self, chave):
+        with self.lock:
+            return {self.linhas[l][1] for l in self.por_chave.get(chave, ()) if self.linhas[l][2] == STATUS_RESERVA}
+
+    def contagem(self):
+        with self.lock:
+            contagem = {chave: len(self.paginas(chave)) for chave in self.por_chave}
+        return {chave: n for chave, n in contagem.items() if n}
+
+    def linhas_de(self, chave, paginas):
+        paginas = {int(p) for p in paginas}
+        with self.lock:
+            return sorted(l for l in self.por_chave.get(chave, ()) if self.linhas[l][1] in paginas)
+
+    def anotar_anexo(self, primeira, linhas):
+        with self.lock:
+            for i, row in enumerate(linhas): self._incluir(primeira + i, str(row[0]), row[2], str(row[3]))
+            self.total_linhas = max(self.total_linhas, primeira + len(linhas) - 1)
+
+    def remover_linhas(self, removidas):
+        """Tira as linhas excluídas e sobe as de baixo, como a planilha faz"""
+        removidas = sorted(removidas)
+        with self.lock:
+            antigas = self.linhas
+            self.linhas, self.por_chave = {}, {}
+            for linha, (chave, pagina, status) in antigas.items():
+                pos = bisect_left(removidas, linha)
+                if pos < len(removidas) and removidas[pos] == linha: continue
+                self._incluir(linha - pos, chave, pagina, status)
+            self.total_linhas -= len(removidas)
+
+
+def faixas_contiguas(linhas):
+    """[3, 4, 5, 9] -> [(3, 5), (9, 9)]"""
+    faixas = []
+    for l in sorted(linhas):
+        if faixas and l == faixas[-1][1] + 1: faixas[-1][1] = l
+        else: faixas.append([l, l])
+    return [tuple(f) for f in faixas]
+
+
+class PoolPlanilha:
+    """Client, planilha e abas do gspread abertos uma vez e compartilhados pelo processo.
+
+    Evita o `client.open(...).worksheet(...)` (duas idas ao Google) antes de cada
+    chamada. O token é renovado antes de vencer (`margem_token` segundos), para
+    que a renovação não caia no meio de uma ação do operador; depois de um erro
+    de autenticação, `reconectar` descarta tudo e o próximo uso cria um client novo.
+    """
+
+    def __init__(self, criar_cliente, nome_planilha=NOME_PLANILHA, margem_token=300):
+        self.criar_cliente = criar_cliente
+        self.nome_planilha = nome_planilha
+        self.margem_token = margem_token
+        self.client = None
+        self.planilha = None
+        self.abas = {}
+        self.lock = threading.RLock()
+        self.lock_criacao = threading.Lock()
+
+    def _renovar_token(self):
+        # Credenciais do google-auth (gspread 5 converte as do oauth2client); a
+        # renovação vai ao servidor OAuth, não ao Sheets, então não gasta cota
+        auth = getattr(self.client, "auth", None)
+        if auth is None or not hasattr(auth, "refresh"): return
+        expira = getattr(auth, "expiry", None)  # UTC sem fuso, como o google-auth guarda
+        agora = datetime.now(timezone.utc).replace(tzinfo=None)
+        if getattr(auth, "token", None) and expira and expira - agora > timedelta(seconds=self.margem_token): return
+        from google.auth.transport.requests import Request
+        auth.refresh(Request())
+
+    def _conectar(self):
+        if self.client is None:
+            # Todas as chamadas ao Google passam a ser medidas (telemetria.py)
+            self.client = instrumentar(self.criar_cliente())
+            if self.client is None: raise ConnectionError("Sem conexão com o Google")
+        self._renovar_token()
+
+    # As chamadas ao Google ficam fora de `lock`: quem espera ficha da cota (um
+    # resumo, por exemplo) não segura as sessões cujas abas já estão abertas
+    def _abrir_planilha(self):
+        with self.lock:
+            self._conectar()
+            client, planilha = self.client, self.planilha
+        if planilha is not None: return planilha
+        planilha = client.open(self.nome_planilha)
+        with self.lock:
+            if self.client is client and self.planilha is None: self.planilha = planilha
+        return planilha
+
+    def aba(self, nome, colunas=None):
+        """Handle da aba; com `colunas`, cria a aba (com cabeçalho) se ela não existir"""
+        with self.lock:
+            self._conectar()
+            if nome in self.abas: return self.abas[nome]
+        planilha = self._abrir_planilha()
+        try:
+            sheet = planilha.worksheet(nome)
+        except gspread.exceptions.WorksheetNotFound:
+            if colunas is None: raise
+            with self.lock_criacao:
+                try: sheet = planilha.worksheet(nome)
+                except gspread.exceptions.WorksheetNotFound:
+                    sheet = planilha.add_worksheet(nome, rows=1000, cols=len(colunas))
+                    sheet.append_row(colunas)
+        with self.lock:
+            if self.planilha is not planilha: return sheet
+            return self.abas.setdefault(nome, sheet)
+
+    def titulos(self):
+        """Nomes de todas as abas (uma leitura de metadados)"""
+        return [a.title for a in self._abrir_planilha().worksheets()]
+
+    def reconectar(self):
+        with self.lock:
+            self.client, self.planilha, self.abas = None, None, {}
+
+
+def erro_de_autenticacao(e):
+    if isinstance(e, gspread.exceptions.APIError):
+        return getattr(getattr(e, "response", None), "status_code", None) == 401
+    return type(e).__name__ == "RefreshError"
+
+
+def com_reconexao(metodo):
+    """Refaz a chamada uma vez, com client novo, se o Google recusar a autenticação"""
+    @wraps(metodo)
+    def chamar(self, *args, **kwargs):
+        try:
+            return metodo(self, *args, **kwargs)
+        except Exception as e:
+            if not erro_de_autenticacao(e): raise
+            self.pool.reconectar()
+            return metodo(self, *args, **kwargs)
+    return chamar
+
+
+class UltimasLeituras:
+    """Último resultado de cada leitura de resumo, servido quando falta cota.
+
+    Guarda no máximo `max_entradas` chamadas (sai a usada há mais tempo) e
+    descarta as que têm mais de `validade` segundos.
+    """
+
+    def __init__(self, max_entradas=64, validade=900):
+        self.max_entradas = max_entradas
+        self.validade = validade
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def obter(self, chave):
+        """(lido_em, resultado) ou None"""
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is None: return None
+            if time.time() - item[0] > self.validade:
+                del self.itens[chave]
+                return None
+            self.itens.move_to_end(chave)
+            return item
+
+    def guardar(self, chave, resultado):
+        with self.lock:
+            self.itens[chave] = (time.time(), resultado)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.max_entradas: self.itens.popitem(last=False)
+
+
+def leitura_de_resumo(metodo=None, guardar=None):
+    """Leitura para resumos e métricas: última na fila da cota e, se a cota estiver
+    reservada para escritas e letras, devolve o resultado anterior da mesma chamada.
+
+    `guardar(*args)` falso: a chamada não tem cópia guardada (leituras grandes) e
+    espera na fila em vez de servir resultado velho.
+    """
+    if metodo is None: return lambda m: leitura_de_resumo(m, guardar)
+
+    @wraps(metodo)
+    def ler(self, *args):
+        chave = (metodo.__name__,) + tuple(tuple(a) if isinstance(a, list) else a for a in args)
+        anterior = self.ultimas_leituras.obter(chave)
+        try:
+            with AGENDADOR.prioridade(RESUMO, esperar=anterior is None):
+                resultado = metodo(self, *args)
+        except SemCota:
+            if anterior is None: raise
+            AGENDADOR.anotar("leitura", RESUMO, "velho")
+            return anterior[1]
+        if guardar is None or guardar(*args): self.ultimas_leituras.guardar(chave, resultado)
+        return resultado
+    return ler
+
+
+def aba_pequena(aba, *args):
+    """Abas cuja leitura vale uma cópia em memória (não os Logs nem as partições)"""
+    return aba != ABA_LOGS and not PARTICAO_LOGS.match(aba)
+
+
+class RepositorioSheets(Repositorio):
+    """Implementação sobre o gspread. `criar_cliente` devolve um client autorizado novo."""
+
+    def __init__(self, criar_cliente, nome_planilha=NOME_PLANILHA):
+        self.pool = PoolPlanilha(criar_cliente, nome_planilha)
+        self.indice_controle = IndiceChaves()
+        self.indice_producao = IndiceChaves()
+        self.indice_reservas = IndiceReservas()
+        self.leitor_logs = LeitorLogs()
+        self.lock_producao = threading.Lock()
+        self.cabecalhos_conferidos = set()
+        self.ultimas_leituras = UltimasLeituras()
+
+    def _aba(self, nome, colunas=None):
+        return self.pool.aba(nome, colunas)
+
+    @com_reconexao
+    def conectar(self):
+        for nome in (ABA_CADASTRO, ABA_CONTROLE, ABA_LOGS, ABA_ACOMPANHAMENTO): self._aba(nome)
+
+    @com_reconexao
+    def listar_varreduras(self):
+        return self._aba(ABA_CADASTRO).get_all_records()
+
+    @leitura_de_resumo(guardar=aba_pequena)
+    @com_reconexao
+    def ler_colunas(self, aba, colunas):
+        """Um values_batch_get por coluna (faixas vizinhas juntas), sem as colunas que não foram pedidas"""
+        posicionais = COLUNAS_LOGS if PARTICAO_LOGS.match(aba) else COLUNAS_POR_ABA.get(aba)
+        if posicionais is None: return super().ler_colunas(aba, colunas)
+        try: sheet = self._aba(aba)
+        except gspread.exceptions.WorksheetNotFound:
+            if PARTICAO_LOGS.match(aba): return {c: [] for c in colunas}
+            raise
+        faixas = faixas_contiguas(posicionais.index(c) + 1 for c in set(colunas))
+        res = sheet.spreadsheet.values_batch_get(
+            [f"'{sheet.title}'!{letra_coluna(a)}2:{letra_coluna(b)}" for a, b in faixas],
+            params={"valueRenderOption": "UNFORMATTED_VALUE", "majorDimension": "COLUMNS"})
+        lidas = {}
+        for (a, b), faixa in zip(faixas, res.get("valueRanges", [])):
+            valores = faixa.get("values") or []
+            for i, n in enumerate(range(a, b + 1)): lidas[posicionais[n - 1]] = valores[i] if i < len(valores) else []
+        # O Google corta as células vazias do fim de cada coluna
+        total = max((len(v) for v in lidas.values()), default=0)
+        return {c: list(lidas[c]) + [''] * (total - len(lidas[c])) for c in colunas}
+
+    @leitura_de_resumo
+    @com_reconexao
+    def listar_controle(self):
+        return self._aba(ABA_CONTROLE).get_all_records()
+
+    # --- Linhas por chave (coluna A) ---
+    def _atualizar_indice(self, sheet, indice, chaves):
+        """Garante o índice em dia para as chaves pedidas (no máximo uma leitura)"""
+        if indice.vencido():
+            indice.recarregar(sheet.col_values(1))
+        elif any(indice.linha(c) is None for c in chaves):
+            inicio = indice.ultima_linha + 1
+            novas = sheet.get_values(f"A{inicio}:A")
+            indice.recarregar([r[0] if r else '' for r in novas], inicio)
+
+    def _linha_da_chave(self, sheet, indice, chave):
+        """Linha da chave na aba, atualizando o índice se preciso"""
+        self._atualizar_indice(sheet, indice, [chave])
+        return indice.linha(chave)
+
+    def _ler_linha(self, sheet, linha, colunas):
+        valores = sheet.get_values(f"A{linha}:{letra_coluna(len(colunas))}{linha}",
+                                   value_render_option="UNFORMATTED_VALUE")
+        return self._registro_da_linha(valores, colunas)
+
+    def _registro_da_linha(self, valores, colunas):
+        valores = valores[0] if valores else []
+        valores = list(valores) + [''] * (len(colunas) - len(valores))
+        return {c: numero_ou_texto(v) for c, v in zip(colunas, valores)}
+
+    def _buscar_registro(self, sheet, indice, chave, colunas, usar_cache=False):
+        if usar_cache:
+            registro = indice.registro(chave)
+            if registro is not None: return registro
+        for tentativa in range(2):
+            linha = self._linha_da_chave(sheet, indice, chave)
+            if linha is None: return None
+            registro = self._ler_linha(sheet, linha, colunas)
+            if str(registro[colunas[0]]).strip() == chave:
+                indice.registrar(chave, linha, registro)
+                return registro
+            # A linha mudou de lugar (edição manual na planilha): índice vencido
+            indice.carregado_em = 0
+        return None
+
+    def _gravar_registros(self, sheet, indice, colunas, registros):
+        """Grava linhas inteiras: um batch_update para as chaves que já existem
+        e um append_rows para as novas"""
+        ultima_coluna = letra_coluna(len(colunas))
+        self._atualizar_indice(sheet, indice, [r[colunas[0]] for r in registros])
+        dados, novos = [], []
+        for registro in registros:
+            chave = registro[colunas[0]]
+            valores = [registro.get(c, '') for c in colunas]
+            linha = indice.linha(chave)
+            if linha:
+                dados.append({"range": f"A{linha}:{ultima_coluna}{linha}", "values": [valores]})
+                indice.registrar(chave, linha, dict(zip(colunas, valores)))
+            else:
+                novos.append(valores)
+        if dados: sheet.batch_update(dados, value_input_option="USER_ENTERED")
+        if novos:
+            res = sheet.append_rows(novos)
+            primeira = linha_do_intervalo(res.get("updates", {}).get("updatedRange", "")) if res else None
+            if primeira:
+                for i, valores in enumerate(novos):
+                    indice.registrar(valores[0], primeira + i, dict(zip(colunas, valores)))
+
+    def _gravar_registro(self, sheet, indice, colunas, registro):
+        """Grava a linha inteira em uma chamada (ou anexa, se a chave é nova)"""
+        self._gravar_registros(sheet, indice, colunas, [registro])
+
+    @com_reconexao
+    def buscar_controle(self, chave):
+        return self._buscar_registro(self._aba(ABA_CONTROLE), self.indice_controle, chave, COLUNAS_CONTROLE)
+
+    @com_reconexao
+    def salvar_controle(self, registro):
+        self._gravar_registro(self._aba(ABA_CONTROLE), self.indice_controle, COLUNAS_CONTROLE, registro)
+
+    @com_reconexao
+    def salvar_controles(self, registros):
+        if registros:
+            self._gravar_registros(self._aba(ABA_CONTROLE), self.indice_controle, COLUNAS_CONTROLE, registros)
+
+    @com_reconexao
+    def buscar_letra(self, chave, atualizar_logs=False):
+        """Linha do Controle_Paginas, conferência do acompanhamento e (opcional) linhas novas
+        dos Logs num único values_batch_get.
+
+        Só a chave nova ou que mudou de linha custa uma leitura a mais.
+        """
+        controle, acompanhamento = self._aba(ABA_CONTROLE), self._aba(ABA_ACOMPANHAMENTO)
+        indice, reservas, leitor = self.indice_controle, self.indice_reservas, self.leitor_logs
+        # Trocar de letra é o momento de ver se outra instância mexeu no mapa
+        reservas.pedir_conferencia()
+        faixas = {}
+        linha = indice.linha(chave)
+        if indice.vencido(): faixas["chaves"] = f"'{controle.title}'!A:A"
+        if linha:
+            faixas["linha"] = f"'{controle.title}'!A{linha}:{letra_coluna(len(COLUNAS_CONTROLE))}{linha}"
+        if reservas.vencido(): faixas["reservas"] = f"'{acompanhamento.title}'!A:D"
+        elif reservas.precisa_conferir(): faixas["sonda"] = f"'{acompanhamento.title}'!{reservas.intervalo_sonda()}"
+        inicio, intervalo = leitor.intervalo_novas()
+        if atualizar_logs and leitor.precisa_atualizar() and intervalo: faixas["logs"] = f"'{ABA_LOGS}'!{intervalo}"
+
+        valores = {}
+        if faixas:
+            res = controle.spreadsheet.values_batch_get(list(faixas.values()),
+                                                        params={"valueRenderOption": LeitorLogs.RENDERIZACAO})
+            valores = {nome: [[str(v) for v in l] if nome not in ("linha", "logs") else l for l in (f.get("values") or [])]
+                       for nome, f in zip(faixas, res.get("valueRanges", []))}
+
+        if "logs" in valores and not leitor.ingerir_novas(valores["logs"], inicio):
+            leitor.atualizar(self._aba(ABA_LOGS), forcar=True)
+        elif atualizar_logs and not intervalo:
+            leitor.atualizar(self._aba(ABA_LOGS))
+
+        if "chaves" in valores: indice.recarregar([r[0] if r else '' for r in valores["chaves"]])
+        registro = None
+        if "linha" in valores and indice.linha(chave) == linha:
+            registro = self._registro_da_linha(valores["linha"], COLUNAS_CONTROLE)
+            if str(registro['Chave']).strip() == chave: indice.registrar(chave, linha, registro)
+            else: registro, indice.carregado_em = None, 0
+        if registro is None:
+            registro = self._buscar_registro(controle, indice, chave, COLUNAS_CONTROLE)
+
+        if "reservas" in valores: reservas.recarregar(valores["reservas"])
+        elif "sonda" in valores:
+            if reservas.confere(valores["sonda"]): reservas.marcar_conferido()
+            else: reservas.recarregar(acompanhamento.get_all_values())
+        return registro, reservas.paginas(chave)
+
+    def _garantir_cabecalho(self, sheet, colunas):
+        """Completa o cabeçalho de abas antigas (ex.: sem a coluna Revisao), uma vez por processo"""
+        if sheet.title in self.cabecalhos_conferidos: return
+        atual = (sheet.get_values(f"A1:{letra_coluna(len(colunas))}1") or [[]])[0]
+        if len(atual) < len(colunas):
+            faltam = colunas[len(atual):]
+            sheet.batch_update([{"range": f"{letra_coluna(len(atual) + 1)}1:{letra_coluna(len(colunas))}1",
+                                 "values": [faltam]}])
+        self.cabecalhos_conferidos.add(sheet.title)
+
+    @com_reconexao
+    def salvar_controle_se(self, registro, revisao, conferida=False):
+        """O Sheets não tem escrita condicional, então isto não é um compare-and-set.
+
+        A revisão é conferida na leitura logo antes da escrita (a do chamador,
+        com `conferida`, ou uma releitura da linha) e, depois de gravar, a linha
+        é relida: se as nossas páginas não estão nela, outra sessão gravou por
+        cima e o chamador refaz a união. Ainda sobra uma corrida: se a releitura
+        de conferência de uma sessão termina antes de chegar a escrita de outra
+        que leu a mesma revisão, essa escrita atrasada apaga as páginas da primeira.
+        """
+        chave = registro['Chave']
+        sheet = self._aba(ABA_CONTROLE)
+        self._garantir_cabecalho(sheet, COLUNAS_CONTROLE)
+        if conferida: nova = revisao == 0
+        else:
+            atual = self._buscar_registro(sheet, self.indice_controle, chave, COLUNAS_CONTROLE)
+            if revisao_de(atual) != revisao: return False, atual
+            nova = atual is None
+        self._gravar_registros(sheet, self.indice_controle, COLUNAS_CONTROLE, [registro])
+        if nova: return self._conferir_chave_nova(sheet, chave)
+        gravado = self._buscar_registro(sheet, self.indice_controle, chave, COLUNAS_CONTROLE)
+        nossas = ConjuntoPaginas.ler(registro.get('Paginas_Concluidas', ''))
+        if gravado is None or nossas - ConjuntoPaginas.ler(gravado.get('Paginas_Concluidas', '')): return False, gravado
+        return True, None
+
+    def _excluir_faixas(self, sheet, linhas):
+        """Exclui as `linhas` da aba em um único batchUpdate (uma deleteDimension por faixa)"""
+        # De baixo para cima, para os índices das faixas seguintes não mudarem
+        pedidos = [{"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS",
+                                                  "startIndex": inicio - 1, "endIndex": fim}}}
+                   for inicio, fim in reversed(faixas_contiguas(linhas))]
+        sheet.spreadsheet.batch_update({"requests": pedidos})
+
+    def _conferir_chave_nova(self, sheet, chave):
+        """Depois de anexar uma chave nova: se outra instância anexou a mesma chave
+        ao mesmo tempo, vale a linha mais acima e a nossa é excluída."""
+        indice = self.indice_controle
+        nossa = indice.linha(chave)
+        coluna = sheet.col_values(1)
+        indice.recarregar(coluna)
+        linhas = [i + 1 for i, c in enumerate(coluna) if i > 0 and str(c).strip() == chave]
+        if len(linhas) < 2 or nossa is None or nossa == min(linhas):
+            if linhas: indice.registrar(chave, min(linhas))
+            return True, None
+        self._excluir_faixas(sheet, [nossa])
+        indice.carregado_em = 0
+        return False, self._buscar_registro(sheet, indice, chave, COLUNAS_CONTROLE)
+
+    @com_reconexao
+    def chaves_controle(self):
+        # Só a coluna A, e o índice de linhas sai renovado de brinde
+        self.indice_controle.recarregar(self._aba(ABA_CONTROLE).col_values(1))
+        with self.indice_controle.lock: return set(self.indice_controle.linhas)
+
+    @com_reconexao
+    def anexar_log(self, linha):
+        self.anexar_logs([linha])
+
+    @com_reconexao
+    def anexar_logs(self, linhas):
+        if not linhas: return
+        res = self._aba(ABA_LOGS).append_rows([list(l) for l in linhas])
+        primeira = linha_do_intervalo(res.get("updates", {}).get("updatedRange", "")) if res else None
+        if primeira:
+            for i, linha in enumerate(linhas): self.leitor_logs.anotar_anexo(primeira + i, linha)
+
+    @com_reconexao
+    def ultima_acao(self, operador):
+        self.leitor_logs.atualizar(self._aba(ABA_LOGS))
+        return self.leitor_logs.acao_do_operador(operador)
+
+    @leitura_de_resumo
+    @com_reconexao
+    def logs_do_dia(self, operador, data):
+        sheet = self._aba(ABA_LOGS)
+        self.leitor_logs.atualizar(sheet)
+        registros = self.leitor_logs.registros_do_dia(operador, data)
+        if registros is not None: return registros
+        return [row for row in self._logs_fora_da_memoria(sheet, data) if row.get('Operador') == operador]
+
+    @leitura_de_resumo
+    @com_reconexao
+    def logs_da_data(self, data):
+        sheet = self._aba(ABA_LOGS)
+        self.leitor_logs.atualizar(sheet)
+        registros = self.leitor_logs.registros_da_data(data)
+        if registros is not None: return registros
+        return self._logs_fora_da_memoria(sheet, data)
+
+    def _logs_fora_da_memoria(self, sheet, data):
+        """Logs da data fora da memória (consulta histórica): da partição do mês, se já
+        arquivado, ou da varredura completa da aba quente"""
+        mes = mes_do_log(data)
+        linhas = self.listar_particao_logs(mes) if mes in self.particoes_logs() else sheet.get_all_records()
+        return [row for row in linhas if str(row.get('Data_Hora', '')).startswith(data)]
+
+    @com_reconexao
+    def listar_logs(self):
+        return self._aba(ABA_LOGS).get_all_records()
+
+    @com_reconexao
+    def particoes_logs(self):
+        return sorted(m.group(1) for m in map(PARTICAO_LOGS.match, self.pool.titulos()) if m)
+
+    @com_reconexao
+    def listar_particao_logs(self, mes):
+        try: sheet = self._aba(aba_particao(mes))
+        except gspread.exceptions.WorksheetNotFound: return []
+        return sheet.get_all_records()
+
+    @com_reconexao
+    def arquivar_logs(self, ate_mes):
+        """Copia as linhas dos meses fechados para as abas Logs_AAAA_MM e as apaga da aba Logs.
+
+        A cópia vem antes da exclusão e pula linhas que já estão na partição, então
+        uma rodada interrompida pode ser repetida sem duplicar nada. Antes de apagar,
+        as bordas de cada faixa são conferidas; se a aba mudou, nada é apagado.
+        """
+        sheet = self._aba(ABA_LOGS)
+        valores = sheet.get_values(value_render_option="UNFORMATTED_VALUE")
+        if len(valores) < 2: return {}
+        cabecalho = [str(c) for c in valores[0]]
+        col = cabecalho.index('Data_Hora') if 'Data_Hora' in cabecalho else COLUNAS_LOGS.index('Data_Hora')
+        por_mes = {}
+        for n, linha in enumerate(valores[1:], start=2):
+            mes = mes_do_log(linha[col]) if len(linha) > col else None
+            if mes and mes < ate_mes: por_mes.setdefault(mes, []).append(n)
+        if not por_mes: return {}
+
+        for mes, linhas in sorted(por_mes.items()):
+            destino = self._aba(aba_particao(mes), cabecalho)
+            arquivadas = {tuple(normalizar_linha(l))
+                          for l in destino.get_values(value_render_option="UNFORMATTED_VALUE")[1:]}
+            novas = [valores[n - 1] for n in linhas if tuple(normalizar_linha(valores[n - 1])) not in arquivadas]
+            if novas: destino.append_rows(novas)
+
+        apagar = [n for linhas in por_mes.values() for n in linhas]
+        faixas = faixas_contiguas(apagar)
+        ultima_coluna = letra_coluna(len(cabecalho))
+        bordas = sorted({n for faixa in faixas for n in faixa})
+        res = sheet.spreadsheet.values_batch_get([f"'{sheet.title}'!A{n}:{ultima_coluna}{n}" for n in bordas],
+                                                 params={"valueRenderOption": "UNFORMATTED_VALUE"})
+        for n, faixa in zip(bordas, res.get("valueRanges", [])):
+            if normalizar_linha((faixa.get("values") or [[]])[0]) != normalizar_linha(valores[n - 1]):
+                raise RuntimeError("A aba Logs mudou durante o arquivamento; rode de novo")
+
+        self._excluir_faixas(sheet, apagar)
+        self.leitor_logs.reiniciar()
+        return {mes: len(linhas) for mes, linhas in sorted(por_mes.items())}
+
+    def _aba_producao(self):
+        return self._aba(ABA_PRODUCAO, COLUNAS_PRODUCAO)
+
+    @leitura_de_resumo
+    @com_reconexao
+    def buscar_producao(self, operador, data):
+        # Só para exibir: a linha em memória pode ter até `ttl_linha` segundos e não
+        # ver o que outra instância somou nesse meio tempo (a soma relê, ver _gravar_producao)
+        chave = f"{operador} | {data}"
+        registro = self._buscar_registro(self._aba_producao(), self.indice_producao, chave,
+                                         COLUNAS_PRODUCAO, usar_cache=True)
+        if registro is None: return None
+        return tuple(int(float(registro[c] or 0)) for c in ("Segundos", "Paginas", "Produtos"))
+
+    def _gravar_producao(self, operador, data, valores, somar):
+        chave = f"{operador} | {data}"
+        with self.lock_producao:
+            sheet = self._aba_producao()
+            if somar:
+                # A soma parte da linha lida agora (outra instância pode ter somado); é
+                # parte da escrita, então vai na mesma prioridade. Entre esta leitura e a
+                # gravação ainda cabe a soma de outra instância, que se perde
+                with AGENDADOR.prioridade(ESCRITA):
+                    atual = self._buscar_registro(sheet, self.indice_producao, chave, COLUNAS_PRODUCAO)
+                if atual:
+                    valores = [int(float(atual[c] or 0)) + v for c, v in zip(("Segundos", "Paginas", "Produtos"), valores)]
+            registro = dict(zip(COLUNAS_PRODUCAO, [chave, operador, "'" + data] + list(valores)))
+            self._gravar_registro(sheet, self.indice_producao, COLUNAS_PRODUCAO, registro)
+
+    @com_reconexao
+    def somar_producao(self, operador, data, segundos, paginas, produtos):
+        self._gravar_producao(operador, data, [segundos, paginas, produtos], somar=True)
+
+    @com_reconexao
+    def definir_producao(self, operador, data, segundos, paginas, produtos):
+        self._gravar_producao(operador, data, [segundos, paginas, produtos], somar=False)
+
+    @com_reconexao
+    def listar_reservas(self):
+        return self._aba(ABA_ACOMPANHAMENTO).get_all_records()
+
+    def _reservas(self, sheet):
+        indice = self.indice_reservas
+        if indice.vencido():
+            indice.recarregar(sheet.get_all_values())
+        elif indice.precisa_conferir():
+            # Leitura fora do lock (ver LeitorLogs.atualizar); se uma escrita nossa mexeu
+            # no índice enquanto isso, a sonda ficou velha e a conferência fica para a próxima
+            with indice.lock: sonda, total = indice.intervalo_sonda(), indice.total_linhas
+            valores = sheet.get_values(sonda)
+            with indice.lock:
+                if indice.total_linhas != total: return indice
+                if indice.confere(valores):
+                    indice.marcar_conferido()
+                    return indice
+            indice.recarregar(sheet.get_all_values())
+        return indice
+
+    def recarregar_reservas(self):
+        # Índice compartilhado: em vez de reler a aba, confere na próxima leitura se ela mudou
+        self.indice_reservas.pedir_conferencia()
+
+    @com_reconexao
+    def paginas_reservadas(self, chave):
+        return self._reservas(self._aba(ABA_ACOMPANHAMENTO)).paginas(chave)
+
+    @leitura_de_resumo
+    @com_reconexao
+    def reservas_por_chave(self):
+        return self._reservas(self._aba(ABA_ACOMPANHAMENTO)).contagem()
+
+    @com_reconexao
+    def adicionar_reservas(self, linhas):
+        if not linhas: return
+        sheet = self._aba(ABA_ACOMPANHAMENTO)
+        indice = self._reservas(sheet)
+        with indice.lock:
+            res = sheet.append_rows([list(l) for l in linhas])
+            primeira = linha_do_intervalo(res.get("updates", {}).get("updatedRange", "")) if res else None
+            if primeira: indice.anotar_anexo(primeira, linhas)
+            else: indice.carregado_em = 0
+
+    def _conferir_linhas_reservas(self, sheet, linhas):
+        """Confere (em uma leitura só das linhas-alvo) se o índice ainda bate com a aba"""
+        intervalos = [f"'{sheet.title}'!A{l}:C{l}" for l in linhas]
+        res = sheet.spreadsheet.values_batch_get(intervalos)
+        for linha, faixa in zip(linhas, res.get("valueRanges", [])):
+            valores = (faixa.get("values") or [[]])[0]
+            chave, pagina, _ = self.indice_reservas.linhas[linha]
+            if len(valores) < 3 or str(valores[0]) != chave or str(valores[2]) != str(pagina): return False
+        return True
+
+    @com_reconexao
+    def remover_reservas(self, chave, paginas):
+        """Exclui as linhas das páginas com um único batchUpdate (deleteDimension por faixa)"""
+        if not paginas: return
+        sheet = self._aba(ABA_ACOMPANHAMENTO)
+        indice = self._reservas(sheet)
+        with indice.lock:
+            linhas = indice.linhas_de(chave, paginas)
+            if linhas and not self._conferir_linhas_reservas(sheet, linhas):
+                indice.recarregar(sheet.get_all_values())
+                linhas = indice.linhas_de(chave, paginas)
+            if not linhas: return
+            self._excluir_faixas(sheet, linhas)
+            indice.remover_linhas(linhas)
+
+
+# ==============================================================================
+# 3. SQLITE LOCAL
+# ==============================================================================
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS controle_paginas (
+    Chave TEXT PRIMARY KEY,
+    Site TEXT, Letra TEXT,
+    Qtd_Paginas INTEGER, Paginas_Concluidas TEXT, Qtd_Ultima_Pag INTEGER,
+    Ultimo_Operador TEXT, Revisao INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_controle_site ON controle_paginas (Site);
+
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ID_Sessao TEXT, Operador TEXT, Site TEXT, Letra TEXT, Acao TEXT,
+    Data_Hora TEXT, Timestamp TEXT, Tempo_Decorrido INTEGER, Paginas_Turno TEXT,
+    Total_Paginas INTEGER, Qtd_Total INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_logs_operador ON logs (Operador, id);
+CREATE INDEX IF NOT EXISTS idx_logs_operador_data ON logs (Operador, Data_Hora);
+CREATE INDEX IF NOT EXISTS idx_logs_data ON logs (Data_Hora);
+
+-- Meses fechados, movidos de `logs` pelo arquivar_logs (Mes = 'aaaa_mm'; o id original é mantido)
+CREATE TABLE IF NOT EXISTS logs_arquivo (
+    id INTEGER PRIMARY KEY, Mes TEXT,
+    ID_Sessao TEXT, Operador TEXT, Site TEXT, Letra TEXT, Acao TEXT,
+    Data_Hora TEXT, Timestamp TEXT, Tempo_Decorrido INTEGER, Paginas_Turno TEXT,
+    Total_Paginas INTEGER, Qtd_Total INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_logs_arquivo_mes ON logs_arquivo (Mes, id);
+CREATE INDEX IF NOT EXISTS idx_logs_arquivo_operador_data ON logs_arquivo (Operador, Data_Hora);
+
+CREATE TABLE IF NOT EXISTS acompanhamento_paginas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT, letra TEXT, pagina INTEGER, status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_acompanhamento_chave ON acompanhamento_paginas (chave, pagina);
+
+CREATE TABLE IF NOT EXISTS producao_diaria (
+    Operador TEXT, Data TEXT,
+    Segundos INTEGER DEFAULT 0, Paginas INTEGER DEFAULT 0, Produtos INTEGER DEFAULT 0,
+    PRIMARY KEY (Operador, Data)
+);
+
+CREATE TABLE IF NOT EXISTS cadastro_varreduras (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Cliente TEXT, Concorrente TEXT, Delete_Letras TEXT
+);
+"""
+
+
+# 'dd/mm/aaaa ...' -> 'aaaa_mm', o mesmo que mes_do_log
+MES_SQLITE = "substr(Data_Hora, 7, 4) || '_' || substr(Data_Hora, 4, 2)"
+# Tabela e colunas de cada aba (ler_colunas); as partições saem de logs_arquivo
+TABELAS_SQLITE = {ABA_CADASTRO: ("cadastro_varreduras", COLUNAS_CADASTRO),
+                  ABA_CONTROLE: ("controle_paginas", COLUNAS_CONTROLE), ABA_LOGS: ("logs", COLUNAS_LOGS),
+                  ABA_ACOMPANHAMENTO: ("acompanhamento_paginas", COLUNAS_ACOMPANHAMENTO)}
+FILTRO_ARQUIVO_SQLITE = f"Data_Hora GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]*' AND {MES_SQLITE} < ?"
+
+
+class RepositorioSQLite(Repositorio):
+    """Implementação local em um arquivo SQLite (ou ':memory:'), sem conta Google.
+
+    Uma única conexão compartilhada entre as sessões do Streamlit, protegida por lock.
+    """
+
+    def __init__(self, caminho):
+        if caminho != ":memory:":
+            pasta = os.path.dirname(os.path.abspath(caminho))
+            os.makedirs(pasta, exist_ok=True)
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(ESQUEMA_SQLITE)
+            # Bancos criados antes da coluna Revisao
+            colunas = {r[1] for r in self.conn.execute("PRAGMA table_info(controle_paginas)")}
+            if "Revisao" not in colunas:
+                self.conn.execute("ALTER TABLE controle_paginas ADD COLUMN Revisao INTEGER DEFAULT 0")
+
+    def _consultar(self, sql, params=()):
+        with self.lock:
+            return [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+
+    def _executar(self, sql, params=(), muitos=False):
+        with self.lock, self.conn:
+            if muitos: self.conn.executemany(sql, params)
+            else: self.conn.execute(sql, params)
+
+    def listar_varreduras(self):
+        colunas = ", ".join(COLUNAS_CADASTRO)
+        return self._consultar(f"SELECT {colunas} FROM cadastro_varreduras ORDER BY id")
+
+    def listar_controle(self):
+        colunas = ", ".join(COLUNAS_CONTROLE)
+        return self._consultar(f"SELECT {colunas} FROM controle_paginas ORDER BY rowid")
+
+    def ler_colunas(self, aba, colunas):
+        particao = PARTICAO_LOGS.match(aba)
+        tabela, existentes = ("logs_arquivo", COLUNAS_LOGS) if particao else TABELAS_SQLITE[aba]
+        invalidas = [c for c in colunas if c not in existentes]
+        if invalidas: raise KeyError(f"Colunas que não existem em {aba}: {invalidas}")
+        filtro, params = ("WHERE Mes = ?", (particao.group(1),)) if particao else ("", ())
+        with self.lock:
+            linhas = self.conn.execute(f"SELECT {', '.join(colunas)} FROM {tabela} {filtro} ORDER BY rowid",
+                                       params).fetchall()
+        return {c: [r[i] for r in linhas] for i, c in enumerate(colunas)}
+
+    def buscar_controle(self, chave):
+        colunas = ", ".join(COLUNAS_CONTROLE)
+        res = self._consultar(f"SELECT {colunas} FROM controle_paginas WHERE Chave = ?", (chave,))
+        return res[0] if res else None
+
+    def salvar_controle(self, registro):
+        self.salvar_controles([registro])
+
+    def chaves_controle(self):
+        return {r['Chave'] for r in self._consultar("SELECT Chave FROM controle_paginas")}
+
+    def salvar_controles(self, registros):
+        valores = [[registro.get(c, '') for c in COLUNAS_CONTROLE[:-1]] + [revisao_de(registro)] for registro in registros]
+        self._executar(
+            f"INSERT INTO controle_paginas ({', '.join(COLUNAS_CONTROLE)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (Chave) DO UPDATE SET Qtd_Paginas = excluded.Qtd_Paginas, "
+            "Paginas_Concluidas = excluded.Paginas_Concluidas, Qtd_Ultima_Pag = excluded.Qtd_Ultima_Pag, "
+            "Ultimo_Operador = excluded.Ultimo_Operador, Revisao = COALESCE(Revisao, 0) + 1",
+            valores, muitos=True)
+
+    def salvar_controle_se(self, registro, revisao, conferida=False):
+        valores = [registro.get(c, '') for c in COLUNAS_CONTROLE[1:-1]]
+        with self.lock, self.conn:
+            # Compare-and-set de verdade: a condição e a escrita são um comando só
+            cur = self.conn.execute(
+                "UPDATE controle_paginas SET Site = ?, Letra = ?, Qtd_Paginas = ?, Paginas_Concluidas = ?, "
+                "Qtd_Ultima_Pag = ?, Ultimo_Operador = ?, Revisao = ? WHERE Chave = ? AND COALESCE(Revisao, 0) = ?",
+                valores + [revisao + 1, registro['Chave'], revisao])
+            if cur.rowcount: return True, None
+            if revisao == 0:
+                cur = self.conn.execute(
+                    f"INSERT OR IGNORE INTO controle_paginas ({', '.join(COLUNAS_CONTROLE)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [registro['Chave']] + valores + [1])
+                if cur.rowcount: return True, None
+        return False, self.buscar_controle(registro['Chave'])
+
+    def anexar_log(self, linha):
+        self.anexar_logs([linha])
+
+    def anexar_logs(self, linhas):
+        colunas = ", ".join(COLUNAS_LOGS)
+        marcadores = ", ".join("?" * len(COLUNAS_LOGS))
+        self._executar(f"INSERT INTO logs ({colunas}) VALUES ({marcadores})", [list(l) for l in linhas], muitos=True)
+
+    def ultima_acao(self, operador):
+        res = self._consultar("SELECT Acao FROM logs WHERE Operador = ? ORDER BY id DESC LIMIT 1", (str(operador),))
+        return res[0]['Acao'] if res else None
+
+    def logs_do_dia(self, operador, data):
+        # Faixa de texto no índice (Operador, Data_Hora) no lugar de um LIKE 'data%'
+        colunas = ", ".join(COLUNAS_LOGS)
+        filtro = "WHERE Operador = ? AND Data_Hora >= ? AND Data_Hora < ?"
+        params = (operador, data, data + "\uffff")
+        return self._consultar(
+            f"SELECT {colunas} FROM (SELECT id, {colunas} FROM logs_arquivo {filtro} "
+            f"UNION ALL SELECT id, {colunas} FROM logs {filtro}) ORDER BY id", params + params)
+
+    def logs_da_data(self, data):
+        colunas = ", ".join(COLUNAS_LOGS)
+        filtro = "WHERE Data_Hora >= ? AND Data_Hora < ?"
+        params = (data, data + "\uffff")
+        return self._consultar(
+            f"SELECT {colunas} FROM (SELECT id, {colunas} FROM logs_arquivo {filtro} "
+            f"UNION ALL SELECT id, {colunas} FROM logs {filtro}) ORDER BY id", params + params)
+
+    def listar_logs(self):
+        return self._consultar(f"SELECT {', '.join(COLUNAS_LOGS)} FROM logs ORDER BY id")
+
+    def particoes_logs(self):
+        return [r['Mes'] for r in self._consultar("SELECT DISTINCT Mes FROM logs_arquivo ORDER BY Mes")]
+
+    def listar_particao_logs(self, mes):
+        return self._consultar(f"SELECT {', '.join(COLUNAS_LOGS)} FROM logs_arquivo WHERE Mes = ? ORDER BY id", (mes,))
+
+    def arquivar_logs(self, ate_mes):
+        colunas = ", ".join(COLUNAS_LOGS)
+        with self.lock, self.conn:
+            contagem = self.conn.execute(f"SELECT {MES_SQLITE}, COUNT(*) FROM logs WHERE {FILTRO_ARQUIVO_SQLITE} "
+                                         "GROUP BY 1 ORDER BY 1", (ate_mes,)).fetchall()
+            self.conn.execute(f"INSERT OR IGNORE INTO logs_arquivo (id, Mes, {colunas}) "
+                              f"SELECT id, {MES_SQLITE}, {colunas} FROM logs WHERE {FILTRO_ARQUIVO_SQLITE}", (ate_mes,))
+            self.conn.execute(f"DELETE FROM logs WHERE {FILTRO_ARQUIVO_SQLITE}", (ate_mes,))
+        return {mes: qtd for mes, qtd in contagem}
+
+    def buscar_producao(self, operador, data):
+        res = self._consultar("SELECT Segundos, Paginas, Produtos FROM producao_diaria WHERE Operador = ? AND Data = ?",
+                              (operador, data))
+        return (res[0]['Segundos'], res[0]['Paginas'], res[0]['Produtos']) if res else None
+
+    def somar_producao(self, operador, data, segundos, paginas, produtos):
+        self._executar(
+            "INSERT INTO producao_diaria (Operador, Data, Segundos, Paginas, Produtos) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (Operador, Data) DO UPDATE SET Segundos = Segundos + excluded.Segundos, "
+            "Paginas = Paginas + excluded.Paginas, Produtos = Produtos + excluded.Produtos",
+            (operador, data, int(segundos), int(paginas), int(produtos)))
+
+    def definir_producao(self, operador, data, segundos, paginas, produtos):
+        self._executar("INSERT OR REPLACE INTO producao_diaria (Operador, Data, Segundos, Paginas, Produtos) "
+                       "VALUES (?, ?, ?, ?, ?)", (operador, data, int(segundos), int(paginas), int(produtos)))
+
+    def listar_reservas(self):
+        colunas = ", ".join(COLUNAS_ACOMPANHAMENTO)
+        return self._consultar(f"SELECT {colunas} FROM acompanhamento_paginas ORDER BY id")
+
+    def reservas_por_chave(self):
+        res = self._consultar("SELECT chave, COUNT(DISTINCT pagina) AS qtd FROM acompanhamento_paginas "
+                              "WHERE status = ? GROUP BY chave", (STATUS_RESERVA,))
+        return {r['chave']: r['qtd'] for r in res}
+
+    def adicionar_reservas(self, linhas):
+        if not linhas: return
+        self._executar("INSERT INTO acompanhamento_paginas (chave, letra, pagina, status) VALUES (?, ?, ?, ?)",
+                       [list(l) for l in linhas], muitos=True)
+
+    def remover_reservas(self, chave, paginas):
+        if not paginas: return
+        self._executar("DELETE FROM acompanhamento_paginas WHERE chave = ? AND pagina = ?",
+                       [(chave, int(p)) for p in paginas], muitos=True)
+
+    def paginas_reservadas(self, chave):
+        res = self._consultar("SELECT pagina FROM acompanhamento_paginas WHERE chave = ? AND status = ?",
+                              (chave, STATUS_RESERVA))
+        return {int(r['pagina']) for r in res}
+
+
+# ==============================================================================
+# 4. ESCOLHA DO BACKEND
+# ==============================================================================
+
+def criar_repositorio(config, criar_cliente=None):
+    """Cria o repositório conforme a configuração.
+
+    `config` aceita as chaves `backend` ("sheets" ou "sqlite") e `caminho`
+    (arquivo do SQLite). A variável de ambiente ASSOCIACAO_BACKEND tem prioridade,
+    o que permite rodar o app sem conta Google.
+
+    Com `fila_escrita` (padrão no Sheets) as escritas passam pela fila em segundo
+    plano, com diário em `caminho_fila`.
+    """
+    backend = os.environ.get("ASSOCIACAO_BACKEND", config.get("backend", "sheets")).lower()
+    if backend == "sqlite":
+        caminho = os.environ.get("ASSOCIACAO_SQLITE", config.get("caminho", "dados/associacao.db"))
+        repo = RepositorioSQLite(caminho)
+    else:
+        repo = RepositorioSheets(criar_cliente)
+
+    if config.get("fila_escrita", backend != "sqlite"):
+        from fila_escrita import FilaEscrita
+        repo = FilaEscrita(repo, config.get("caminho_fila", "dados/fila_escrita.db"))
+    return repo
+
+
+def carregar_secrets(caminho):
+    import tomllib
+    with open(caminho, "rb") as f: return tomllib.load(f)
+
+
+def criar_cliente_secrets(secrets):
+    """`criar_cliente` a partir das credenciais do app ([connections.gsheets] do secrets.toml)"""
+    def criar():
+        from oauth2client.service_account import ServiceAccountCredentials
+        scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+        creds = ServiceAccountCredentials.from_json_keyfile_dict(dict(secrets["connections"]["gsheets"]), scope)
+        return gspread.authorize(creds)
+    return criar
+
+
+def repositorio_de_script(caminho_secrets):
+    """(config, repositório) para os scripts de linha de comando, com as credenciais do app.
+
+    Processo curto: grava direto, sem a fila em segundo plano.
+    """
+    secrets = carregar_secrets(caminho_secrets) if os.path.exists(caminho_secrets) else {}
+    config = dict(secrets.get("armazenamento", {}))
+    config["fila_escrita"] = False
+    return config, criar_repositorio(config, criar_cliente_secrets(secrets) if "connections" in secrets else None)
@@ -0,0 +1,159 @@
+"""Arquivo mensal dos Logs: rotação da aba quente e consulta por período.
+
+A aba Logs guarda só os dias recentes; os meses fechados vão para partições
+(abas Logs_AAAA_MM no Sheets, tabela logs_arquivo no SQLite). Um mês fechado
+não muda mais, então cada partição também é guardada em Parquet, já com as
+colunas tipadas, e as consultas seguintes leem do disco.
+
+Uso sem a interface, com as mesmas credenciais do app (.streamlit/secrets.toml):
+
+    python arquivo_logs.py --rotacionar
+    python arquivo_logs.py --de 01/01/2026 --ate 30/06/2026 --saida logs_semestre.csv
+"""
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+import pytz
+
+from armazenamento import ABA_LOGS, COLUNAS_LOGS, aba_particao, repositorio_de_script
+from esquemas import tipar
+from paginas import contar_paginas
+
+FUSO = pytz.timezone('America/Sao_Paulo')
+
+# Dias do mês novo em que o mês anterior ainda fica na aba quente
+CARENCIA_DIAS = 2
+
+CATEGORIAS_LOGS = ["Operador", "Site", "Letra", "Acao"]
+COLUNAS_TIPADAS = COLUNAS_LOGS + ["Paginas"]
+
+# ==============================================================================
+# 1. TIPAGEM
+# ==============================================================================
+
+def mes_de(dia):
+    return f"{dia.year:04d}_{dia.month:02d}"
+
+
+def meses_entre(inicio, fim):
+    """['aaaa_mm', ...] de `inicio` a `fim` (datas), inclusive"""
+    meses, ano, mes = [], inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        meses.append(f"{ano:04d}_{mes:02d}")
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+def tipar_logs(dados):
+    """Logs com os tipos do esquema (esquemas.py), contagens sem nulos, mais a coluna Paginas.
+
+    `dados` é o {coluna: [valores]} do ler_colunas ou uma lista de registros.
+    """
+    df = tipar(ABA_LOGS, dados, COLUNAS_LOGS)
+    for c in ("Tempo_Decorrido", "Total_Paginas", "Qtd_Total"): df[c] = df[c].fillna(0).astype("int64")
+    # Quantidade de páginas do turno, para os agregados não precisarem reler as faixas
+    df["Paginas"] = contar_paginas(df["Paginas_Turno"]).astype("int64")
+    return df
+
+# ==============================================================================
+# 2. PARTIÇÕES
+# ==============================================================================
+
+class ArquivoLogs:
+    """Consulta e rotação dos logs sobre um repositório (qualquer backend).
+
+    `pasta` guarda um Parquet por mês arquivado; ele é criado na primeira leitura
+    da partição e apagado (junto com os agregados do mês, ver produtividade.py)
+    quando a rotação acrescenta linhas ao mês.
+    """
+
+    def __init__(self, repo, pasta="dados/arquivo_logs"):
+        self.repo = repo
+        self.pasta = pasta
+
+    def _caminho(self, mes, tipo="logs"):
+        return os.path.join(self.pasta, f"{tipo}_{mes}.parquet")
+
+    def particao(self, mes):
+        caminho = self._caminho(mes)
+        if os.path.exists(caminho):
+            try:
+                df = pd.read_parquet(caminho)
+                if list(df.columns) == COLUNAS_TIPADAS: return df
+            except Exception: pass  # arquivo corrompido ou de outra versão: relê do repositório
+        df = tipar_logs(self.repo.ler_colunas(aba_particao(mes), COLUNAS_LOGS))
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            df.to_parquet(caminho + ".tmp", index=False)
+            os.replace(caminho + ".tmp", caminho)
+        except OSError: pass
+        return df
+
+    def quentes(self):
+        return tipar_logs(self.repo.ler_colunas(ABA_LOGS, COLUNAS_LOGS))
+
+    def do_dia(self, dia):
+        """Logs de um dia só (o de hoje, nos relatórios), sem ler a aba quente inteira"""
+        return tipar_logs(self.repo.logs_da_data(dia.strftime("%d/%m/%Y")))
+
+    def consultar(self, inicio, fim):
+        """Logs com Data_Hora de `inicio` a `fim` (datas, inclusive), partições e aba quente juntas"""
+        meses = meses_entre(inicio, fim)
+        arquivados = set(self.repo.particoes_logs())
+        partes = [self.particao(mes) for mes in meses if mes in arquivados]
+        if any(mes not in arquivados for mes in meses): partes.append(self.quentes())
+        df = pd.concat(partes, ignore_index=True) if partes else tipar_logs([])
+        for c in CATEGORIAS_LOGS: df[c] = df[c].astype(str).astype("category")
+        limite = pd.Timestamp(fim) + pd.Timedelta(days=1)
+        df = df[(df["Data_Hora"] >= pd.Timestamp(inicio)) & (df["Data_Hora"] < limite)]
+        return df.sort_values("Data_Hora", kind="stable").reset_index(drop=True)
+
+    def rotacionar(self, hoje=None, carencia_dias=CARENCIA_DIAS):
+        """Arquiva os meses fechados há mais de `carencia_dias`; devolve {mês: linhas movidas}"""
+        hoje = hoje or datetime.now(FUSO).date()
+        movidos = self.repo.arquivar_logs(mes_de(hoje - timedelta(days=carencia_dias)))
+        for mes in movidos:
+            # As cópias locais do mês (logs e agregados diários) ficaram incompletas
+            for tipo in ("logs", "dias"):
+                try: os.remove(self._caminho(mes, tipo))
+                except OSError: pass
+        return movidos
+
+# ==============================================================================
+# 3. LINHA DE COMANDO
+# ==============================================================================
+
+def _data(texto):
+    return datetime.strptime(texto, "%d/%m/%Y").date()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rotação e consulta do arquivo mensal dos Logs")
+    parser.add_argument("--rotacionar", action="store_true", help="move os meses fechados para as partições")
+    parser.add_argument("--carencia", type=int, default=CARENCIA_DIAS,
+                        help="dias do mês novo em que o anterior continua na aba Logs")
+    parser.add_argument("--de", type=_data, help="início da consulta (dd/mm/aaaa)")
+    parser.add_argument("--ate", type=_data, help="fim da consulta (dd/mm/aaaa, padrão hoje)")
+    parser.add_argument("--saida", help="CSV com as linhas consultadas")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    args = parser.parse_args(argv)
+
+    config, repo = repositorio_de_script(args.secrets)
+    arquivo = ArquivoLogs(repo, config.get("pasta_arquivo_logs", "dados/arquivo_logs"))
+
+    if args.rotacionar:
+        movidos = arquivo.rotacionar(carencia_dias=args.carencia)
+        if not movidos: print("Nenhum mês fechado na aba Logs")
+        for mes, qtd in movidos.items(): print(f"{mes}: {qtd} linhas arquivadas")
+    if args.de:
+        df = arquivo.consultar(args.de, args.ate or date.today())
+        print(f"{len(df)} linhas de {args.de:%d/%m/%Y} a {(args.ate or date.today()):%d/%m/%Y}")
+        if args.saida: df.to_csv(args.saida, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
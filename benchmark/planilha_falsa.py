@@ -0,0 +1,271 @@
+"""Substituto em memória do gspread para o benchmark.
+
+Imita só o que o app usa (Client.open, Spreadsheet, Worksheet), conta cada
+chamada como a API do Google contaria (leitura ou escrita), estima os bytes
+trafegados pelo tamanho do JSON de ida e volta e pode simular latência por
+chamada e a cota por minuto (respondendo 429 como o Google).
+"""
+import json
+import re
+import threading
+import time
+from collections import deque
+
+import gspread
+import requests
+
+
+def _coluna(letras):
+    n = 0
+    for ch in letras: n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _intervalo(a1):
+    """'Aba!A2:C10' -> (col1, lin1, col2, lin2), com None onde o intervalo é aberto"""
+    a1 = a1.split("!")[-1]
+    partes = a1.split(":")
+
+    def celula(p):
+        m = re.match(r"([A-Z]*)(\d*)$", p)
+        return (_coluna(m.group(1)) if m.group(1) else None, int(m.group(2)) if m.group(2) else None)
+    c1, l1 = celula(partes[0])
+    c2, l2 = celula(partes[1]) if len(partes) > 1 else (c1, l1)
+    return c1, l1, c2, l2
+
+
+def _numero(v):
+    if isinstance(v, str):
+        try: return int(v)
+        except ValueError:
+            try: return float(v)
+            except ValueError: return v
+    return v
+
+
+def _formatar(v):
+    """Valor como o Sheets mostra (FORMATTED_VALUE); a planilha falsa não tem formatos de número"""
+    return str(v)
+
+
+def _transpor(linhas):
+    """Linhas -> colunas (majorDimension COLUMNS), cortando as vazias do fim de cada coluna"""
+    largura = max((len(l) for l in linhas), default=0)
+    colunas = []
+    for j in range(largura):
+        coluna = [l[j] if j < len(l) else "" for l in linhas]
+        while coluna and coluna[-1] in ("", None): coluna.pop()
+        colunas.append(coluna)
+    return colunas
+
+
+def _erro_api(status, mensagem):
+    resposta = requests.Response()
+    resposta.status_code = status
+    resposta._content = json.dumps({"error": {"code": status, "message": mensagem,
+                                              "status": "RESOURCE_EXHAUSTED"}}).encode()
+    return gspread.exceptions.APIError(resposta)
+
+
+class Medidor:
+    """Conta chamadas, bytes e 429 por ação; aplica latência e cota"""
+
+    def __init__(self, latencia=0.0, banda=None, cota_leitura=None, cota_escrita=None):
+        self.latencia = latencia
+        self.banda = banda
+        self.cotas = {"leitura": cota_leitura, "escrita": cota_escrita}
+        self.janelas = {"leitura": deque(), "escrita": deque()}
+        self.chamadas = []
+        self.lock = threading.Lock()
+
+    def registrar(self, tipo, metodo, aba, enviado=None, recebido=None):
+        bytes_ = len(json.dumps(enviado, default=str)) if enviado is not None else 0
+        bytes_ += len(json.dumps(recebido, default=str)) if recebido is not None else 0
+        agora = time.time()
+        with self.lock:
+            janela = self.janelas[tipo]
+            while janela and agora - janela[0] > 60: janela.popleft()
+            excedeu = self.cotas[tipo] is not None and len(janela) >= self.cotas[tipo]
+            if not excedeu: janela.append(agora)
+            self.chamadas.append({"tipo": tipo, "metodo": metodo, "aba": aba, "bytes": bytes_,
+                                  "thread": threading.current_thread().name, "429": excedeu})
+        espera = self.latencia + (bytes_ / self.banda if self.banda else 0)
+        if espera: time.sleep(espera)
+        if excedeu: raise _erro_api(429, f"Quota exceeded for {tipo} requests per minute")
+
+
+class AbaFalsa:
+    def __init__(self, planilha, titulo, linhas, id_aba):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.id = id_aba
+        self.linhas = [list(l) for l in linhas]
+
+    @property
+    def medidor(self):
+        return self.spreadsheet.client.medidor
+
+    @property
+    def row_count(self):
+        return max(len(self.linhas), 1000)
+
+    # --- leitura ---
+    def _recorte(self, a1, formatado=True):
+        c1, l1, c2, l2 = _intervalo(a1)
+        l1, c1 = l1 or 1, c1 or 1
+        l2 = min(l2 or len(self.linhas), len(self.linhas))
+        saida = []
+        for linha in self.linhas[l1 - 1:l2]:
+            pedaco = linha[c1 - 1:(c2 or len(linha))]
+            pedaco = [_formatar(v) if formatado else _numero(v) for v in pedaco]
+            while pedaco and pedaco[-1] in ("", None): pedaco.pop()
+            saida.append(pedaco)
+        while saida and not saida[-1]: saida.pop()
+        return saida
+
+    def get_all_values(self, value_render_option=None, **kwargs):
+        formatado = value_render_option != "UNFORMATTED_VALUE"
+        valores = [[_formatar(v) if formatado else _numero(v) for v in l] for l in self.linhas]
+        self.medidor.registrar("leitura", "get_all_values", self.title, recebido=valores)
+        return valores
+
+    def get_all_records(self, **kwargs):
+        valores = [[_formatar(v) for v in l] for l in self.linhas]
+        self.medidor.registrar("leitura", "get_all_records", self.title, recebido=valores)
+        if not valores: return []
+        cabecalho = valores[0]
+        return [{c: _numero(l[i]) if i < len(l) else "" for i, c in enumerate(cabecalho)} for l in valores[1:]]
+
+    def get_values(self, range_name=None, value_render_option=None, **kwargs):
+        valores = self._recorte(range_name or "A1:ZZ", value_render_option != "UNFORMATTED_VALUE")
+        self.medidor.registrar("leitura", "get_values", self.title, recebido=valores)
+        return valores
+
+    get = get_values
+
+    def batch_get(self, ranges, **kwargs):
+        valores = [self._recorte(r) for r in ranges]
+        self.medidor.registrar("leitura", "batch_get", self.title, recebido=valores)
+        return valores
+
+    def col_values(self, col, **kwargs):
+        valores = [_formatar(l[col - 1]) if len(l) >= col else "" for l in self.linhas]
+        while valores and valores[-1] == "": valores.pop()
+        self.medidor.registrar("leitura", "col_values", self.title, recebido=valores)
+        return valores
+
+    def row_values(self, row, **kwargs):
+        valores = [_formatar(v) for v in self.linhas[row - 1]] if row <= len(self.linhas) else []
+        self.medidor.registrar("leitura", "row_values", self.title, recebido=valores)
+        return valores
+
+    def find(self, query, **kwargs):
+        self.medidor.registrar("leitura", "find", self.title, recebido=self.linhas)
+        for i, linha in enumerate(self.linhas):
+            for j, v in enumerate(linha):
+                if str(v) == str(query): return gspread.cell.Cell(i + 1, j + 1, str(v))
+        return None
+
+    # --- escrita ---
+    def _gravar(self, linha, coluna, valor, usuario):
+        while len(self.linhas) < linha: self.linhas.append([])
+        destino = self.linhas[linha - 1]
+        while len(destino) < coluna: destino.append("")
+        if usuario and isinstance(valor, str) and valor.startswith("'"): valor = valor[1:]
+        destino[coluna - 1] = valor
+
+    def update_cell(self, row, col, value):
+        self.medidor.registrar("escrita", "update_cell", self.title, enviado=value)
+        self._gravar(row, col, value, usuario=True)
+
+    def batch_update(self, data, value_input_option="RAW", **kwargs):
+        self.medidor.registrar("escrita", "batch_update", self.title, enviado=data)
+        for item in data:
+            c1, l1, _, _ = _intervalo(item["range"])
+            for i, valores in enumerate(item["values"]):
+                for j, v in enumerate(valores):
+                    self._gravar(l1 + i, (c1 or 1) + j, v, usuario=value_input_option == "USER_ENTERED")
+
+    def update(self, range_name, values=None, value_input_option="RAW", **kwargs):
+        return self.batch_update([{"range": range_name, "values": values}], value_input_option=value_input_option)
+
+    def append_rows(self, values, value_input_option="RAW", **kwargs):
+        self.medidor.registrar("escrita", "append_rows", self.title, enviado=values)
+        primeira = len(self.linhas) + 1
+        for valores in values:
+            self.linhas.append([v[1:] if value_input_option == "USER_ENTERED" and isinstance(v, str)
+                                and v.startswith("'") else v for v in valores])
+        return {"updates": {"updatedRange": f"{self.title}!A{primeira}:Z{len(self.linhas)}",
+                            "updatedRows": len(values)}}
+
+    def append_row(self, values, value_input_option="RAW", **kwargs):
+        return self.append_rows([values], value_input_option=value_input_option)
+
+    def delete_rows(self, start_index, end_index=None):
+        self.medidor.registrar("escrita", "delete_rows", self.title)
+        del self.linhas[start_index - 1:(end_index or start_index)]
+
+    def delete_row(self, index):
+        self.delete_rows(index)
+
+
+class PlanilhaFalsa:
+    def __init__(self, client, titulo, abas):
+        self.client = client
+        self.title = titulo
+        self.id = "planilha-falsa"
+        self.abas = {nome: AbaFalsa(self, nome, linhas, i) for i, (nome, linhas) in enumerate(abas.items())}
+
+    def worksheet(self, titulo):
+        self.client.medidor.registrar("leitura", "worksheet", titulo)
+        if titulo not in self.abas: raise gspread.exceptions.WorksheetNotFound(titulo)
+        return self.abas[titulo]
+
+    def worksheets(self):
+        self.client.medidor.registrar("leitura", "worksheets", "*")
+        return list(self.abas.values())
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self.client.medidor.registrar("escrita", "add_worksheet", title)
+        self.abas[title] = AbaFalsa(self, title, [], len(self.abas))
+        return self.abas[title]
+
+    def del_worksheet(self, aba):
+        self.client.medidor.registrar("escrita", "del_worksheet", aba.title)
+        self.abas.pop(aba.title, None)
+
+    def values_batch_get(self, ranges, params=None):
+        formatado = (params or {}).get("valueRenderOption") != "UNFORMATTED_VALUE"
+        colunas = (params or {}).get("majorDimension") == "COLUMNS"
+        saida = []
+        for r in ranges:
+            titulo = r.split("!")[0].strip("'") if "!" in r else r
+            aba = self.abas[titulo]
+            valores = aba._recorte(r if "!" in r else "A1:ZZ", formatado)
+            if colunas: valores = _transpor(valores)
+            saida.append({"range": r, "values": valores})
+        self.client.medidor.registrar("leitura", "values_batch_get", "*", enviado=ranges, recebido=saida)
+        return {"valueRanges": saida}
+
+    def batch_update(self, body):
+        self.client.medidor.registrar("escrita", "spreadsheet.batch_update", "*", enviado=body)
+        for pedido in body.get("requests", []):
+            if "deleteDimension" in pedido:
+                faixa = pedido["deleteDimension"]["range"]
+                aba = next(a for a in self.abas.values() if a.id == faixa["sheetId"])
+                del aba.linhas[faixa["startIndex"]:faixa["endIndex"]]
+        return {"replies": []}
+
+
+class ClienteFalso:
+    """Faz o papel do `gspread.Client` autorizado"""
+
+    def __init__(self, abas, medidor=None, titulo="Sistema_Associacao"):
+        self.medidor = medidor or Medidor()
+        self.planilha = PlanilhaFalsa(self, titulo, abas)
+
+    def open(self, titulo):
+        # Na API real: busca do arquivo no Drive + metadados da planilha
+        self.medidor.registrar("leitura", "open(drive)", "*")
+        self.medidor.registrar("leitura", "open(metadados)", "*")
+        return self.planilha
@@ -0,0 +1,265 @@
+"""Benchmark do app.py contra a planilha falsa.
+
+Reproduz o fluxo real de um operador (login, site, letra, INICIAR/RETOMAR,
+reserva no mapa, PAUSAR, RETOMAR, FINALIZAR, atualizar métricas) com o
+AppTest do Streamlit e mede, por ação, chamadas à API, bytes e tempo.
+
+    python benchmark/rodar.py                       # roda e salva em benchmark/resultados/<rev>.json
+    python benchmark/rodar.py --latencia 0.15       # simula 150 ms por chamada
+    python benchmark/rodar.py --comparar a.json b.json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import gspread  # noqa: E402
+from oauth2client import service_account  # noqa: E402
+
+from armazenamento import (ABA_ACOMPANHAMENTO, ABA_CADASTRO, ABA_CONTROLE, ABA_LOGS, ABA_PRODUCAO,  # noqa: E402
+                           COLUNAS_ACOMPANHAMENTO, COLUNAS_CADASTRO, COLUNAS_CONTROLE, COLUNAS_LOGS,
+                           COLUNAS_PRODUCAO, STATUS_RESERVA)
+from cota import AGENDADOR  # noqa: E402
+from planilha_falsa import ClienteFalso, Medidor  # noqa: E402
+
+OPERADOR = "ana"
+LETRAS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# ==============================================================================
+# 1. DADOS SEMEADOS
+# ==============================================================================
+
+def semear(qtd_sites=20, qtd_logs=100_000, semente=42):
+    """Abas com volume de produção: 20 sites x 25 letras = 500 letras, 100k logs"""
+    rnd = random.Random(semente)
+    fuso = pytz.timezone("America/Sao_Paulo")
+    agora = datetime.now(fuso)
+    operadores = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fabio", "Gabi", "Hugo"]
+
+    cadastro = [COLUNAS_CADASTRO]
+    controle = [COLUNAS_CONTROLE]
+    for s in range(qtd_sites):
+        cliente, concorrente = f"Cliente{s:02d}", f"Concorrente{s:02d}"
+        cadastro.append([cliente, concorrente, "Z"])
+        site = f"{cliente} - {concorrente}"
+        for letra in LETRAS[:-1]:
+            # O primeiro site tem uma letra grande, para o mapa abrir por blocos
+            total = 600 if (s, letra) == (0, "B") else rnd.randint(5, 180)
+            feitas = rnd.randint(0, total - 1)
+            controle.append([f"{site} | {letra}", site, letra, total,
+                             f"1-{feitas}" if feitas else "-", rnd.randint(1, 100), rnd.choice(operadores)])
+
+    logs = [COLUNAS_LOGS]
+    inicio = agora - timedelta(days=180)
+    passo = (agora - inicio) / qtd_logs
+    for i in range(qtd_logs):
+        quando = inicio + passo * i
+        acao = rnd.choice(["INICIO", "PAUSA", "RETOMADA", "PAUSA", "FIM"])
+        pags = rnd.randint(1, 8) if acao in ("PAUSA", "FIM") else 0
+        site = f"Cliente{rnd.randrange(qtd_sites):02d} - Concorrente00"
+        logs.append([f"sessao-{i // 6}", rnd.choice(operadores), site, rnd.choice(LETRAS[:-1]), acao,
+                     quando.strftime("%d/%m/%Y %H:%M:%S"), str(quando.timestamp()),
+                     rnd.randint(60, 3600) if pags else 0, f"1-{pags}" if pags else "-", 100, pags * 100])
+
+    site0 = "Cliente00 - Concorrente00"
+    reservas = [COLUNAS_ACOMPANHAMENTO]
+    for s in range(qtd_sites):
+        for p in range(1, 30):
+            reservas.append([f"Cliente{s:02d} - Concorrente{s:02d} | C", "C", p + 150, STATUS_RESERVA])
+    reservas += [[f"{site0} | B", "B", p, STATUS_RESERVA] for p in range(500, 520)]
+
+    return {ABA_CONTROLE: controle, ABA_LOGS: logs, ABA_ACOMPANHAMENTO: reservas,
+            ABA_CADASTRO: cadastro, ABA_PRODUCAO: [COLUNAS_PRODUCAO]}
+
+# ==============================================================================
+# 2. FLUXO DO OPERADOR
+# ==============================================================================
+
+class Sessao:
+    def __init__(self, cliente, caminho_fila, cota=None):
+        from streamlit.testing.v1 import AppTest
+        self.cliente = cliente
+        self.caminho_fila = caminho_fila
+        self.at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=120)
+        self.at.secrets["passwords"] = {OPERADOR: "senha"}
+        self.at.secrets["connections"] = {"gsheets": {"tipo": "falso"}}
+        self.at.secrets["armazenamento"] = {"backend": "sheets", "caminho_fila": caminho_fila}
+        # O agendador do app trabalha com a mesma cota da planilha falsa (0: sem limite)
+        self.at.secrets["cota"] = cota or {"leituras_por_minuto": 0, "escritas_por_minuto": 0}
+        self.resultados = []
+
+    def botao(self, rotulo):
+        return next(b for b in self.at.button if b.label == rotulo)
+
+    def pendentes_fila(self):
+        if not os.path.exists(self.caminho_fila): return 0
+        with sqlite3.connect(self.caminho_fila) as conn:
+            try: return conn.execute("SELECT COUNT(*) FROM pendentes").fetchone()[0]
+            except sqlite3.OperationalError: return 0
+
+    def medir(self, nome, acao, espera_fila=60):
+        chamadas = self.cliente.medidor.chamadas
+        n = len(chamadas)
+        inicio = time.perf_counter()
+        acao()
+        tela = time.perf_counter() - inicio
+        if self.at.exception: raise RuntimeError(f"{nome}: {self.at.exception[0].value}")
+        # A fila grava em segundo plano: espera esvaziar para atribuir o custo à ação
+        limite = time.time() + espera_fila
+        while self.pendentes_fila() and time.time() < limite: time.sleep(0.05)
+        total = time.perf_counter() - inicio
+        novas = chamadas[n:]
+        da_fila = [c for c in novas if c["thread"] == "fila-escrita"]
+        da_tela = [c for c in novas if c["thread"] != "fila-escrita"]
+        resultado = {
+            "acao": nome,
+            "chamadas": len(da_tela), "leituras": sum(c["tipo"] == "leitura" for c in da_tela),
+            "escritas": sum(c["tipo"] == "escrita" for c in da_tela),
+            "chamadas_fila": len(da_fila), "bytes": sum(c["bytes"] for c in novas),
+            "erros_429": sum(c["429"] for c in novas),
+            "ms_tela": round(tela * 1000, 1), "ms_total": round(total * 1000, 1),
+            "metodos": sorted({f"{c['aba']}.{c['metodo']}" for c in novas}),
+        }
+        self.resultados.append(resultado)
+        return resultado
+
+    def executar(self, site, letra):
+        at = self.at
+        self.medir("abrir", at.run)
+
+        def login():
+            next(s for s in at.selectbox if s.label == "Usuário").select(OPERADOR)
+            next(t for t in at.text_input if t.label == "Senha").input("senha")
+            self.botao("Entrar").click().run()
+        self.medir("login", login)
+        self.medir("site", lambda: next(s for s in at.selectbox if s.label == "Site / Projeto").select(site).run())
+        self.medir("letra", lambda: next(s for s in at.selectbox if s.label == "Letra").select(letra).run())
+        rotulo_inicio = next(b.label for b in at.button if b.label in ("▶️ INICIAR", "▶️ RETOMAR"))
+        self.medir("iniciar", lambda: self.botao(rotulo_inicio).click().run())
+
+        def reservar():
+            livres = [p for p in at.multiselect[0].options]
+            alvo = [int(p) for p in livres[:15]]
+            next(t for t in at.text_input if t.label.startswith("Faixa")).input(f"{alvo[0]}-{alvo[-1]}")
+            self.botao("🟡 Reservar").click().run()
+        self.medir("mapa_reservar", reservar)
+
+        def submeter(rotulo, quantas):
+            seletor = at.multiselect[0]
+            seletor.set_value([int(p) for p in seletor.options[:quantas]])
+            self.botao(rotulo).click().run()
+        self.medir("pausar", lambda: submeter("⏸ PAUSAR (Sair)", 10))
+        self.medir("retomar", lambda: self.botao("▶️ RETOMAR").click().run())
+        # FINALIZAR só aceita com todas as páginas restantes marcadas
+        self.medir("finalizar", lambda: submeter("✅ FINALIZAR", None))
+        self.medir("atualizar_metricas", lambda: self.botao("Atualizar Métricas").click().run())
+        return self.resultados
+
+# ==============================================================================
+# 3. EXECUÇÃO E COMPARAÇÃO
+# ==============================================================================
+
+def revisao():
+    """Commit do código medido; "-dirty" se a árvore tem alterações não commitadas"""
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return "sem-git"
+
+
+def rodar(args):
+    import streamlit as st
+    medidor = Medidor(latencia=args.latencia, banda=args.banda,
+                      cota_leitura=None if args.sem_cota else args.cota_leitura,
+                      cota_escrita=None if args.sem_cota else args.cota_escrita)
+    cliente = ClienteFalso(semear(args.sites, args.logs), medidor)
+    gspread.authorize = lambda creds, *a, **k: cliente
+    service_account.ServiceAccountCredentials.from_json_keyfile_dict = staticmethod(lambda dados, escopo: None)
+    os.environ.pop("ASSOCIACAO_BACKEND", None)
+    st.cache_resource.clear()
+    st.cache_data.clear()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        AGENDADOR.zerar()
+        cota = None if args.sem_cota else {"leituras_por_minuto": args.cota_leitura,
+                                           "escritas_por_minuto": args.cota_escrita}
+        sessao = Sessao(cliente, os.path.join(pasta, "fila.db"), cota)
+        inicio = time.perf_counter()
+        resultados = sessao.executar("Cliente00 - Concorrente00", "B")
+        duracao = time.perf_counter() - inicio
+
+    return {
+        "revisao": revisao(), "data": datetime.now().isoformat(timespec="seconds"),
+        "parametros": {"latencia": args.latencia, "banda": args.banda, "sites": args.sites, "logs": args.logs,
+                       "cota_leitura": medidor.cotas["leitura"], "cota_escrita": medidor.cotas["escrita"]},
+        "acoes": resultados,
+        "total": {"chamadas": sum(r["chamadas"] + r["chamadas_fila"] for r in resultados),
+                  "bytes": sum(r["bytes"] for r in resultados),
+                  "erros_429": sum(r["erros_429"] for r in resultados), "ms": round(duracao * 1000, 1)},
+        "cota": AGENDADOR.resumo_eventos(),
+    }
+
+
+def imprimir(relatorio):
+    print(f"revisão {relatorio['revisao']}  {relatorio['parametros']}")
+    print(f"{'ação':<20}{'chamadas':>9}{'fila':>6}{'KB':>10}{'429':>5}{'ms tela':>10}{'ms total':>10}")
+    for r in relatorio["acoes"]:
+        print(f"{r['acao']:<20}{r['chamadas']:>9}{r['chamadas_fila']:>6}{r['bytes'] / 1024:>10.1f}"
+              f"{r['erros_429']:>5}{r['ms_tela']:>10.0f}{r['ms_total']:>10.0f}")
+    t = relatorio["total"]
+    print(f"{'TOTAL':<20}{t['chamadas']:>15}{t['bytes'] / 1024:>10.1f}{t['erros_429']:>5}{t['ms']:>20.0f}")
+    for e in relatorio.get("cota", []):
+        print(f"cota: {e['Tipo']} {e['Classe']} {e['Evento']} x{e['Qtd']}")
+
+
+def comparar(caminho_base, caminho_novo):
+    with open(caminho_base) as f: base = json.load(f)
+    with open(caminho_novo) as f: novo = json.load(f)
+    anteriores = {r["acao"]: r for r in base["acoes"]}
+    print(f"{base['revisao']} -> {novo['revisao']}")
+    print(f"{'ação':<20}{'chamadas':>14}{'KB':>20}{'ms total':>20}")
+    for r in novo["acoes"]:
+        a = anteriores.get(r["acao"])
+        if not a: print(f"{r['acao']:<20} (nova)"); continue
+        cham_a, cham_n = a["chamadas"] + a["chamadas_fila"], r["chamadas"] + r["chamadas_fila"]
+        print(f"{r['acao']:<20}{cham_a:>6} -> {cham_n:<5}{a['bytes'] / 1024:>9.1f} -> {r['bytes'] / 1024:<8.1f}"
+              f"{a['ms_total']:>9.0f} -> {r['ms_total']:<8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do app contra uma planilha falsa em memória")
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por chamada à API")
+    parser.add_argument("--banda", type=float, default=None, help="bytes por segundo (padrão: sem limite)")
+    parser.add_argument("--cota-leitura", type=int, default=300, help="leituras por minuto antes do 429")
+    parser.add_argument("--cota-escrita", type=int, default=300, help="escritas por minuto antes do 429")
+    parser.add_argument("--sem-cota", action="store_true", help="desliga a simulação de cota")
+    parser.add_argument("--sites", type=int, default=20)
+    parser.add_argument("--logs", type=int, default=100_000)
+    parser.add_argument("--saida", help="arquivo JSON (padrão: benchmark/resultados/<revisão>.json)")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"), help="compara dois resultados salvos")
+    args = parser.parse_args()
+
+    if args.comparar: return comparar(*args.comparar)
+
+    relatorio = rodar(args)
+    imprimir(relatorio)
+    saida = args.saida or os.path.join(RAIZ, "benchmark", "resultados", f"{relatorio['revisao']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w") as f: json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"salvo em {saida}")
+
+
+if __name__ == "__main__":
+    main()
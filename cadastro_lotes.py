@@ -0,0 +1,131 @@
+"""Cadastro de letras em lote (CSV ou tabela) no Controle_Paginas.
+
+Uso sem a interface, com as mesmas credenciais do app (.streamlit/secrets.toml):
+
+    python cadastro_lotes.py novas_letras.csv --operador Ana
+    python cadastro_lotes.py novas_letras.csv --simular
+"""
+import argparse
+import io
+import os
+import sys
+
+import pandas as pd
+
+from armazenamento import repositorio_de_script
+
+# ==============================================================================
+# 1. LEITURA E VALIDAÇÃO
+# ==============================================================================
+
+COLUNAS_LOTE = ["Site", "Letra", "Qtd_Paginas", "Qtd_Ultima_Pag"]
+LETRAS_VALIDAS = set("ABCDEFGHIJKLMNOPQRSTUVWXYZ")
+
+# Nomes alternativos aceitos no cabeçalho do CSV (comparados em minúsculas)
+APELIDOS = {
+    "site": "Site", "site / projeto": "Site", "projeto": "Site",
+    "letra": "Letra",
+    "qtd_paginas": "Qtd_Paginas", "paginas": "Qtd_Paginas", "páginas": "Qtd_Paginas", "total": "Qtd_Paginas",
+    "qtd_ultima_pag": "Qtd_Ultima_Pag", "ultima": "Qtd_Ultima_Pag", "última": "Qtd_Ultima_Pag",
+    "produtos_ultima_pag": "Qtd_Ultima_Pag",
+}
+
+
+def ler_csv(arquivo):
+    """DataFrame com COLUNAS_LOTE a partir de um caminho, bytes ou arquivo enviado (vírgula ou ponto e vírgula)"""
+    if isinstance(arquivo, bytes): arquivo = io.BytesIO(arquivo)
+    df = pd.read_csv(arquivo, sep=None, engine="python", dtype=str, keep_default_na=False)
+    df = df.rename(columns=lambda c: APELIDOS.get(str(c).strip().lower(), str(c).strip()))
+    faltando = [c for c in COLUNAS_LOTE[:3] if c not in df.columns]
+    if faltando: raise ValueError(f"Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+    if "Qtd_Ultima_Pag" not in df.columns: df["Qtd_Ultima_Pag"] = ""
+    return df[COLUNAS_LOTE]
+
+
+def sites_cadastrados(varreduras):
+    """(sites, regras_exclusao) a partir dos registros de cadastro_varreduras"""
+    sites, regras = [], {}
+    for row in varreduras:
+        if str(row.get('Cliente', '')).strip() == '': continue
+        nome = f"{row['Cliente']} - {row['Concorrente']}"
+        sites.append(nome)
+        texto = str(row.get('Delete_Letras', '')).upper().strip()
+        regras[nome] = [l.strip() for l in texto.split(',') if l.strip()]
+    return sorted(sites), regras
+
+
+def _inteiro(valor, padrao=None):
+    texto = str(valor).strip() if valor is not None else ""
+    if texto in ("", "nan", "None"): return padrao
+    try: return int(float(texto.replace(",", ".")))
+    except ValueError: return None
+
+
+def validar_lote(linhas, sites, regras_exclusao, chaves_existentes, operador=""):
+    """Separa as linhas em registros prontos para o Controle_Paginas, já existentes e rejeitadas.
+
+    Retorna (registros, existentes, rejeitadas); `rejeitadas` é uma lista de
+    (número da linha no lote, motivo), com a primeira linha de dados = 1.
+    """
+    sites = set(sites)
+    registros, existentes, rejeitadas = [], [], []
+    vistas = set()
+    for n, linha in enumerate(linhas, start=1):
+        site = str(linha.get("Site", "") or "").strip()
+        letra = str(linha.get("Letra", "") or "").strip().upper()
+        total = _inteiro(linha.get("Qtd_Paginas"))
+        ultima = _inteiro(linha.get("Qtd_Ultima_Pag"), 100)
+        if not site and not letra: continue
+        if site not in sites: rejeitadas.append((n, f"site '{site}' não está no cadastro_varreduras")); continue
+        if letra not in LETRAS_VALIDAS: rejeitadas.append((n, f"letra '{letra}' inválida")); continue
+        if letra in regras_exclusao.get(site, []): rejeitadas.append((n, f"letra {letra} está em Delete_Letras")); continue
+        if not total or total < 1: rejeitadas.append((n, "Qtd_Paginas deve ser um inteiro >= 1")); continue
+        if ultima is None or not 1 <= ultima <= 100: rejeitadas.append((n, "Qtd_Ultima_Pag deve estar entre 1 e 100")); continue
+        chave = f"{site} | {letra}"
+        if chave in chaves_existentes: existentes.append(chave); continue
+        if chave in vistas: rejeitadas.append((n, f"{chave} repetida no lote")); continue
+        vistas.add(chave)
+        registros.append({"Chave": chave, "Site": site, "Letra": letra, "Qtd_Paginas": total,
+                          "Paginas_Concluidas": "", "Qtd_Ultima_Pag": ultima, "Ultimo_Operador": operador})
+    return registros, existentes, rejeitadas
+
+# ==============================================================================
+# 2. CADASTRO
+# ==============================================================================
+
+def cadastrar_lote(repo, linhas, operador="", sites=None, regras_exclusao=None, simular=False):
+    """Valida e grava o lote: uma leitura das chaves existentes e uma escrita em lote.
+
+    Sem `sites`, o cadastro_varreduras é lido aqui. Retorna o dicionário
+    {"cadastradas": [chaves], "existentes": [chaves], "rejeitadas": [(linha, motivo)]}.
+    """
+    if sites is None: sites, regras_exclusao = sites_cadastrados(repo.listar_varreduras())
+    registros, existentes, rejeitadas = validar_lote(linhas, sites, regras_exclusao or {},
+                                                     repo.chaves_controle(), operador)
+    if registros and not simular: repo.salvar_controles(registros)
+    return {"cadastradas": [r["Chave"] for r in registros], "existentes": existentes, "rejeitadas": rejeitadas}
+
+# ==============================================================================
+# 3. LINHA DE COMANDO
+# ==============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cadastra letras em lote no Controle_Paginas a partir de um CSV")
+    parser.add_argument("csv", help="colunas Site, Letra, Qtd_Paginas e (opcional) Qtd_Ultima_Pag")
+    parser.add_argument("--operador", default="", help="gravado em Ultimo_Operador")
+    parser.add_argument("--secrets", default=os.path.join(".streamlit", "secrets.toml"))
+    parser.add_argument("--simular", action="store_true", help="só valida, sem gravar")
+    args = parser.parse_args(argv)
+
+    _, repo = repositorio_de_script(args.secrets)
+
+    resultado = cadastrar_lote(repo, ler_csv(args.csv).to_dict("records"), args.operador, simular=args.simular)
+    verbo = "a cadastrar" if args.simular else "cadastradas"
+    print(f"{len(resultado['cadastradas'])} letras {verbo}, {len(resultado['existentes'])} já existiam, "
+          f"{len(resultado['rejeitadas'])} rejeitadas")
+    for n, motivo in resultado["rejeitadas"]: print(f"  linha {n}: {motivo}")
+    return 1 if resultado["rejeitadas"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
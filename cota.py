@@ -0,0 +1,192 @@
+"""Cota do Google Sheets compartilhada pelo processo: balde de fichas com prioridades.
+
+Todas as sessões usam a mesma conta de serviço, então a cota por minuto é uma só.
+Cada chamada ao Sheets (ver telemetria.Instrumentado) pega uma ficha do balde de
+leitura ou de escrita antes de sair; faltando ficha, a fila anda por prioridade:
+
+- ESCRITA: progresso, logs, produção e reservas (qualquer método de escrita);
+- LETRA: leituras sem marcação, como o status da letra escolhida;
+- RESUMO: resumos e métricas (`with AGENDADOR.prioridade(RESUMO)`). Não usam a
+  reserva do balde e, com `esperar=False`, recebem SemCota na hora em vez de
+  entrar na fila, para que o chamador sirva o último resultado que já tem.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+ESCRITA, LETRA, RESUMO = "escrita", "letra", "resumo"
+PRIORIDADES = {ESCRITA: 0, LETRA: 1, RESUMO: 2}
+# Espera máxima por uma ficha, em segundos, antes de desistir com SemCota
+ESPERA_MAX = {ESCRITA: 60.0, LETRA: 15.0, RESUMO: 30.0}
+# Depois de um 429 do Google, nenhuma chamada do mesmo tipo sai por esses segundos
+PAUSA_429 = 5.0
+
+
+class SemCota(Exception):
+    """Nenhuma ficha disponível para a chamada dentro da espera permitida"""
+
+
+class Balde:
+    """Fichas da cota por minuto; cada ficha gasta volta 60 s depois (None ou 0: sem limite).
+
+    É a janela em que o Google conta a cota, então gastar só o que o balde tem
+    nunca passa do limite em minuto nenhum.
+    """
+
+    def __init__(self, por_minuto):
+        self.por_minuto = por_minuto
+        self.gastas = deque()
+
+    def repor(self):
+        limite = time.monotonic() - 60
+        while self.gastas and self.gastas[0] <= limite: self.gastas.popleft()
+
+    @property
+    def fichas(self):
+        return (self.por_minuto or 0) - len(self.gastas)
+
+    def gastar(self):
+        self.gastas.append(time.monotonic())
+
+    def esgotar(self, pausa):
+        """Zera as fichas por `pausa` segundos"""
+        volta = time.monotonic() - 60 + pausa
+        # Em ordem, junto com as gastas: repor e espera leem a deque da mais antiga para a mais nova
+        self.gastas = deque(sorted(list(self.gastas) + [volta] * max(0, self.fichas)))
+
+    def espera(self, minimo):
+        """Segundos até o balde ter `minimo` fichas"""
+        faltam = math.ceil(minimo - self.fichas)
+        if faltam <= 0: return 0.01
+        return max(0.01, self.gastas[min(faltam, len(self.gastas)) - 1] + 60 - time.monotonic())
+
+
+class Agendador:
+    """Balde de leitura e balde de escrita do processo, com fila por prioridade.
+
+    `reserva` é a fração de cada balde que os resumos não podem gastar: com a
+    cota apertada, quem ainda consegue ficha são as escritas e a letra.
+    """
+
+    def __init__(self, leituras_por_minuto=60, escritas_por_minuto=60, reserva=0.25, max_eventos=200):
+        self.cond = threading.Condition()
+        self.local = threading.local()
+        self.seq = itertools.count()
+        self.filas = {"leitura": [], "escrita": []}
+        self.max_eventos = max_eventos
+        self.configurar(leituras_por_minuto, escritas_por_minuto, reserva)
+        self.zerar()
+
+    def configurar(self, leituras_por_minuto=60, escritas_por_minuto=60, reserva=0.25):
+        with self.cond:
+            self.baldes = {"leitura": Balde(leituras_por_minuto), "escrita": Balde(escritas_por_minuto)}
+            self.reserva = reserva
+            self.cond.notify_all()
+
+    def zerar(self):
+        with self.cond:
+            self.contagem = Counter()
+            self.espera_total = Counter()
+            self.eventos = deque(maxlen=self.max_eventos)
+
+    @contextmanager
+    def prioridade(self, classe, esperar=True):
+        """Classe das leituras feitas pela thread atual dentro do bloco"""
+        anterior = getattr(self.local, "prioridade", None)
+        self.local.prioridade = (classe, esperar)
+        try: yield
+        finally: self.local.prioridade = anterior
+
+    # --- fichas ---
+    def obter(self, escrita=False):
+        """Pega uma ficha para a chamada da thread atual; devolve os segundos de espera"""
+        tipo = "escrita" if escrita else "leitura"
+        classe, esperar = (ESCRITA, True) if escrita else (getattr(self.local, "prioridade", None) or (LETRA, True))
+        with self.cond:
+            balde, fila = self.baldes[tipo], self.filas[tipo]
+            if not balde.por_minuto: return 0.0
+            minimo = 1 + (balde.por_minuto * self.reserva if classe == RESUMO else 0)
+            balde.repor()
+            if not fila and balde.fichas >= minimo:
+                balde.gastar()
+                return 0.0
+            if not esperar:
+                self.anotar(tipo, classe, "recusada")
+                raise SemCota(f"Cota de {tipo} reservada para chamadas prioritárias")
+
+            item = (PRIORIDADES[classe], next(self.seq))
+            heapq.heappush(fila, item)
+            inicio = time.monotonic()
+            try:
+                while True:
+                    balde.repor()
+                    if fila[0] == item and balde.fichas >= minimo: break
+                    restante = ESPERA_MAX[classe] - (time.monotonic() - inicio)
+                    if restante <= 0:
+                        self.anotar(tipo, classe, "desistiu", ESPERA_MAX[classe])
+                        raise SemCota(f"Sem cota de {tipo} após {ESPERA_MAX[classe]:.0f} s")
+                    self.cond.wait(min(restante, balde.espera(minimo)) if fila[0] == item else restante)
+                balde.gastar()
+            finally:
+                fila.remove(item)
+                heapq.heapify(fila)
+                self.cond.notify_all()
+            esperado = time.monotonic() - inicio
+            self.anotar(tipo, classe, "esperou", esperado)
+            return esperado
+
+    def esgotar(self, escrita=False):
+        """O Google respondeu 429: o balde está mais vazio do que a conta local dizia"""
+        tipo = "escrita" if escrita else "leitura"
+        with self.cond:
+            self.baldes[tipo].repor()
+            self.baldes[tipo].esgotar(PAUSA_429)
+            classe = ESCRITA if escrita else (getattr(self.local, "prioridade", None) or (LETRA,))[0]
+            self.anotar(tipo, classe, "429")
+
+    def anotar(self, tipo, classe, evento, segundos=0.0):
+        """Evento de estrangulamento: esperou, recusada, desistiu, 429 ou velho (resultado anterior servido)"""
+        with self.cond:
+            self.contagem[(tipo, classe, evento)] += 1
+            self.espera_total[classe] += segundos
+            self.eventos.append({"ts": time.time(), "tipo": tipo, "classe": classe, "evento": evento,
+                                 "ms": round(segundos * 1000, 1)})
+
+    # --- consulta ---
+    def estado(self):
+        """Fichas, limites e tamanho da fila de cada classe agora"""
+        with self.cond:
+            for balde in self.baldes.values(): balde.repor()
+            fila = Counter()
+            for itens in self.filas.values():
+                for prioridade, _ in itens: fila[next(c for c, p in PRIORIDADES.items() if p == prioridade)] += 1
+            return {"fichas": {t: b.fichas for t, b in self.baldes.items()},
+                    "limites": {t: b.por_minuto for t, b in self.baldes.items()},
+                    "fila": {classe: fila[classe] for classe in PRIORIDADES}}
+
+    def resumo_eventos(self):
+        with self.cond:
+            return [{"Tipo": tipo, "Classe": classe, "Evento": evento, "Qtd": qtd}
+                    for (tipo, classe, evento), qtd in sorted(self.contagem.items())]
+
+    def prometheus(self):
+        estado = self.estado()
+        saida = ["# TYPE associacao_cota_fila gauge"]
+        saida += [f'associacao_cota_fila{{classe="{c}"}} {n}' for c, n in estado["fila"].items()]
+        saida.append("# TYPE associacao_cota_fichas gauge")
+        saida += [f'associacao_cota_fichas{{tipo="{t}"}} {f}' for t, f in estado["fichas"].items()]
+        with self.cond:
+            saida.append("# TYPE associacao_cota_eventos_total counter")
+            saida += [f'associacao_cota_eventos_total{{tipo="{t}",classe="{c}",evento="{e}"}} {n}'
+                      for (t, c, e), n in sorted(self.contagem.items())]
+            saida.append("# TYPE associacao_cota_espera_segundos_total counter")
+            saida += [f'associacao_cota_espera_segundos_total{{classe="{c}"}} {round(s, 3)}'
+                      for c, s in sorted(self.espera_total.items())]
+        return "\n".join(saida) + "\n"
+
+
+AGENDADOR = Agendador()
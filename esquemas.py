@@ -0,0 +1,69 @@
+"""Tipo de cada coluna das abas e leitura tipada, só das colunas pedidas.
+
+Cada coluna é convertida uma vez, na leitura, em vez de `astype(str)` e
+`pd.to_numeric` espalhados pelo app: textos repetidos (operador, site, letra,
+ação) viram categorias, contagens viram inteiros e Data_Hora vira datetime.
+"""
+import pandas as pd
+
+from armazenamento import ABA_ACOMPANHAMENTO, ABA_CADASTRO, ABA_CONTROLE, ABA_LOGS, PARTICAO_LOGS
+
+# ==============================================================================
+# 1. ESQUEMAS
+# ==============================================================================
+
+# texto | categoria | inteiro | milhar (inteiro com "." de milhar) | decimal | data_hora
+ESQUEMAS = {
+    ABA_CONTROLE: {"Chave": "texto", "Site": "categoria", "Letra": "categoria", "Qtd_Paginas": "inteiro",
+                   "Paginas_Concluidas": "texto", "Qtd_Ultima_Pag": "inteiro", "Ultimo_Operador": "categoria",
+                   "Revisao": "inteiro"},
+    ABA_LOGS: {"ID_Sessao": "texto", "Operador": "categoria", "Site": "categoria", "Letra": "categoria",
+               "Acao": "categoria", "Data_Hora": "data_hora", "Timestamp": "decimal", "Tempo_Decorrido": "inteiro",
+               "Paginas_Turno": "texto", "Total_Paginas": "inteiro", "Qtd_Total": "milhar"},
+    ABA_ACOMPANHAMENTO: {"chave": "categoria", "letra": "categoria", "pagina": "inteiro", "status": "categoria"},
+    ABA_CADASTRO: {"Cliente": "texto", "Concorrente": "texto", "Delete_Letras": "texto"},
+}
+
+
+def esquema_da_aba(aba):
+    """Esquema da aba; as partições Logs_AAAA_MM usam o da aba Logs"""
+    return ESQUEMAS[ABA_LOGS] if PARTICAO_LOGS.match(aba) else ESQUEMAS[aba]
+
+
+def _numeros(serie, milhar=False):
+    """Números que já vêm como número (UNFORMATTED_VALUE, SQLite) ou como texto ("1.234", "12,5")"""
+    textos = serie.map(lambda v: isinstance(v, str)).astype(bool)
+    numeros = pd.to_numeric(serie.where(~textos, None).astype(object), errors='coerce').astype("float64")
+    if textos.any():
+        texto = serie[textos].astype(str).str.strip()
+        texto = texto.str.replace('.', '', regex=False) if milhar else texto.str.replace(',', '.', regex=False)
+        numeros[textos] = pd.to_numeric(texto, errors='coerce').astype("float64")
+    return numeros
+
+
+def converter(serie, tipo):
+    serie = serie.where(serie.notna(), "")
+    if tipo == "categoria": return serie.astype(str).str.strip().astype("category")
+    if tipo in ("inteiro", "milhar"): return _numeros(serie, tipo == "milhar").round().astype("Int32")
+    if tipo == "decimal": return _numeros(serie).astype("float64")
+    if tipo == "data_hora": return pd.to_datetime(serie.astype(str), format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    return serie.astype(str)
+
+# ==============================================================================
+# 2. LEITURA
+# ==============================================================================
+
+def tipar(aba, dados, colunas=None):
+    """DataFrame tipado a partir de {coluna: [valores]} (ler_colunas) ou de uma lista de registros"""
+    esquema = esquema_da_aba(aba)
+    colunas = list(colunas or esquema)
+    if isinstance(dados, dict): df = pd.DataFrame({c: list(dados.get(c, [])) for c in colunas})
+    else: df = pd.DataFrame(list(dados), columns=colunas)
+    for c in colunas: df[c] = converter(df[c], esquema.get(c, "texto"))
+    return df
+
+
+def ler_tabela(repo, aba, colunas=None):
+    """Só as `colunas` da aba (todas, se None), já com os tipos do esquema"""
+    colunas = list(colunas or esquema_da_aba(aba))
+    return tipar(aba, repo.ler_colunas(aba, colunas), colunas)
@@ -0,0 +1,406 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import gspread
+
+from armazenamento import (ABA_ACOMPANHAMENTO, ABA_CONTROLE, ABA_LOGS, COLUNAS_ACOMPANHAMENTO, COLUNAS_LOGS,
+                           Repositorio, mesclar_progresso)
+from cota import AGENDADOR, ESCRITA, SemCota
+from paginas import ConjuntoPaginas
+
+# ==============================================================================
+# 1. DIÁRIO (FILA DURÁVEL EM DISCO)
+# ==============================================================================
+
+ESQUEMA_DIARIO = """
+CREATE TABLE IF NOT EXISTS pendentes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT, dados TEXT, criado_em REAL
+);
+CREATE TABLE IF NOT EXISTS falhas (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT, dados TEXT, criado_em REAL, erro TEXT
+);
+"""
+
+
+class Diario:
+    """Operações de escrita ainda não aplicadas, gravadas em SQLite.
+
+    Sobrevive a um reinício do processo: o que não foi aplicado volta para a
+    fila na próxima inicialização.
+    """
+
+    def __init__(self, caminho):
+        if caminho != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self.conn = sqlite3.connect(caminho, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(ESQUEMA_DIARIO)
+
+    def incluir(self, tipo, dados):
+        with self.lock, self.conn:
+            cur = self.conn.execute("INSERT INTO pendentes (tipo, dados, criado_em) VALUES (?, ?, ?)",
+                                    (tipo, json.dumps(dados), time.time()))
+            return cur.lastrowid
+
+    def pendentes(self):
+        with self.lock:
+            linhas = self.conn.execute("SELECT id, tipo, dados FROM pendentes ORDER BY id").fetchall()
+        return [(i, tipo, json.loads(dados)) for i, tipo, dados in linhas]
+
+    def remover(self, ids):
+        if not ids: return
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM pendentes WHERE id = ?", [(i,) for i in ids])
+
+    def descartar(self, ids, erro):
+        """Move para `falhas` operações que o backend recusa (nada é perdido)"""
+        if not ids: return
+        with self.lock, self.conn:
+            for i in ids:
+                self.conn.execute("INSERT OR REPLACE INTO falhas SELECT id, tipo, dados, criado_em, ? "
+                                  "FROM pendentes WHERE id = ?", (str(erro), i))
+            self.conn.executemany("DELETE FROM pendentes WHERE id = ?", [(i,) for i in ids])
+
+    def total_falhas(self):
+        with self.lock: return self.conn.execute("SELECT COUNT(*) FROM falhas").fetchone()[0]
+
+
+# ==============================================================================
+# 2. COALESCÊNCIA
+# ==============================================================================
+
+def agrupar(operacoes):
+    """Reduz a fila ao menor conjunto de escritas equivalente.
+
+    - controle: só a última versão de cada Chave (ela já foi montada sobre a anterior);
+    - progresso: por Chave, o registro mais novo e a união das páginas novas;
+    - log: todas, na ordem, para um único append_rows;
+    - producao: incrementos do mesmo (operador, dia) somados; um `definir` zera a soma;
+    - reservas: o efeito final de cada (chave, página) sobre o backend. A primeira
+      operação diz se a linha já existia (remoção) ou não (reserva); se a última é
+      a oposta, a página voltou ao estado do backend e nada é aplicado (tipo None).
+    """
+    grupos = {"controle": {}, "progresso": {}, "log": [], "producao": {}, "reserva": {}}
+    primeiros = {}
+    for id_op, tipo, dados in operacoes:
+        if tipo == "controle":
+            ids, _ = grupos["controle"].get(dados["Chave"], ([], None))
+            grupos["controle"][dados["Chave"]] = (ids + [id_op], dados)
+        elif tipo == "progresso":
+            chave = dados["registro"]["Chave"]
+            ids, _, novas = grupos["progresso"].get(chave, ([], None, ""))
+            novas = (ConjuntoPaginas.ler(novas) | ConjuntoPaginas.ler(dados["novas"])).texto()
+            grupos["progresso"][chave] = (ids + [id_op], dados["registro"], novas)
+        elif tipo == "log":
+            grupos["log"].append((id_op, dados))
+        elif tipo in ("somar_producao", "definir_producao"):
+            chave = (dados["operador"], dados["data"])
+            ids, base, soma = grupos["producao"].get(chave, ([], None, [0, 0, 0]))
+            if tipo == "definir_producao": base, soma = dados["valores"], [0, 0, 0]
+            else: soma = [a + b for a, b in zip(soma, dados["valores"])]
+            grupos["producao"][chave] = (ids + [id_op], base, soma)
+        elif tipo in ("reserva_add", "reserva_del"):
+            for linha in dados["linhas"]:
+                chave = (linha[0], int(linha[2]))
+                ids, _ = grupos["reserva"].get(chave, ([], None))
+                primeiro = primeiros.setdefault(chave, tipo)
+                grupos["reserva"][chave] = (ids + [id_op], (tipo if tipo == primeiro else None, linha))
+    return grupos
+
+
+# ==============================================================================
+# 3. REPOSITÓRIO COM ESCRITA EM SEGUNDO PLANO
+# ==============================================================================
+
+def erro_de_cota(e):
+    """True para respostas 429 (cota por minuto), 5xx temporários do Google e falta de ficha na cota local"""
+    if isinstance(e, SemCota): return True
+    if isinstance(e, gspread.exceptions.APIError):
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        return status == 429 or (status is not None and status >= 500)
+    return isinstance(e, OSError)
+
+
+class FilaEscrita(Repositorio):
+    """Envolve um repositório e aplica as escritas em uma thread de fundo.
+
+    Cada escrita é gravada no diário e retorna na hora. O worker junta o que
+    estiver pendente, coalesce (ver `agrupar`) e aplica em lote. Erros de cota
+    fazem o worker esperar com backoff exponencial, sem descartar nada; as
+    leituras enxergam as escritas pendentes sobrepostas ao backend.
+    """
+
+    def __init__(self, repo, caminho_diario, intervalo=1.0, espera_max=64.0, max_tentativas=8):
+        self.repo = repo
+        self.diario = Diario(caminho_diario)
+        self.intervalo = intervalo
+        self.espera_max = espera_max
+        self.max_tentativas = max_tentativas
+        self.tentativas = {}
+        self.ultimo_erro = None
+        self.evento = threading.Event()
+        self.lock_aplicacao = threading.Lock()
+        self.thread = threading.Thread(target=self._trabalhar, name="fila-escrita", daemon=True)
+        self.thread.start()
+
+    # --- worker ---
+    def _trabalhar(self):
+        espera = self.intervalo
+        while True:
+            self.evento.wait(espera)
+            self.evento.clear()
+            try:
+                self.drenar()
+                espera = self.intervalo
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                espera = min(self.espera_max, max(self.intervalo, espera) * 2) * (1 + random.random() / 4)
+
+    def drenar(self):
+        """Aplica tudo o que está pendente; propaga o erro se o backend falhar.
+
+        Cada etapa sai do diário assim que é aplicada, para não ser repetida se
+        uma etapa seguinte falhar. Um erro de cota interrompe a drenagem (o
+        worker tenta de novo com backoff); uma etapa que falha por outro motivo
+        `max_tentativas` vezes vai para a tabela de falhas e libera a fila.
+        As leituras feitas aqui (conferência de revisão, linhas das reservas)
+        entram na cota com a prioridade das escritas.
+        """
+        with self.lock_aplicacao, AGENDADOR.prioridade(ESCRITA):
+            for ids, aplicar in self._etapas(agrupar(self.diario.pendentes())):
+                try:
+                    aplicar()
+                except Exception as e:
+                    if erro_de_cota(e): raise
+                    n = self.tentativas[ids[0]] = self.tentativas.get(ids[0], 0) + 1
+                    if n < self.max_tentativas: raise
+                    self.diario.descartar(ids, e)
+                    self.tentativas.pop(ids[0], None)
+                    continue
+                self.diario.remover(ids)
+                self.tentativas.pop(ids[0], None)
+            self.ultimo_erro = None
+
+    def _etapas(self, grupos):
+        """Lista de (ids do diário, função que aplica) na ordem de aplicação"""
+        etapas = []
+        if grupos["log"]:
+            linhas = [linha for _, linha in grupos["log"]]
+            etapas.append(([i for i, _ in grupos["log"]], lambda: self.repo.anexar_logs(linhas)))
+
+        if grupos["controle"]:
+            registros = [registro for _, registro in grupos["controle"].values()]
+            etapas.append(([i for ids, _ in grupos["controle"].values() for i in ids],
+                           lambda: self.repo.salvar_controles(registros)))
+
+        # Compare-and-set no backend, uma chave por etapa
+        for ids, registro, novas in grupos["progresso"].values():
+            etapas.append((ids, lambda r=registro, n=novas: self.repo.registrar_progresso(r, n)))
+
+        for (operador, data), (ids, base, soma) in grupos["producao"].items():
+            if base is not None:
+                total = [a + b for a, b in zip(base, soma)]
+                aplicar = lambda o=operador, d=data, t=total: self.repo.definir_producao(o, d, *t)
+            else:
+                aplicar = lambda o=operador, d=data, t=soma: self.repo.somar_producao(o, d, *t)
+            etapas.append((ids, aplicar))
+
+        if grupos["reserva"]:
+            adicionar, remover = [], {}
+            for tipo, linha in (v for _, v in grupos["reserva"].values()):
+                if tipo == "reserva_add": adicionar.append(linha)
+                elif tipo == "reserva_del": remover.setdefault(linha[0], set()).add(int(linha[2]))
+
+            def aplicar_reservas():
+                if adicionar: self.repo.adicionar_reservas(adicionar)
+                for chave, paginas in remover.items(): self.repo.remover_reservas(chave, paginas)
+            etapas.append(([i for ids, _ in grupos["reserva"].values() for i in ids], aplicar_reservas))
+        return etapas
+
+    def _enfileirar(self, tipo, dados):
+        self.diario.incluir(tipo, dados)
+        self.evento.set()
+
+    def aguardar(self, timeout=30):
+        """Bloqueia até a fila esvaziar (ou o timeout). Retorna True se esvaziou."""
+        self.evento.set()
+        fim = time.time() + timeout
+        while time.time() < fim:
+            if not self.diario.pendentes() and not self.lock_aplicacao.locked(): return True
+            time.sleep(0.05)
+        return False
+
+    def estado_escrita(self):
+        return {"pendentes": len(self.diario.pendentes()), "falhas": self.diario.total_falhas(),
+                "ultimo_erro": self.ultimo_erro}
+
+    # --- escritas (enfileiradas) ---
+    def salvar_controle(self, registro):
+        self._enfileirar("controle", dict(registro))
+
+    def salvar_controles(self, registros):
+        for registro in registros: self._enfileirar("controle", dict(registro))
+
+    def registrar_progresso(self, registro, novas, tentativas=5):
+        novas = ConjuntoPaginas.ler(novas) if isinstance(novas, str) else ConjuntoPaginas(novas)
+        self._enfileirar("progresso", {"registro": dict(registro), "novas": novas.texto()})
+
+    def salvar_controle_se(self, registro, revisao, conferida=False):
+        """Síncrono: aplica o que está pendente e só então confere a revisão no
+        backend, que sem isso não veria as escritas ainda na fila"""
+        self.drenar()
+        with self.lock_aplicacao: return self.repo.salvar_controle_se(registro, revisao, conferida)
+
+    def anexar_log(self, linha):
+        self._enfileirar("log", list(linha))
+
+    def anexar_logs(self, linhas):
+        for linha in linhas: self._enfileirar("log", list(linha))
+
+    def somar_producao(self, operador, data, segundos, paginas, produtos):
+        self._enfileirar("somar_producao", {"operador": operador, "data": data,
+                                            "valores": [int(segundos), int(paginas), int(produtos)]})
+
+    def definir_producao(self, operador, data, segundos, paginas, produtos):
+        self._enfileirar("definir_producao", {"operador": operador, "data": data,
+                                              "valores": [int(segundos), int(paginas), int(produtos)]})
+
+    def adicionar_reservas(self, linhas):
+        if linhas: self._enfileirar("reserva_add", {"linhas": [list(l) for l in linhas]})
+
+    def remover_reservas(self, chave, paginas):
+        if paginas: self._enfileirar("reserva_del", {"linhas": [[chave, "", int(p), ""] for p in paginas]})
+
+    # --- leituras (backend + pendências por cima) ---
+    def _grupos_pendentes(self):
+        return agrupar(self.diario.pendentes())
+
+    def conectar(self):
+        self.repo.conectar()
+
+    def listar_varreduras(self):
+        return self.repo.listar_varreduras()
+
+    def ler_colunas(self, aba, colunas):
+        grupos = self._grupos_pendentes()
+        if aba == ABA_LOGS:
+            lidas = self.repo.ler_colunas(aba, colunas)
+            pendentes = [dict(zip(COLUNAS_LOGS, linha)) for _, linha in grupos["log"]]
+            return {c: list(lidas[c]) + [p.get(c, '') for p in pendentes] for c in colunas}
+        # Pendências que alteram linhas existentes: a listagem completa já sabe sobrepô-las
+        alteradas = {ABA_CONTROLE: grupos["controle"] or grupos["progresso"], ABA_ACOMPANHAMENTO: grupos["reserva"]}
+        if alteradas.get(aba): return super().ler_colunas(aba, colunas)
+        return self.repo.ler_colunas(aba, colunas)
+
+    def _com_progresso(self, grupos, chave, registro):
+        """Registro com o progresso pendente da chave aplicado por cima"""
+        pendente = grupos["progresso"].get(chave)
+        if not pendente: return registro
+        _, novo, novas = pendente
+        mesclado = mesclar_progresso(registro, novo, novas)
+        if registro and 'Revisao' in registro: mesclado['Revisao'] = registro['Revisao']
+        return mesclado
+
+    def listar_controle(self):
+        grupos = self._grupos_pendentes()
+        pendentes = {chave: registro for chave, (_, registro) in grupos["controle"].items()}
+        registros = []
+        for registro in self.repo.listar_controle():
+            chave = str(registro.get('Chave', '')).strip()
+            registros.append(self._com_progresso(grupos, chave, dict(pendentes.pop(chave, registro))))
+        for chave, registro in pendentes.items(): registros.append(self._com_progresso(grupos, chave, dict(registro)))
+        vistas = {str(r.get('Chave', '')).strip() for r in registros}
+        return registros + [self._com_progresso(grupos, c, None) for c in grupos["progresso"] if c not in vistas]
+
+    def buscar_controle(self, chave):
+        grupos = self._grupos_pendentes()
+        pendente = grupos["controle"].get(chave)
+        registro = dict(pendente[1]) if pendente else self.repo.buscar_controle(chave)
+        return self._com_progresso(grupos, chave, registro)
+
+    def chaves_controle(self):
+        grupos = self._grupos_pendentes()
+        return set(self.repo.chaves_controle()) | set(grupos["controle"]) | set(grupos["progresso"])
+
+    def ultima_acao(self, operador):
+        for _, linha in reversed(self._grupos_pendentes()["log"]):
+            if str(linha[1]) == str(operador): return linha[4]
+        return self.repo.ultima_acao(operador)
+
+    def logs_do_dia(self, operador, data):
+        pendentes = [dict(zip(COLUNAS_LOGS, linha)) for _, linha in self._grupos_pendentes()["log"]
+                     if linha[1] == operador and str(linha[5]).startswith(data)]
+        return self.repo.logs_do_dia(operador, data) + pendentes
+
+    def logs_da_data(self, data):
+        pendentes = [dict(zip(COLUNAS_LOGS, linha)) for _, linha in self._grupos_pendentes()["log"]
+                     if str(linha[5]).startswith(data)]
+        return self.repo.logs_da_data(data) + pendentes
+
+    def listar_logs(self):
+        return self.repo.listar_logs() + [dict(zip(COLUNAS_LOGS, linha)) for _, linha in self._grupos_pendentes()["log"]]
+
+    def particoes_logs(self):
+        return self.repo.particoes_logs()
+
+    def listar_particao_logs(self, mes):
+        return self.repo.listar_particao_logs(mes)
+
+    def arquivar_logs(self, ate_mes):
+        # Com a aplicação travada, nenhum lote é anexado à aba Logs no meio do arquivamento
+        with self.lock_aplicacao: return self.repo.arquivar_logs(ate_mes)
+
+    def buscar_producao(self, operador, data):
+        ids, base, soma = self._grupos_pendentes()["producao"].get((operador, data), ([], None, [0, 0, 0]))
+        if base is None:
+            base = self.repo.buscar_producao(operador, data)
+            if base is None and not ids: return None
+        return tuple(a + b for a, b in zip(base or (0, 0, 0), soma))
+
+    def recarregar_reservas(self):
+        self.repo.recarregar_reservas()
+
+    def _com_reservas(self, grupos, chave, paginas):
+        paginas = set(paginas)
+        for (chave_pendente, pagina), (_, (tipo, _)) in grupos["reserva"].items():
+            if chave_pendente != chave: continue
+            if tipo == "reserva_add": paginas.add(pagina)
+            elif tipo == "reserva_del": paginas.discard(pagina)
+        return paginas
+
+    def paginas_reservadas(self, chave):
+        return self._com_reservas(self._grupos_pendentes(), chave, self.repo.paginas_reservadas(chave))
+
+    def buscar_letra(self, chave, atualizar_logs=False):
+        registro, paginas = self.repo.buscar_letra(chave, atualizar_logs)
+        grupos = self._grupos_pendentes()
+        pendente = grupos["controle"].get(chave)
+        if pendente: registro = dict(pendente[1])
+        return self._com_progresso(grupos, chave, registro), self._com_reservas(grupos, chave, paginas)
+
+    def reservas_por_chave(self):
+        contagem = dict(self.repo.reservas_por_chave())
+        for chave in {chave for chave, _ in self._grupos_pendentes()["reserva"]}:
+            contagem[chave] = len(self.paginas_reservadas(chave))
+        return contagem
+
+    def listar_reservas(self):
+        estado = {chave: tipo_linha for chave, (_, tipo_linha) in self._grupos_pendentes()["reserva"].items()}
+        registros = []
+        for registro in self.repo.listar_reservas():
+            try: chave = (registro.get('chave'), int(registro.get('pagina')))
+            except (TypeError, ValueError): chave = None
+            if chave in estado:
+                if estado[chave][0] == "reserva_del": continue
+                estado.pop(chave)
+            registros.append(registro)
+        for tipo, linha in estado.values():
+            if tipo == "reserva_add": registros.append(dict(zip(COLUNAS_ACOMPANHAMENTO, linha)))
+        return registros
@@ -0,0 +1,127 @@
+import re
+
+import pandas as pd
+
+# ==============================================================================
+# CONJUNTO DE PÁGINAS (BITMAP)
+# ==============================================================================
+
+FAIXA = re.compile(r"(\d+)\s*(?:-\s*(\d+))?")
+
+
+class ConjuntoPaginas:
+    """Conjunto de páginas (inteiros >= 1) guardado como bitmap em um `int`.
+
+    União, diferença e contagem são operações de bits (O(páginas / 64)).
+    Serializa em faixas compactas ("1-120,122,130-200") e lê também o formato
+    antigo das planilhas ("'1, 2, 3, ...").
+    """
+
+    __slots__ = ("bits",)
+
+    def __init__(self, paginas=()):
+        if isinstance(paginas, ConjuntoPaginas):
+            self.bits = paginas.bits
+            return
+        paginas = [int(p) for p in paginas if int(p) >= 1]
+        if not paginas:
+            self.bits = 0
+            return
+        mapa = bytearray(max(paginas) // 8 + 1)
+        for p in paginas: mapa[p >> 3] |= 1 << (p & 7)
+        self.bits = int.from_bytes(mapa, "little")
+
+    @classmethod
+    def _de_bits(cls, bits):
+        novo = cls.__new__(cls)
+        novo.bits = bits
+        return novo
+
+    @classmethod
+    def intervalo(cls, inicio, fim):
+        """Todas as páginas de `inicio` a `fim` (inclusive)"""
+        if fim < inicio: return cls()
+        return cls._de_bits(((1 << (fim - inicio + 1)) - 1) << inicio)
+
+    @classmethod
+    def ler(cls, texto, limite=None):
+        """Aceita "1-120,122", "'1, 2, 3", "-", vazio e números soltos (int/float).
+
+        Com `limite`, as faixas são cortadas em 1..limite antes de virar bits, então
+        um texto como "1-99999999999" não aloca nada além do total da letra.
+        """
+        if isinstance(texto, (int, float)) and not isinstance(texto, bool):
+            return cls([int(texto)]) if texto >= 1 and (limite is None or texto <= limite) else cls()
+        bits = 0
+        for m in FAIXA.finditer(str(texto)):
+            inicio = max(int(m.group(1)), 1)
+            fim = int(m.group(2)) if m.group(2) else int(m.group(1))
+            if limite is not None: fim = min(fim, int(limite))
+            if fim < inicio: continue
+            bits |= ((1 << (fim - inicio + 1)) - 1) << inicio
+        return cls._de_bits(bits)
+
+    def faixas(self):
+        """Lista de (início, fim) das sequências contíguas"""
+        binario = bin(self.bits)[:1:-1]
+        return [(m.start(), m.end() - 1) for m in re.finditer("1+", binario)]
+
+    def texto(self):
+        return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in self.faixas())
+
+    def ate(self, total):
+        """Só as páginas <= total"""
+        return self & ConjuntoPaginas.intervalo(1, int(total))
+
+    def maximo(self):
+        return self.bits.bit_length() - 1 if self.bits else 0
+
+    def __iter__(self):
+        binario = bin(self.bits)[:1:-1]
+        return (i for i, b in enumerate(binario) if b == "1")
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __contains__(self, pagina):
+        try: return pagina >= 1 and (self.bits >> int(pagina)) & 1 == 1
+        except TypeError: return False
+
+    def __or__(self, outro):
+        return ConjuntoPaginas._de_bits(self.bits | ConjuntoPaginas(outro).bits)
+
+    def __and__(self, outro):
+        return ConjuntoPaginas._de_bits(self.bits & ConjuntoPaginas(outro).bits)
+
+    def __sub__(self, outro):
+        return ConjuntoPaginas._de_bits(self.bits & ~ConjuntoPaginas(outro).bits)
+
+    __ror__ = __or__
+    __rand__ = __and__
+
+    def __eq__(self, outro):
+        if isinstance(outro, ConjuntoPaginas): return self.bits == outro.bits
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __repr__(self):
+        return f"ConjuntoPaginas('{self.texto()}')"
+
+
+# ==============================================================================
+# COLUNAS DO PANDAS
+# ==============================================================================
+
+def contar_paginas(serie):
+    """Páginas de cada célula ("1-120,122" ou "'1, 2, 3") sem laço em Python"""
+    faixas = serie.astype(str).str.extractall(FAIXA.pattern)
+    if faixas.empty: return pd.Series(0, index=serie.index)
+    inicio = pd.to_numeric(faixas[0])
+    fim = pd.to_numeric(faixas[1]).fillna(inicio)
+    qtd = (fim - inicio + 1).where((inicio >= 1) & (fim >= inicio), 0)
+    return qtd.groupby(level=0).sum().reindex(serie.index, fill_value=0).astype(int)
@@ -0,0 +1,114 @@
+"""Produtividade por operador, site e período (páginas/h, produtos/h, tempo por letra).
+
+Os logs viram agregados por (dia, operador, site, letra) uma vez só. Dia fechado
+não muda mais: os meses arquivados têm os agregados guardados em Parquet ao lado
+das partições, e os dias fechados da aba quente ficam em memória. Só o dia de
+hoje é recalculado a cada relatório.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from arquivo_logs import FUSO, meses_entre, mes_de, tipar_logs
+
+ACOES_PRODUTIVAS = ["PAUSA", "FIM"]
+COLUNAS_DIA = ["Data", "Operador", "Site", "Letra"]
+METRICAS_DIA = ["Segundos", "Paginas", "Produtos", "Letras"]
+
+AGRUPAMENTOS = ["Operador", "Site", "Letra"]
+PERIODOS = {"Total": None, "Dia": "D", "Semana": "W-SUN", "Mês": "M"}
+
+# ==============================================================================
+# AGREGADOS DIÁRIOS E RELATÓRIO
+# ==============================================================================
+
+def agregar_dias(logs):
+    """Logs tipados (tipar_logs) -> uma linha por dia, operador, site e letra.
+
+    Segundos conta só o tempo fechado em PAUSA/FIM, como o resumo diário;
+    Letras é a quantidade de FIM (letras concluídas).
+    """
+    base = pd.DataFrame({
+        "Data": logs["Data_Hora"].dt.normalize(),
+        "Operador": logs["Operador"], "Site": logs["Site"], "Letra": logs["Letra"],
+        "Segundos": logs["Tempo_Decorrido"].where(logs["Acao"].isin(ACOES_PRODUTIVAS), 0),
+        "Paginas": logs["Paginas"], "Produtos": logs["Qtd_Total"],
+        "Letras": (logs["Acao"] == "FIM").astype("int64"),
+    }).dropna(subset=["Data"])
+    return base.groupby(COLUNAS_DIA, observed=True, as_index=False)[METRICAS_DIA].sum()
+
+
+class Produtividade:
+    """Relatórios sobre um ArquivoLogs, com os agregados de dias fechados em cache"""
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.dias = {}
+        self.lock = threading.Lock()
+
+    def _mes_arquivado(self, mes):
+        caminho = self.arquivo._caminho(mes, "dias")
+        if os.path.exists(caminho):
+            try:
+                df = pd.read_parquet(caminho)
+                if list(df.columns) == COLUNAS_DIA + METRICAS_DIA: return df
+            except Exception: pass
+        df = agregar_dias(self.arquivo.particao(mes))
+        try:
+            os.makedirs(self.arquivo.pasta, exist_ok=True)
+            df.to_parquet(caminho + ".tmp", index=False)
+            os.replace(caminho + ".tmp", caminho)
+        except OSError: pass
+        return df
+
+    def agregados(self, inicio, fim, hoje=None):
+        """Agregados diários de `inicio` a `fim` (datas, inclusive).
+
+        Os dias fechados da aba quente vêm do cache, que só lê a aba inteira se
+        faltar algum deles; de hoje são lidas apenas as linhas do dia.
+        """
+        hoje = pd.Timestamp(hoje or datetime.now(FUSO).date())
+        inicio, fim = pd.Timestamp(inicio), pd.Timestamp(fim)
+        arquivados = set(self.arquivo.repo.particoes_logs())
+        partes = [self._mes_arquivado(mes) for mes in meses_entre(inicio, fim) if mes in arquivados]
+
+        dias_quentes = [d for d in pd.date_range(inicio, fim) if mes_de(d) not in arquivados]
+        fechados = [d for d in dias_quentes if d < hoje]
+        with self.lock:
+            if any(d not in self.dias for d in fechados):
+                quentes = agregar_dias(self.arquivo.quentes())
+                vazio = quentes.iloc[0:0]
+                self.dias.update({d: df for d, df in quentes.groupby("Data") if d < hoje})
+                for d in fechados: self.dias.setdefault(d, vazio)
+            partes += [self.dias[d] for d in fechados]
+        if hoje in dias_quentes: partes.append(agregar_dias(self.arquivo.do_dia(hoje)))
+
+        if not partes: return agregar_dias(tipar_logs([]))
+        df = pd.concat(partes, ignore_index=True)
+        for c in COLUNAS_DIA[1:]: df[c] = df[c].astype(str)
+        return df[(df["Data"] >= inicio) & (df["Data"] <= fim)].reset_index(drop=True)
+
+    def relatorio(self, inicio, fim, por=("Operador",), periodo=None, hoje=None):
+        """Totais e taxas agrupados por `por` (colunas de AGRUPAMENTOS) e, se dado, por
+        `periodo` ("D", "W-SUN", "M")."""
+        dias = self.agregados(inicio, fim, hoje)
+        chaves = list(por)
+        if periodo:
+            dias = dias.assign(Periodo=dias["Data"].dt.to_period(periodo).dt.start_time)
+            chaves = ["Periodo"] + chaves
+        if not chaves: dias, chaves = dias.assign(Total="Total"), ["Total"]
+        res = dias.groupby(chaves, as_index=False)[METRICAS_DIA].sum()
+        horas = res["Segundos"] / 3600
+        res["Horas"] = horas.round(2)
+        res["Páginas/h"] = (res["Paginas"] / horas.where(horas > 0)).round(1)
+        res["Produtos/h"] = (res["Produtos"] / horas.where(horas > 0)).round(0)
+        res["Min/Letra"] = (res["Segundos"] / 60 / res["Letras"].where(res["Letras"] > 0)).round(1)
+        return res.drop(columns="Segundos")
+
+
+def periodo_padrao(dias=30, hoje=None):
+    """(início, fim) dos últimos `dias` dias, incluindo hoje"""
+    hoje = hoje or datetime.now(FUSO).date()
+    return hoje - timedelta(days=dias - 1), hoje
@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+from cota import AGENDADOR
+
+# ==============================================================================
+# 1. HISTOGRAMA
+# ==============================================================================
+
+# Limites das faixas de latência, em ms (a última faixa é "acima de 10 s")
+LIMITES_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+METODOS_ESCRITA = {"update_cell", "update", "batch_update", "append_row", "append_rows", "delete_row",
+                   "delete_rows", "add_worksheet", "del_worksheet", "clear", "insert_row", "insert_rows"}
+# Métodos que não chamam a API do Sheets (login é a renovação do token OAuth): fora da cota e da medição
+METODOS_LOCAIS = {"login", "set_timeout"}
+
+
+class Histograma:
+    __slots__ = ("faixas", "total", "soma")
+
+    def __init__(self):
+        self.faixas = [0] * (len(LIMITES_MS) + 1)
+        self.total = 0
+        self.soma = 0.0
+
+    def observar(self, ms):
+        i = 0
+        while i < len(LIMITES_MS) and ms > LIMITES_MS[i]: i += 1
+        self.faixas[i] += 1
+        self.total += 1
+        self.soma += ms
+
+    def percentil(self, p):
+        """Limite superior da faixa onde cai o percentil `p` (0-100)"""
+        if not self.total: return 0
+        alvo, acumulado = self.total * p / 100, 0
+        for i, qtd in enumerate(self.faixas):
+            acumulado += qtd
+            if acumulado >= alvo: return LIMITES_MS[i] if i < len(LIMITES_MS) else float("inf")
+        return float("inf")
+
+    def media(self):
+        return self.soma / self.total if self.total else 0
+
+
+def tamanho(obj, amostra=200):
+    """Estimativa barata dos bytes de um payload (listas grandes são amostradas)"""
+    if obj is None: return 0
+    if isinstance(obj, (str, bytes)): return len(obj)
+    if isinstance(obj, (int, float, bool)): return 8
+    if isinstance(obj, dict):
+        return sum(tamanho(k) + tamanho(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set)):
+        itens = list(obj) if not isinstance(obj, list) else obj
+        if len(itens) <= amostra: return sum(tamanho(i) for i in itens)
+        parcial = sum(tamanho(i) for i in itens[:amostra])
+        return int(parcial * len(itens) / amostra)
+    return 0
+
+# ==============================================================================
+# 2. COLETOR
+# ==============================================================================
+
+class Telemetria:
+    """Contadores do processo: chamadas ao Sheets, seções do rerun e sessões.
+
+    Cada rerun do Streamlit roda numa thread; `iniciar_rerun` guarda nela a
+    sessão e o operador, e as chamadas feitas durante o rerun são atribuídas a
+    eles. Chamadas de outras threads (fila de escrita) ficam com o nome da thread.
+    Ao fim de cada rerun uma linha JSON é anexada ao `arquivo`; o rerun cortado
+    por `st.stop`/`st.rerun` é fechado no início do seguinte da mesma sessão.
+    Com `agendador` (cota.Agendador), toda chamada instrumentada passa antes
+    pelo balde de cota, e a fila e os estrangulamentos entram nas métricas.
+    """
+
+    def __init__(self, arquivo=None, max_sessoes=200, agendador=None):
+        self.arquivo = arquivo
+        self.max_sessoes = max_sessoes
+        self.agendador = agendador
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.zerar()
+
+    def configurar(self, arquivo):
+        self.arquivo = arquivo
+
+    def zerar(self):
+        with self.lock:
+            self.chamadas = {}
+            self.bytes = Counter()
+            self.erros = Counter()
+            self.secoes = {}
+            self.sessoes = OrderedDict()
+            self.abertos = {}
+            self.leituras = deque()
+            self.escritas = deque()
+        if self.agendador is not None: self.agendador.zerar()
+
+    # --- rerun ---
+    def iniciar_rerun(self, sessao, operador=None):
+        # Rerun anterior da sessão interrompido por st.stop/st.rerun: fecha agora
+        self.finalizar_rerun(sessao)
+        rerun = {"sessao": sessao, "operador": operador or "", "inicio": time.perf_counter(),
+                 "chamadas": Counter(), "bytes": 0, "secoes": {}}
+        self.local.rerun = rerun
+        with self.lock:
+            self.abertos[sessao] = rerun
+            self._sessao(sessao, operador)["reruns"] += 1
+
+    def finalizar_rerun(self, sessao=None):
+        """Fecha o rerun da sessão (no fim do script ou no início do próximo rerun)"""
+        atual = getattr(self.local, "rerun", None)
+        if sessao is None and atual is not None: sessao = atual["sessao"]
+        with self.lock: rerun = self.abertos.pop(sessao, None)
+        if rerun is None: return
+        if atual is rerun: self.local.rerun = None
+        linha = {"ts": round(time.time(), 3), "sessao": rerun["sessao"], "operador": rerun["operador"],
+                 "ms": round((time.perf_counter() - rerun["inicio"]) * 1000, 1),
+                 "secoes": rerun["secoes"], "chamadas": dict(rerun["chamadas"]), "bytes": rerun["bytes"]}
+        if rerun.get("espera_cota_ms"): linha["espera_cota_ms"] = rerun["espera_cota_ms"]
+        self._anexar(linha)
+
+    @contextmanager
+    def secao(self, nome):
+        inicio = time.perf_counter()
+        try: yield
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            with self.lock: self.secoes.setdefault(nome, Histograma()).observar(ms)
+            rerun = getattr(self.local, "rerun", None)
+            if rerun is not None: rerun["secoes"][nome] = round(rerun["secoes"].get(nome, 0) + ms, 1)
+
+    def _sessao(self, sessao, operador=None):
+        dados = self.sessoes.get(sessao)
+        if dados is None:
+            dados = self.sessoes[sessao] = {"operador": operador or "", "reruns": 0, "chamadas": 0,
+                                            "leituras": deque(), "bytes": 0}
+            while len(self.sessoes) > self.max_sessoes: self.sessoes.popitem(last=False)
+        elif operador: dados["operador"] = operador
+        self.sessoes.move_to_end(sessao)
+        return dados
+
+    # --- chamadas ao Sheets ---
+    def registrar_espera(self, segundos):
+        """Tempo que a chamada ficou na fila da cota (fora da latência do Google)"""
+        rerun = getattr(self.local, "rerun", None)
+        if rerun is not None: rerun["espera_cota_ms"] = round(rerun.get("espera_cota_ms", 0) + segundos * 1000, 1)
+
+    def registrar_chamada(self, aba, metodo, ms, bytes_=0, erro=None):
+        nome = f"{aba}.{metodo}"
+        agora = time.time()
+        rerun = getattr(self.local, "rerun", None)
+        sessao = rerun["sessao"] if rerun else threading.current_thread().name
+        escrita = metodo in METODOS_ESCRITA
+        with self.lock:
+            self.chamadas.setdefault(nome, Histograma()).observar(ms)
+            self.bytes[nome] += bytes_
+            if erro is not None: self.erros[nome] += 1
+            dados = self._sessao(sessao)
+            dados["chamadas"] += 1
+            dados["bytes"] += bytes_
+            janelas = [self.escritas] if escrita else [self.leituras, dados["leituras"]]
+            for janela in janelas:
+                janela.append(agora)
+                while janela[0] < agora - 60: janela.popleft()
+        if rerun is not None:
+            rerun["chamadas"][nome] += 1
+            rerun["bytes"] += bytes_
+
+    def por_minuto(self):
+        """(leituras, escritas) nos últimos 60 s, o que conta para a cota do Google"""
+        limite = time.time() - 60
+        with self.lock:
+            for fila in (self.leituras, self.escritas):
+                while fila and fila[0] < limite: fila.popleft()
+            return len(self.leituras), len(self.escritas)
+
+    # --- consulta ---
+    def resumo_chamadas(self):
+        with self.lock:
+            return [{"Chamada": nome, "Qtd": h.total, "Média ms": round(h.media(), 1), "p50 ms": h.percentil(50),
+                     "p95 ms": h.percentil(95), "KB": round(self.bytes[nome] / 1024, 1), "Erros": self.erros[nome]}
+                    for nome, h in sorted(self.chamadas.items(), key=lambda i: -i[1].soma)]
+
+    def resumo_secoes(self):
+        with self.lock:
+            return [{"Seção": nome, "Reruns": h.total, "Média ms": round(h.media(), 1),
+                     "p95 ms": h.percentil(95)} for nome, h in self.secoes.items()]
+
+    def resumo_sessoes(self):
+        limite = time.time() - 60
+        with self.lock:
+            linhas = []
+            for sessao, d in reversed(self.sessoes.items()):
+                while d["leituras"] and d["leituras"][0] < limite: d["leituras"].popleft()
+                linhas.append({"Sessão": str(sessao)[:8], "Operador": d["operador"], "Reruns": d["reruns"],
+                               "Chamadas": d["chamadas"], "Leituras/min": len(d["leituras"]),
+                               "KB": round(d["bytes"] / 1024, 1)})
+            return linhas
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        leituras, escritas = self.por_minuto()
+        saida = ["# TYPE associacao_sheets_chamada_ms histogram"]
+        with self.lock:
+            for nome, h in sorted(self.chamadas.items()):
+                rotulo = f'chamada="{nome}"'
+                acumulado = 0
+                for limite, qtd in zip(LIMITES_MS, h.faixas):
+                    acumulado += qtd
+                    saida.append(f'associacao_sheets_chamada_ms_bucket{{{rotulo},le="{limite}"}} {acumulado}')
+                saida.append(f'associacao_sheets_chamada_ms_bucket{{{rotulo},le="+Inf"}} {h.total}')
+                saida.append(f"associacao_sheets_chamada_ms_sum{{{rotulo}}} {round(h.soma, 3)}")
+                saida.append(f"associacao_sheets_chamada_ms_count{{{rotulo}}} {h.total}")
+            saida.append("# TYPE associacao_sheets_bytes_total counter")
+            saida += [f'associacao_sheets_bytes_total{{chamada="{n}"}} {b}' for n, b in sorted(self.bytes.items())]
+            saida.append("# TYPE associacao_secao_ms summary")
+            for nome, h in sorted(self.secoes.items()):
+                saida.append(f'associacao_secao_ms_sum{{secao="{nome}"}} {round(h.soma, 3)}')
+                saida.append(f'associacao_secao_ms_count{{secao="{nome}"}} {h.total}')
+        saida.append("# TYPE associacao_sheets_por_minuto gauge")
+        saida.append(f'associacao_sheets_por_minuto{{tipo="leitura"}} {leituras}')
+        saida.append(f'associacao_sheets_por_minuto{{tipo="escrita"}} {escritas}')
+        texto = "\n".join(saida) + "\n"
+        return texto + self.agendador.prometheus() if self.agendador is not None else texto
+
+    def _anexar(self, linha):
+        if not self.arquivo: return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.arquivo)), exist_ok=True)
+            with self.lock, open(self.arquivo, "a", encoding="utf-8") as f:
+                f.write(json.dumps(linha, ensure_ascii=False) + "\n")
+        except OSError: pass
+
+
+TELEMETRIA = Telemetria(agendador=AGENDADOR)
+
+# ==============================================================================
+# 3. INSTRUMENTAÇÃO DO GSPREAD
+# ==============================================================================
+
+class Instrumentado:
+    """Envolve client, planilha ou aba do gspread e mede cada método chamado.
+
+    Planilhas e abas devolvidas (`open`, `worksheet`, `.spreadsheet`) também
+    saem envolvidas, então basta instrumentar o client.
+    """
+
+    def __init__(self, alvo, nome="*", telemetria=None):
+        self._alvo = alvo
+        self._nome = nome
+        self._telemetria = telemetria or TELEMETRIA
+
+    def __getattr__(self, nome):
+        valor = getattr(self._alvo, nome)
+        if nome == "spreadsheet": return Instrumentado(valor, "*", self._telemetria)
+        if nome.startswith("_") or nome in METODOS_LOCAIS or not callable(valor): return valor
+
+        @wraps(valor)
+        def chamar(*args, **kwargs):
+            agendador, escrita = self._telemetria.agendador, nome in METODOS_ESCRITA
+            if agendador is not None:
+                espera = agendador.obter(escrita)
+                if espera: self._telemetria.registrar_espera(espera)
+            inicio, erro, resultado = time.perf_counter(), None, None
+            try:
+                resultado = valor(*args, **kwargs)
+                return self._envolver(resultado)
+            except Exception as e:
+                erro = e
+                if agendador is not None and _status(e) == 429: agendador.esgotar(escrita)
+                raise
+            finally:
+                ms = (time.perf_counter() - inicio) * 1000
+                enviados = tamanho(args) + tamanho(kwargs)
+                recebidos = 0 if _e_handle(resultado) else tamanho(resultado)
+                self._telemetria.registrar_chamada(self._nome, nome, ms, enviados + recebidos, erro)
+        return chamar
+
+    def _envolver(self, resultado):
+        if _e_handle(resultado):
+            return Instrumentado(resultado, getattr(resultado, "title", "*") if _e_aba(resultado) else "*",
+                                 self._telemetria)
+        return resultado
+
+    def __repr__(self):
+        return f"Instrumentado({self._alvo!r})"
+
+
+def _status(erro):
+    return getattr(getattr(erro, "response", None), "status_code", None)
+
+
+def _e_aba(obj):
+    return hasattr(obj, "get_all_values") and hasattr(obj, "title")
+
+
+def _e_handle(obj):
+    return not isinstance(obj, Instrumentado) and (_e_aba(obj) or hasattr(obj, "worksheet"))
+
+
+def instrumentar(client, telemetria=None):
+    if client is None or isinstance(client, Instrumentado): return client
+    return Instrumentado(client, "*", telemetria)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cota import AGENDADOR  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cota_livre():
+    """A cota do processo é global: sem limite nos testes, salvo os que configuram a própria"""
+    limites = ({t: b.por_minuto for t, b in AGENDADOR.baldes.items()}, AGENDADOR.reserva)
+    AGENDADOR.configurar(None, None)
+    AGENDADOR.zerar()
+    yield
+    AGENDADOR.configurar(limites[0]["leitura"], limites[0]["escrita"], limites[1])
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cadastro_lotes import sites_cadastrados, validar_lote  # noqa: E402
+
+SITES = ["C1 - X", "C2 - Y"]
+REGRAS = {"C1 - X": ["Q"], "C2 - Y": []}
+
+
+def linha(site="C1 - X", letra="A", total="10", ultima=""):
+    return {"Site": site, "Letra": letra, "Qtd_Paginas": total, "Qtd_Ultima_Pag": ultima}
+
+
+def test_sites_cadastrados_ignora_cliente_vazio_e_le_delete_letras():
+    varreduras = [{"Cliente": "C2", "Concorrente": "Y", "Delete_Letras": ""},
+                  {"Cliente": "", "Concorrente": "Z", "Delete_Letras": "A"},
+                  {"Cliente": "C1", "Concorrente": "X", "Delete_Letras": "q, w ,"}]
+    assert sites_cadastrados(varreduras) == (SITES, {"C1 - X": ["Q", "W"], "C2 - Y": []})
+
+
+def test_validar_lote_monta_registros_com_os_padroes():
+    registros, existentes, rejeitadas = validar_lote([linha(letra="b", total="12,0"), linha("C2 - Y", ultima="40")],
+                                                     SITES, REGRAS, set(), "ana")
+    assert (existentes, rejeitadas) == ([], [])
+    assert registros[0] == {"Chave": "C1 - X | B", "Site": "C1 - X", "Letra": "B", "Qtd_Paginas": 12,
+                            "Paginas_Concluidas": "", "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}
+    assert (registros[1]["Chave"], registros[1]["Qtd_Ultima_Pag"]) == ("C2 - Y | A", 40)
+
+
+def test_validar_lote_separa_existentes_e_rejeitadas():
+    lote = [linha(), linha(letra="B"), {"Site": "", "Letra": ""}, linha("C9 - Z"), linha(letra="AB"),
+            linha(letra="Q"), linha(letra="C", total="0"), linha(letra="D", total="x"), linha(letra="E", ultima="101"),
+            linha(letra="B")]
+    registros, existentes, rejeitadas = validar_lote(lote, SITES, REGRAS, {"C1 - X | A"})
+    assert [r["Chave"] for r in registros] == ["C1 - X | B"]
+    assert existentes == ["C1 - X | A"]
+    # A linha em branco (3) é pulada sem virar rejeição; a numeração segue o lote
+    assert [n for n, _ in rejeitadas] == [4, 5, 6, 7, 8, 9, 10]
+    assert "Delete_Letras" in dict(rejeitadas)[6]
+    assert "repetida" in dict(rejeitadas)[10]
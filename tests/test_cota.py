@@ -0,0 +1,104 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cota  # noqa: E402
+from cota import ESCRITA, LETRA, PAUSA_429, RESUMO, Agendador, SemCota  # noqa: E402
+
+
+def esperar_fila(agendador, tamanho, tipo="leitura"):
+    fim = time.time() + 5
+    while len(agendador.filas[tipo]) < tamanho and time.time() < fim: time.sleep(0.01)
+    assert len(agendador.filas[tipo]) == tamanho
+
+
+def liberar_uma(agendador, tipo="leitura"):
+    """Devolve a ficha gasta há mais tempo, como se o minuto dela tivesse passado"""
+    with agendador.cond:
+        agendador.baldes[tipo].gastas.popleft()
+        agendador.cond.notify_all()
+
+
+def test_fila_atende_letra_antes_de_resumo_que_chegou_antes():
+    agendador = Agendador(leituras_por_minuto=1, reserva=0)
+    agendador.obter()
+    ordem = []
+
+    def pedir(classe):
+        with agendador.prioridade(classe):
+            agendador.obter()
+            ordem.append(classe)
+
+    resumo = threading.Thread(target=pedir, args=(RESUMO,))
+    resumo.start()
+    esperar_fila(agendador, 1)
+    letra = threading.Thread(target=pedir, args=(LETRA,))
+    letra.start()
+    esperar_fila(agendador, 2)
+
+    liberar_uma(agendador)
+    letra.join(5)
+    assert ordem == [LETRA]
+    liberar_uma(agendador)
+    resumo.join(5)
+    assert ordem == [LETRA, RESUMO]
+
+
+def test_escrita_tem_balde_proprio():
+    agendador = Agendador(leituras_por_minuto=1, escritas_por_minuto=1)
+    agendador.obter()
+    assert agendador.obter(escrita=True) == 0.0
+    assert agendador.estado()["fichas"] == {"leitura": 0, "escrita": 0}
+
+
+def test_resumo_nao_gasta_a_reserva_e_recebe_sem_cota_sem_esperar():
+    agendador = Agendador(leituras_por_minuto=4, reserva=0.5)
+    agendador.obter()
+    agendador.obter()
+    # Sobram 2 fichas, e o resumo precisa deixar 2 de reserva
+    with agendador.prioridade(RESUMO, esperar=False):
+        with pytest.raises(SemCota): agendador.obter()
+    assert agendador.obter() == 0.0
+    assert agendador.contagem[("leitura", RESUMO, "recusada")] == 1
+    assert agendador.estado()["fila"] == {ESCRITA: 0, LETRA: 0, RESUMO: 0}
+
+
+def test_desiste_depois_da_espera_maxima(monkeypatch):
+    monkeypatch.setitem(cota.ESPERA_MAX, LETRA, 0.1)
+    agendador = Agendador(leituras_por_minuto=1)
+    agendador.obter()
+    with pytest.raises(SemCota): agendador.obter()
+    assert agendador.contagem[("leitura", LETRA, "desistiu")] == 1
+    assert not agendador.filas["leitura"]
+
+
+def test_429_zera_as_fichas_pela_pausa():
+    agendador = Agendador(leituras_por_minuto=10)
+    agendador.obter()
+    agendador.esgotar()
+    balde = agendador.baldes["leitura"]
+    assert agendador.estado()["fichas"]["leitura"] == 0
+    assert PAUSA_429 - 1 < balde.espera(1) <= PAUSA_429
+    assert agendador.contagem[("leitura", LETRA, "429")] == 1
+    # As escritas não são afetadas por um 429 de leitura
+    assert agendador.obter(escrita=True) == 0.0
+
+
+def test_sem_limite_nao_conta():
+    agendador = Agendador(leituras_por_minuto=None, escritas_por_minuto=None)
+    for _ in range(100): assert agendador.obter() == 0.0
+
+
+def test_fichas_voltam_depois_da_pausa_do_429(monkeypatch):
+    monkeypatch.setattr(cota, "PAUSA_429", 0.2)
+    agendador = Agendador(leituras_por_minuto=3)
+    agendador.obter()
+    agendador.esgotar()
+    inicio = time.monotonic()
+    agendador.obter()
+    assert 0.1 < time.monotonic() - inicio < 2
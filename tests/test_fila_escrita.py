@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmark"))
+
+from armazenamento import (ABA_ACOMPANHAMENTO, ABA_CONTROLE, ABA_LOGS, COLUNAS_ACOMPANHAMENTO,  # noqa: E402
+                           COLUNAS_CONTROLE, COLUNAS_LOGS, STATUS_RESERVA, RepositorioSheets)
+from fila_escrita import FilaEscrita, agrupar  # noqa: E402
+from planilha_falsa import ClienteFalso  # noqa: E402
+
+
+def planilha(reservas=()):
+    return ClienteFalso({
+        ABA_CONTROLE: [list(COLUNAS_CONTROLE)],
+        ABA_LOGS: [list(COLUNAS_LOGS)],
+        ABA_ACOMPANHAMENTO: [list(COLUNAS_ACOMPANHAMENTO)] + [list(r) for r in reservas],
+    })
+
+
+def fila_sobre(cliente, tmp_path, **kwargs):
+    return FilaEscrita(RepositorioSheets(lambda: cliente), str(tmp_path / "fila.db"), **kwargs)
+
+
+def reserva(pagina, chave="K"):
+    return [chave, "A", pagina, STATUS_RESERVA]
+
+
+def test_desmarcar_e_remarcar_antes_do_envio_nao_duplica_a_reserva(tmp_path):
+    cliente = planilha([reserva(5)])
+    fila = fila_sobre(cliente, tmp_path)
+    with fila.lock_aplicacao:
+        fila.remover_reservas("K", [5])
+        fila.adicionar_reservas([reserva(5)])
+        assert fila.paginas_reservadas("K") == {5}
+    assert fila.aguardar(10)
+    linhas = cliente.planilha.abas[ABA_ACOMPANHAMENTO].linhas[1:]
+    assert [(l[0], int(l[2])) for l in linhas] == [("K", 5)]
+    assert not fila.diario.pendentes()
+
+
+def test_reservar_desmarcar_e_reservar_de_novo_fica_uma_reserva():
+    ops = [(1, "reserva_add", {"linhas": [reserva(7)]}), (2, "reserva_del", {"linhas": [["K", "", 7, ""]]}),
+           (3, "reserva_add", {"linhas": [reserva(7)]})]
+    ids, (tipo, _) = agrupar(ops)["reserva"][("K", 7)]
+    assert ids == [1, 2, 3] and tipo == "reserva_add"
+
+
+def log(operador, hora, acao="PAUSA"):
+    return ["s1", operador, "C1 - X", "A", acao, f"10/03/2026 {hora}", "0", "60", "1-3", "10", "300"]
+
+
+def controle(chave, concluidas, operador="ana"):
+    return {"Chave": chave, "Site": "C1", "Letra": "A", "Qtd_Paginas": 10, "Paginas_Concluidas": concluidas,
+            "Qtd_Ultima_Pag": 100, "Ultimo_Operador": operador, "Revisao": 1}
+
+
+def test_agrupar_junta_as_escritas_da_mesma_chave():
+    registro = {"Chave": "K", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10}
+    grupos = agrupar([
+        (1, "controle", controle("K", "1")), (2, "controle", controle("K", "1-2")),
+        (3, "progresso", {"registro": registro, "novas": "3"}),
+        (4, "progresso", {"registro": dict(registro, Ultimo_Operador="bob"), "novas": "5-6"}),
+        (5, "log", log("ana", "08:00:00")), (6, "log", log("bob", "08:01:00")),
+        (7, "somar_producao", {"operador": "ana", "data": "10/03/2026", "valores": [60, 2, 200]}),
+        (8, "somar_producao", {"operador": "ana", "data": "10/03/2026", "valores": [30, 1, 100]}),
+        (9, "definir_producao", {"operador": "bob", "data": "10/03/2026", "valores": [10, 1, 10]}),
+        (10, "somar_producao", {"operador": "bob", "data": "10/03/2026", "valores": [5, 1, 5]}),
+    ])
+    assert grupos["controle"]["K"] == ([1, 2], controle("K", "1-2"))
+    ids, ultimo, novas = grupos["progresso"]["K"]
+    assert ids == [3, 4] and ultimo["Ultimo_Operador"] == "bob" and novas == "3,5-6"
+    assert [i for i, _ in grupos["log"]] == [5, 6]
+    assert grupos["producao"][("ana", "10/03/2026")] == ([7, 8], None, [90, 3, 300])
+    assert grupos["producao"][("bob", "10/03/2026")] == ([9, 10], [10, 1, 10], [5, 1, 5])
+
+
+def test_etapas_saem_na_ordem_logs_controle_progresso_producao_reservas(tmp_path):
+    fila = fila_sobre(planilha(), tmp_path)
+    with fila.lock_aplicacao:
+        fila.adicionar_reservas([reserva(1)])
+        fila.somar_producao("ana", "10/03/2026", 60, 1, 100)
+        fila.registrar_progresso({"Chave": "P", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10,
+                                  "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}, [1])
+        fila.salvar_controle(controle("K", "1"))
+        fila.anexar_log(log("ana", "08:00:00"))
+        chamadas = []
+        for nome in ("anexar_logs", "salvar_controles", "registrar_progresso", "somar_producao",
+                     "adicionar_reservas"):
+            original = getattr(fila.repo, nome)
+            setattr(fila.repo, nome, lambda *a, _n=nome, _f=original: (chamadas.append(_n), _f(*a))[1])
+        etapas = fila._etapas(agrupar(fila.diario.pendentes()))
+        for _, aplicar in etapas: aplicar()
+    assert chamadas == ["anexar_logs", "salvar_controles", "registrar_progresso", "somar_producao",
+                        "adicionar_reservas"]
+
+
+def test_etapa_aplicada_sai_do_diario_mesmo_se_a_seguinte_falha(tmp_path):
+    cliente = planilha()
+    fila = fila_sobre(cliente, tmp_path, intervalo=3600)
+    # Direto no diário: o worker não acorda, quem drena é o teste
+    fila.diario.incluir("log", log("ana", "08:00:00"))
+    fila.diario.incluir("somar_producao", {"operador": "ana", "data": "10/03/2026", "valores": [60, 1, 100]})
+
+    def falhar(*args): raise RuntimeError("linha inválida")
+    fila.repo.somar_producao = falhar
+    try: fila.drenar()
+    except RuntimeError: pass
+    else: raise AssertionError("a falha da produção deveria subir")
+    assert [tipo for _, tipo, _ in fila.diario.pendentes()] == ["somar_producao"]
+    assert len(cliente.planilha.abas[ABA_LOGS].linhas) == 2
+    assert fila.diario.total_falhas() == 0
+
+
+def test_etapa_que_sempre_falha_vai_para_falhas_e_libera_a_fila(tmp_path):
+    fila = fila_sobre(planilha(), tmp_path, intervalo=3600, max_tentativas=3)
+    fila.diario.incluir("somar_producao", {"operador": "ana", "data": "10/03/2026", "valores": [60, 1, 100]})
+    fila.diario.incluir("log", log("ana", "08:00:00"))
+
+    def falhar(*args): raise RuntimeError("linha inválida")
+    fila.repo.somar_producao = falhar
+    for _ in range(2):
+        try: fila.drenar()
+        except RuntimeError: pass
+    assert len(fila.diario.pendentes()) == 1
+    fila.drenar()
+    assert not fila.diario.pendentes()
+    assert fila.diario.total_falhas() == 1
+    tipo, erro = fila.diario.conn.execute("SELECT tipo, erro FROM falhas").fetchone()
+    assert tipo == "somar_producao" and "linha inválida" in erro
+
+
+def test_erro_de_cota_espera_com_backoff_sem_descartar(tmp_path):
+    cliente = planilha()
+    cliente.medidor.cotas["escrita"] = 0
+    fila = fila_sobre(cliente, tmp_path, intervalo=0.02, espera_max=0.2, max_tentativas=1)
+    fila.anexar_log(log("ana", "08:00:00"))
+    espera = time.time() + 5
+    while sum(1 for c in cliente.medidor.chamadas if c["429"]) < 4 and time.time() < espera: time.sleep(0.01)
+
+    tentativas = [c for c in cliente.medidor.chamadas if c["429"]]
+    assert len(tentativas) >= 4
+    assert fila.ultimo_erro and "APIError" in fila.ultimo_erro
+    assert len(fila.diario.pendentes()) == 1 and fila.diario.total_falhas() == 0
+
+    cliente.medidor.cotas["escrita"] = None
+    assert fila.aguardar(5)
+    assert len(cliente.planilha.abas[ABA_LOGS].linhas) == 2
+    assert fila.diario.total_falhas() == 0
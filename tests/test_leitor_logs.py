@@ -0,0 +1,110 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import COLUNAS_LOGS, LeitorLogs  # noqa: E402
+
+DIA = "10/03/2026"
+
+
+def log(operador, hora, acao="PAUSA"):
+    return ["s1", operador, "C1 - X", "A", acao, f"{DIA} {hora}", "0", "60", "1-3", "10", "300"]
+
+
+class AbaLogs:
+    """Aba Logs mínima: get_all_values e get_values('A<n>:K')"""
+
+    def __init__(self, linhas):
+        self.linhas = [list(COLUNAS_LOGS)] + [list(l) for l in linhas]
+
+    def get_all_values(self, **kwargs):
+        return [list(l) for l in self.linhas]
+
+    def get_values(self, intervalo, **kwargs):
+        inicio = int(intervalo.split(":")[0][1:])
+        return [list(l) for l in self.linhas[inicio - 1:]]
+
+
+def test_atualizacoes_incrementais_nao_duplicam_linhas():
+    aba = AbaLogs([log("ana", "08:00:00"), log("bob", "08:05:00")])
+    leitor = LeitorLogs(intervalo_minimo=0)
+    leitor.atualizar(aba)
+    assert len(leitor.registros_do_dia("ana", DIA)) == 1
+
+    leitor.atualizar(aba)
+    leitor.atualizar(aba)
+    assert len(leitor.registros_do_dia("ana", DIA)) == 1
+    assert len(leitor.registros_do_dia("bob", DIA)) == 1
+
+    aba.linhas.append(log("bob", "09:00:00", "FIM"))
+    leitor.atualizar(aba)
+    leitor.atualizar(aba)
+    assert len(leitor.registros_do_dia("bob", DIA)) == 2
+    assert leitor.acao_do_operador("bob") == "FIM"
+    assert leitor.ultima_linha == len(aba.linhas)
+
+
+def test_dia_sem_linhas_nao_cai_na_leitura_completa():
+    aba = AbaLogs([log("ana", "08:00:00")])
+    leitor = LeitorLogs(intervalo_minimo=0)
+    leitor.atualizar(aba)
+    assert leitor.registros_do_dia("ana", "11/03/2026") == []
+    assert leitor.registros_do_dia("ana", "09/03/2026") is None
+
+
+def test_leitura_esperando_cota_nao_segura_a_memoria():
+    aba = AbaLogs([log("ana", "08:00:00", "INICIO")])
+    leitor = LeitorLogs(intervalo_minimo=0)
+    leitor.atualizar(aba)
+    chegou, liberar = threading.Event(), threading.Event()
+    ler = aba.get_values
+
+    def ler_devagar(intervalo, **kwargs):
+        # Uma leitura de resumo parada na fila da cota
+        chegou.set()
+        liberar.wait(5)
+        return ler(intervalo, **kwargs)
+    aba.get_values = ler_devagar
+
+    resumo = threading.Thread(target=leitor.atualizar, args=(aba,))
+    resumo.start()
+    assert chegou.wait(5)
+    inicio = time.monotonic()
+    assert leitor.acao_do_operador("ana") == "INICIO"
+    aba.linhas.append(log("ana", "09:00:00", "PAUSA"))
+    leitor.anotar_anexo(3, aba.linhas[2])
+    assert time.monotonic() - inicio < 1
+    liberar.set()
+    resumo.join(5)
+
+    assert leitor.acao_do_operador("ana") == "PAUSA"
+    assert len(leitor.registros_do_dia("ana", DIA)) == 2
+
+
+def test_lote_do_buscar_letra_confere_com_a_mesma_renderizacao(monkeypatch):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark"))
+    import planilha_falsa
+    from armazenamento import ABA_ACOMPANHAMENTO, ABA_CONTROLE, COLUNAS_ACOMPANHAMENTO, COLUNAS_CONTROLE, \
+        RepositorioSheets
+
+    # Qtd_Total com separador de milhar na planilha: "1.234" formatado, 1234 sem formatação
+    monkeypatch.setattr(planilha_falsa, "_formatar",
+                        lambda v: f"{v:,}".replace(",", ".") if isinstance(v, int) else str(v))
+    linhas = [["s1", "ana", "C1 - X", "A", "PAUSA", f"{DIA} 08:00:00", 0, 60, "1-3", 10, 1234]]
+    cliente = planilha_falsa.ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE)],
+                                           ABA_ACOMPANHAMENTO: [list(COLUNAS_ACOMPANHAMENTO)],
+                                           "Logs": [list(COLUNAS_LOGS)] + linhas})
+    repo = RepositorioSheets(lambda: cliente)
+    repo.leitor_logs.intervalo_minimo = 0
+    assert repo.ultima_acao("ana") == "PAUSA"
+    cliente.planilha.abas["Logs"].linhas.append(
+        ["s1", "ana", "C1 - X", "A", "FIM", f"{DIA} 09:00:00", 0, 60, "4-5", 10, 2345])
+
+    # A cauda vem no lote do buscar_letra; a âncora tem de bater sem reler a Logs
+    cliente.medidor.chamadas.clear()
+    repo.buscar_letra("C1 - X | A", atualizar_logs=True)
+    assert repo.leitor_logs.acao_do_operador("ana") == "FIM"
+    assert [c["metodo"] for c in cliente.medidor.chamadas if c["aba"] == "Logs"] == []
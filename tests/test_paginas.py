@@ -0,0 +1,31 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from paginas import ConjuntoPaginas  # noqa: E402
+
+
+def test_ler_corta_as_faixas_no_limite():
+    assert ConjuntoPaginas.ler("1-99999999999", limite=300).texto() == "1-300"
+    assert ConjuntoPaginas.ler("0-5", limite=300).texto() == "1-5"
+    assert ConjuntoPaginas.ler("295-400,7", limite=300).texto() == "7,295-300"
+    assert ConjuntoPaginas.ler("301-400", limite=300).texto() == ""
+    assert ConjuntoPaginas.ler(500, limite=300).texto() == ""
+
+
+def test_texto_e_ler_fazem_ida_e_volta():
+    for paginas in ([], [1], [1, 2, 3], [1, 3, 5], list(range(1, 121)) + [122] + list(range(130, 201))):
+        conjunto = ConjuntoPaginas(paginas)
+        assert ConjuntoPaginas.ler(conjunto.texto()) == conjunto
+        assert list(ConjuntoPaginas.ler(conjunto.texto())) == paginas
+    assert ConjuntoPaginas(list(range(1, 121)) + [122] + list(range(130, 201))).texto() == "1-120,122,130-200"
+
+
+def test_ler_aceita_o_formato_antigo_e_celulas_vazias():
+    assert list(ConjuntoPaginas.ler("'1, 2, 3")) == [1, 2, 3]
+    assert ConjuntoPaginas.ler("'1, 2, 3, 7, 8").texto() == "1-3,7-8"
+    assert ConjuntoPaginas.ler("'1, 2, 3", limite=2).texto() == "1-2"
+    assert ConjuntoPaginas.ler(3.0).texto() == "3"
+    for vazio in ("", "-", "'", None):
+        assert not ConjuntoPaginas.ler(vazio)
@@ -0,0 +1,33 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmark"))
+
+from armazenamento import ABA_LOGS, COLUNAS_LOGS, RepositorioSheets, aba_particao  # noqa: E402
+from planilha_falsa import ClienteFalso  # noqa: E402
+
+
+def log(operador, data_hora, paginas="1"):
+    return ["s1", operador, "C1 - X", "A", "PAUSA", data_hora, 0, 60, paginas, 10, 100]
+
+
+def test_arquivar_logs_apaga_as_faixas_e_as_datas_antigas_vem_da_particao():
+    # Fevereiro intercalado com março: duas faixas a apagar
+    linhas = [log("ana", "27/02/2026 08:00:00"), log("bob", "28/02/2026 09:00:00"),
+              log("ana", "01/03/2026 08:00:00"), log("bob", "28/02/2026 10:00:00", "2"),
+              log("ana", "02/03/2026 08:00:00")]
+    cliente = ClienteFalso({ABA_LOGS: [list(COLUNAS_LOGS)] + linhas})
+    repo = RepositorioSheets(lambda: cliente)
+
+    assert repo.arquivar_logs("2026_03") == {"2026_02": 3}
+    assert [l[5] for l in cliente.planilha.abas[ABA_LOGS].linhas[1:]] == ["01/03/2026 08:00:00", "02/03/2026 08:00:00"]
+    assert len(cliente.planilha.abas[aba_particao("2026_02")].linhas) == 4
+
+    # Só março fica em memória; fevereiro sai da partição
+    repo.leitor_logs.atualizar(repo._aba(ABA_LOGS), forcar=True)
+    assert [r["Operador"] for r in repo.logs_da_data("28/02/2026")] == ["bob", "bob"]
+    assert [str(r["Paginas_Turno"]) for r in repo.logs_do_dia("bob", "28/02/2026")] == ["1", "2"]
+    assert repo.logs_do_dia("ana", "28/02/2026") == []
+    assert [r["Operador"] for r in repo.logs_da_data("02/03/2026")] == ["ana"]
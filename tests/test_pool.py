@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import PoolPlanilha  # noqa: E402
+from cota import Agendador  # noqa: E402
+from telemetria import Instrumentado, Telemetria  # noqa: E402
+
+
+def agora_utc():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class Credenciais:
+    def __init__(self, expira_em):
+        self.token = "t"
+        self.expiry = agora_utc() + timedelta(seconds=expira_em)
+        self.renovacoes = 0
+
+    def refresh(self, pedido):
+        self.renovacoes += 1
+        self.expiry = agora_utc() + timedelta(hours=1)
+
+
+class Cliente:
+    def __init__(self, auth):
+        self.auth = auth
+
+    def login(self):
+        raise AssertionError("a renovação não passa pelo client")
+
+
+def test_token_perto_de_vencer_e_renovado_sem_gastar_cota():
+    agendador = Agendador(leituras_por_minuto=1)
+    telemetria = Telemetria(arquivo=None, agendador=agendador)
+    auth = Credenciais(expira_em=60)
+    pool = PoolPlanilha(lambda: Cliente(auth))
+    pool.client = Instrumentado(Cliente(auth), telemetria=telemetria)
+
+    pool._renovar_token()
+    pool._renovar_token()
+    assert auth.renovacoes == 1
+    assert agendador.estado()["fichas"]["leitura"] == 1
+
+
+def test_aba_aberta_nao_espera_quem_esta_abrindo_outra():
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark"))
+    from planilha_falsa import ClienteFalso
+
+    cliente = ClienteFalso({"A": [["x"]], "B": [["y"]]})
+    pool = PoolPlanilha(lambda: cliente)
+    pool.aba("A")
+    chegou, liberar = threading.Event(), threading.Event()
+    abrir = cliente.planilha.worksheet
+
+    def abrir_devagar(titulo):
+        chegou.set()
+        liberar.wait(5)
+        return abrir(titulo)
+    cliente.planilha.worksheet = abrir_devagar
+
+    outra = threading.Thread(target=pool.aba, args=("B",))
+    outra.start()
+    assert chegou.wait(5)
+    inicio = time.monotonic()
+    assert pool.aba("A").title == "A"
+    assert time.monotonic() - inicio < 1
+    liberar.set()
+    outra.join(5)
+    assert set(pool.abas) == {"A", "B"}
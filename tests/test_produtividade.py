@@ -0,0 +1,39 @@
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arquivo_logs import ArquivoLogs  # noqa: E402
+from armazenamento import RepositorioSQLite  # noqa: E402
+from produtividade import Produtividade  # noqa: E402
+
+
+class ArquivoContado(ArquivoLogs):
+    """Conta as leituras completas da aba quente"""
+    leituras_quentes = 0
+
+    def quentes(self):
+        self.leituras_quentes += 1
+        return super().quentes()
+
+
+def log(operador, data_hora, segundos):
+    return ["s1", operador, "C1 - X", "A", "PAUSA", data_hora, 0, segundos, "1-3", 10, 300]
+
+
+def test_relatorio_com_hoje_le_so_as_linhas_do_dia(tmp_path):
+    repo = RepositorioSQLite(str(tmp_path / "dados.db"))
+    repo.anexar_log(log("ana", "09/03/2026 10:00:00", 600))
+    repo.anexar_log(log("ana", "10/03/2026 10:00:00", 1200))
+    arquivo = ArquivoContado(repo, pasta=str(tmp_path / "arquivo"))
+    prod = Produtividade(arquivo)
+
+    dias = prod.agregados(date(2026, 3, 9), date(2026, 3, 10), hoje=date(2026, 3, 10))
+    assert dias["Segundos"].tolist() == [600, 1200]
+    assert arquivo.leituras_quentes == 1
+
+    repo.anexar_log(log("bob", "10/03/2026 11:00:00", 300))
+    dias = prod.agregados(date(2026, 3, 9), date(2026, 3, 10), hoje=date(2026, 3, 10))
+    assert sorted(dias["Segundos"].tolist()) == [300, 600, 1200]
+    assert arquivo.leituras_quentes == 1
@@ -0,0 +1,85 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmark"))
+
+from armazenamento import ABA_CONTROLE, ABA_PRODUCAO, COLUNAS_CONTROLE, RepositorioSheets, mesclar_progresso  # noqa: E402
+from planilha_falsa import ClienteFalso  # noqa: E402
+
+
+def test_progresso_soma_sobre_a_linha_atual_e_nao_sobre_o_cache():
+    cliente = ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE), ["C1 | A", "C1", "A", 10, "1-2", 100, "ana", 1]]})
+    repo = RepositorioSheets(lambda: cliente)
+    registro = {"Chave": "C1 | A", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10,
+                "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}
+    assert repo.buscar_controle("C1 | A")["Paginas_Concluidas"] == "1-2"
+
+    # Edição na planilha por fora do app, sem mexer na Revisao
+    cliente.planilha.abas[ABA_CONTROLE].linhas[1][4] = "1-5"
+    novo = repo.registrar_progresso(registro, [8])
+    assert novo["Paginas_Concluidas"].lstrip("'") == "1-5,8"
+
+
+def test_chave_nova_anexada_por_duas_instancias_fica_uma_linha_so():
+    cliente = ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE)]})
+    repo = RepositorioSheets(lambda: cliente)
+    aba = cliente.planilha.abas[ABA_CONTROLE]
+    outra = ["C1 | A", "C1", "A", 10, "1-2", 100, "bob", 1]
+    anexar = aba.append_rows
+
+    def anexar_depois_da_outra(linhas, **kwargs):
+        # A outra instância anexou a mesma chave entre a nossa conferência e o nosso anexo
+        aba.linhas.append(list(outra))
+        return anexar(linhas, **kwargs)
+    aba.append_rows = anexar_depois_da_outra
+
+    registro = {"Chave": "C1 | A", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10,
+                "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana", "Paginas_Concluidas": "3", "Revisao": 1}
+    gravou, atual = repo.salvar_controle_se(registro, 0)
+    assert not gravou and atual["Ultimo_Operador"] == "bob"
+    assert [l[0] for l in aba.linhas[1:]] == ["C1 | A"]
+
+
+def test_escrita_por_cima_entre_a_gravacao_e_a_conferencia_refaz_a_uniao():
+    cliente = ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE), ["C1 | A", "C1", "A", 10, "1", 100, "ana", 1]]})
+    nosso, outro = RepositorioSheets(lambda: cliente), RepositorioSheets(lambda: cliente)
+    registro = {"Chave": "C1 | A", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10,
+                "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}
+    lida_pelo_outro = outro.buscar_controle("C1 | A")
+    aba = cliente.planilha.abas[ABA_CONTROLE]
+    gravar = aba.batch_update
+
+    def gravar_e_deixar_o_outro_gravar_por_cima(dados, **kwargs):
+        gravar(dados, **kwargs)
+        aba.batch_update = gravar
+        novo = dict(mesclar_progresso(lida_pelo_outro, dict(registro, Ultimo_Operador="bob"), [3]), Revisao=2)
+        assert outro.salvar_controle_se(novo, 1, conferida=True) == (True, None)
+    aba.batch_update = gravar_e_deixar_o_outro_gravar_por_cima
+
+    assert nosso.registrar_progresso(registro, [2])["Paginas_Concluidas"].lstrip("'") == "1-3"
+    assert aba.linhas[1][4] == "1-3"
+
+
+def test_progresso_le_a_linha_uma_vez_antes_e_uma_depois_de_gravar():
+    cliente = ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE), ["C1 | A", "C1", "A", 10, "1", 100, "ana", 1]]})
+    repo = RepositorioSheets(lambda: cliente)
+    registro = {"Chave": "C1 | A", "Site": "C1", "Letra": "A", "Qtd_Paginas": 10,
+                "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}
+    # O primeiro salvamento também confere o cabeçalho da aba
+    repo.registrar_progresso(registro, [2])
+    antes = len(cliente.medidor.chamadas)
+    repo.registrar_progresso(registro, [3])
+    metodos = [c["metodo"] for c in cliente.medidor.chamadas[antes:]]
+    assert metodos == ["get_values", "batch_update", "get_values"]
+
+
+def test_soma_de_producao_de_duas_instancias_parte_da_linha_atual():
+    cliente = ClienteFalso({ABA_CONTROLE: [list(COLUNAS_CONTROLE)]})
+    uma, outra = RepositorioSheets(lambda: cliente), RepositorioSheets(lambda: cliente)
+    uma.somar_producao("ana", "10/03/2026", 60, 1, 10)
+    outra.somar_producao("ana", "10/03/2026", 60, 2, 20)
+    uma.somar_producao("ana", "10/03/2026", 60, 3, 30)
+    linha = cliente.planilha.abas[ABA_PRODUCAO].linhas[1]
+    assert [int(float(v)) for v in linha[3:6]] == [180, 6, 60]
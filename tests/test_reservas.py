@@ -0,0 +1,49 @@
+import os
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "benchmark"))
+
+from armazenamento import (ABA_ACOMPANHAMENTO, COLUNAS_ACOMPANHAMENTO, STATUS_RESERVA,  # noqa: E402
+                           IndiceReservas, RepositorioSheets)
+from planilha_falsa import ClienteFalso  # noqa: E402
+
+# Duas chaves intercaladas: as exclusões de uma deslocam as linhas da outra
+RESERVAS = [["K1", "A", p, STATUS_RESERVA] if p % 2 else ["K2", "B", p, STATUS_RESERVA] for p in range(1, 11)]
+
+
+def indice_da_aba(valores):
+    indice = IndiceReservas()
+    indice.recarregar(valores)
+    return indice
+
+
+def test_remover_linhas_sobe_as_linhas_de_baixo():
+    valores = [list(COLUNAS_ACOMPANHAMENTO)] + RESERVAS
+    indice = indice_da_aba(valores)
+    # Linhas 3, 4 e 7 da aba = páginas 2, 3 e 6
+    indice.remover_linhas([7, 3, 4])
+    restantes = [valores[0]] + [r for r in RESERVAS if r[2] not in (2, 3, 6)]
+    esperado = indice_da_aba(restantes)
+    assert indice.linhas == esperado.linhas
+    assert indice.por_chave == esperado.por_chave
+    assert indice.total_linhas == len(restantes) == 8
+    assert indice.paginas("K1") == {1, 5, 7, 9} and indice.paginas("K2") == {4, 8, 10}
+
+
+def test_remover_reservas_mantem_o_indice_igual_a_aba():
+    cliente = ClienteFalso({ABA_ACOMPANHAMENTO: [list(COLUNAS_ACOMPANHAMENTO)] + [list(r) for r in RESERVAS]})
+    repo = RepositorioSheets(lambda: cliente)
+    aba = cliente.planilha.abas[ABA_ACOMPANHAMENTO]
+    assert repo.paginas_reservadas("K1") == {1, 3, 5, 7, 9}
+
+    repo.remover_reservas("K1", {3, 5, 9})
+    repo.remover_reservas("K2", {2, 10})
+    repo.adicionar_reservas([["K2", "B", 12, STATUS_RESERVA]])
+    repo.remover_reservas("K1", {7})
+
+    # As exclusões seguintes usaram o índice deslocado, sem reler a aba inteira
+    assert [c["metodo"] for c in cliente.medidor.chamadas].count("get_all_values") == 1
+    assert [r[2] for r in aba.linhas[1:]] == [1, 4, 6, 8, 12]
+    assert repo.indice_reservas.linhas == indice_da_aba(aba.get_all_values()).linhas
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import STATUS_RESERVA, Repositorio, RepositorioSQLite  # noqa: E402
+from fila_escrita import FilaEscrita  # noqa: E402
+
+DIA = "10/03/2026"
+LETRA = {"Chave": "C1 - X | A", "Site": "C1 - X", "Letra": "A", "Qtd_Paginas": 10,
+         "Paginas_Concluidas": "", "Qtd_Ultima_Pag": 100, "Ultimo_Operador": "ana"}
+
+
+def log(operador, data_hora, acao="PAUSA"):
+    return ["s1", operador, "C1 - X", "A", acao, data_hora, 0, 60, "1-3", 10, 300]
+
+
+@pytest.fixture
+def repo():
+    return RepositorioSQLite(":memory:")
+
+
+def test_repositorio_incompleto_falha_ao_construir():
+    # Um backend que implementa tudo menos o compare-and-set
+    metodos = {m: lambda self, *args: None for m in Repositorio.__abstractmethods__ - {"salvar_controle_se"}}
+    with pytest.raises(TypeError, match="salvar_controle_se"): type("SemRevisao", (Repositorio,), metodos)()
+
+
+def test_controle_e_compare_and_set(repo):
+    repo.salvar_controles([LETRA])
+    assert repo.chaves_controle() == {"C1 - X | A"}
+    assert repo.buscar_controle("C1 - X | A")["Revisao"] == 0
+
+    assert repo.salvar_controle_se(dict(LETRA, Paginas_Concluidas="1-2"), 0) == (True, None)
+    gravou, atual = repo.salvar_controle_se(dict(LETRA, Paginas_Concluidas="9"), 0)
+    assert not gravou and (atual["Paginas_Concluidas"], atual["Revisao"]) == ("1-2", 1)
+
+    # Chave nova: revisão 0 insere, e só uma vez
+    nova = dict(LETRA, Chave="C1 - X | B", Letra="B")
+    assert repo.salvar_controle_se(nova, 0)[0]
+    assert not repo.salvar_controle_se(nova, 0)[0]
+
+
+def test_registrar_progresso_soma_sobre_a_linha_gravada(repo):
+    repo.salvar_controles([dict(LETRA, Paginas_Concluidas="1-2")])
+    repo.registrar_progresso(dict(LETRA, Ultimo_Operador="bob"), [5])
+    repo.registrar_progresso(LETRA, "3-4")
+    atual = repo.buscar_controle("C1 - X | A")
+    assert (atual["Paginas_Concluidas"].lstrip("'"), atual["Revisao"]) == ("1-5", 2)
+
+
+def test_logs_producao_e_arquivo(repo):
+    repo.anexar_logs([log("ana", "28/02/2026 08:00:00"), log("ana", f"{DIA} 08:00:00"),
+                      log("bob", f"{DIA} 09:00:00"), log("ana", f"{DIA} 10:00:00", "FIM")])
+    assert repo.ultima_acao("ana") == "FIM" and repo.ultima_acao("zé") is None
+    assert [r["Acao"] for r in repo.logs_do_dia("ana", DIA)] == ["PAUSA", "FIM"]
+
+    assert repo.arquivar_logs("2026_03") == {"2026_02": 1}
+    assert repo.particoes_logs() == ["2026_02"] and len(repo.listar_logs()) == 3
+    assert [r["Operador"] for r in repo.logs_da_data("28/02/2026")] == ["ana"]
+    assert repo.arquivar_logs("2026_03") == {}
+
+    assert repo.buscar_producao("ana", DIA) is None
+    repo.somar_producao("ana", DIA, 60, 2, 10)
+    repo.somar_producao("ana", DIA, 30, 1, 5)
+    assert repo.buscar_producao("ana", DIA) == (90, 3, 15)
+    repo.definir_producao("ana", DIA, 1, 1, 1)
+    assert repo.buscar_producao("ana", DIA) == (1, 1, 1)
+
+
+def test_reservas(repo):
+    repo.adicionar_reservas([["K", "A", p, STATUS_RESERVA] for p in (1, 2, 3)] + [["J", "B", 1, STATUS_RESERVA]])
+    assert repo.sincronizar_reservas("K", "A", {2, 3, 4}) == ({4}, {1})
+    assert repo.paginas_reservadas("K") == {2, 3, 4}
+    assert repo.reservas_por_chave() == {"K": 3, "J": 1}
+
+
+def test_salvar_controle_se_na_fila_confere_depois_das_pendentes(repo, tmp_path):
+    repo.salvar_controles([LETRA])
+    fila = FilaEscrita(repo, str(tmp_path / "fila.db"), intervalo=3600)
+    fila.diario.incluir("controle", dict(LETRA, Paginas_Concluidas="1"))
+    # A revisão 1 só existe depois de aplicar a escrita pendente
+    assert fila.salvar_controle_se(dict(LETRA, Paginas_Concluidas="1-2"), 1) == (True, None)
+    assert repo.buscar_controle("C1 - X | A")["Paginas_Concluidas"] == "1-2"
@@ -0,0 +1,26 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from armazenamento import UltimasLeituras  # noqa: E402
+
+
+def test_guarda_so_as_mais_recentes():
+    leituras = UltimasLeituras(max_entradas=2)
+    leituras.guardar("a", 1)
+    leituras.guardar("b", 2)
+    leituras.obter("a")
+    leituras.guardar("c", 3)
+    assert leituras.obter("b") is None
+    assert leituras.obter("a")[1] == 1
+    assert leituras.obter("c")[1] == 3
+
+
+def test_descarta_as_vencidas():
+    leituras = UltimasLeituras(validade=60)
+    leituras.guardar("a", [1, 2])
+    leituras.itens["a"] = (time.time() - 61, [1, 2])
+    assert leituras.obter("a") is None
+    assert not leituras.itens